@@ -1,12 +1,37 @@
 import os
-import logging
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for
+import csv
+import gzip
+import hashlib
 import io
-import pandas as pd
-from datetime import datetime
+import json
+import logging
+import queue
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+import click
+from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, Response, stream_with_context, g, has_request_context, make_response
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from itertools import chain, groupby, islice
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import validates
 import pytz  # For timezone handling
-from flask_migrate import Migrate
+from flask_migrate import Migrate, stamp
 
 # Get the absolute path of the directory where app.py is located
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -14,51 +39,301 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 app = Flask(__name__)
 
 # Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'scooters.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///' + os.path.join(basedir, 'scooters.db'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# SQLite storage mode: 'production' enables WAL, busy timeouts and serialized writes for several scanners
+app.config['SQLITE_STORAGE_MODE'] = os.environ.get('SQLITE_STORAGE_MODE', 'production')
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 10000))
+app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_PRODUCTION_MODE = (app.config['SQLITE_STORAGE_MODE'] == 'production'
+                          and app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite:///')
+                          and ':memory:' not in app.config['SQLALCHEMY_DATABASE_URI'])
+if SQLITE_PRODUCTION_MODE:
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        # Threaded workers share one pool per process; connections are cheap but reused
+        'pool_size': int(os.environ.get('SQLITE_POOL_SIZE', 10)),
+        'max_overflow': 20,
+        'pool_timeout': 30,
+        'connect_args': {
+            'timeout': app.config['SQLITE_BUSY_TIMEOUT_MS'] / 1000,
+            'check_same_thread': False,
+            # Transactions are started explicitly below so writes can use BEGIN IMMEDIATE
+            'isolation_level': None,
+        },
+    }
+
 # Initialize SQLAlchemy
 db = SQLAlchemy(app)
 
 # Set up Flask-Migrate
-migrate = Migrate(app, db)
-
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+migrate = Migrate(app, db, directory=os.path.join(basedir, 'migrations'))
+
+# SQLite production storage mode
+
+# Serializes write transactions within this process; BEGIN IMMEDIATE serializes them across processes
+write_lock = threading.Lock()
+write_state = threading.local()
+
+# Configure WAL, synchronous level and busy timeout on every new SQLite connection
+@event.listens_for(Engine, 'connect')
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    if not SQLITE_PRODUCTION_MODE or not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute(f"PRAGMA synchronous={app.config['SQLITE_SYNCHRONOUS']}")
+    cursor.execute(f"PRAGMA busy_timeout={app.config['SQLITE_BUSY_TIMEOUT_MS']}")
+    cursor.close()
+
+# Start transactions explicitly; write requests take the write lock up front so they never fail on lock upgrade
+@event.listens_for(Engine, 'begin')
+def begin_sqlite_transaction(conn):
+    if not SQLITE_PRODUCTION_MODE or conn.dialect.name != 'sqlite':
+        return
+    if getattr(write_state, 'active', False):
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+    else:
+        conn.exec_driver_sql('BEGIN')
+
+# Context manager for the single serialized write path (also usable from CLI commands and jobs)
+@contextmanager
+def serialized_write_transaction():
+    # A read transaction started earlier would hold a stale snapshot that cannot be upgraded to a write
+    db.session.close()
+    with write_lock:
+        write_state.active = True
+        try:
+            yield
+        finally:
+            # End the write transaction before releasing the lock
+            db.session.close()
+            write_state.active = False
+
+# Decorator routing a view through the single serialized write path
+def serialized_write(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with serialized_write_transaction():
+            return view(*args, **kwargs)
+    return wrapper
+
+# Idempotent write requests
+
+# Recent responses by (endpoint, Idempotency-Key), oldest first; kept per process
+idempotency_responses = OrderedDict()
+idempotency_lock = threading.Lock()
+
+# Function to drop expired responses and keep the store within its size limit
+def trim_idempotency_responses(now):
+    while idempotency_responses:
+        entry = next(iter(idempotency_responses.values()))
+        if len(idempotency_responses) <= IDEMPOTENCY_CACHE_SIZE and now - entry['stored_at'] < IDEMPOTENCY_TTL_SECONDS:
+            break
+        idempotency_responses.popitem(last=False)
+
+# Decorator replaying the stored response when a request repeats an Idempotency-Key header
+def idempotent(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view(*args, **kwargs)
+        cache_key = (request.endpoint, key)
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+        now = time.monotonic()
+        with idempotency_lock:
+            entry = idempotency_responses.get(cache_key)
+            if entry is not None and now - entry['stored_at'] >= IDEMPOTENCY_TTL_SECONDS:
+                entry = None
+            is_original = entry is None
+            if is_original:
+                entry = {'fingerprint': fingerprint, 'stored_at': now, 'done': threading.Event(), 'response': None}
+                idempotency_responses.pop(cache_key, None)
+                idempotency_responses[cache_key] = entry
+            trim_idempotency_responses(now)
+
+        if not is_original:
+            if entry['fingerprint'] != fingerprint:
+                logging.debug(f"Idempotency key {key} reused with a different request on {request.endpoint}.")
+                return jsonify({'status': 'invalid', 'message': 'Idempotency-Key was already used for a different request'}), 422
+            # A retry can arrive while the original is still running
+            if not entry['done'].wait(IDEMPOTENCY_WAIT_SECONDS):
+                logging.debug(f"Original request with idempotency key {key} on {request.endpoint} is still running.")
+                response = jsonify({'status': 'in_progress', 'message': 'A request with this Idempotency-Key is still being processed'})
+                response.status_code = 409
+                response.headers['Retry-After'] = str(IDEMPOTENCY_RETRY_AFTER_SECONDS)
+                return response
+            if entry['response'] is not None:
+                logging.debug(f"Replaying stored response for idempotency key {key} on {request.endpoint}.")
+                body, status, mimetype = entry['response']
+                return Response(body, status=status, mimetype=mimetype, headers={'Idempotent-Replayed': 'true'})
+            # The original finished without a response to store (it failed); handle this request normally
+            return view(*args, **kwargs)
+
+        try:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code < 500:
+                entry['response'] = (response.get_data(), response.status_code, response.mimetype)
+        finally:
+            if entry['response'] is None:
+                # Let a later retry run the request again
+                with idempotency_lock:
+                    if idempotency_responses.get(cache_key) is entry:
+                        del idempotency_responses[cache_key]
+            entry['done'].set()
+        return response
+    return wrapper
+
+# Function to read the request's Idempotency-Key if it can be stored with the rows it creates
+def request_idempotency_key():
+    key = request.headers.get('Idempotency-Key')
+    return key if key and len(key) <= IDEMPOTENCY_KEY_MAX_LENGTH else None
+
+# Function to tell whether a row was created by an earlier attempt of this request (same Idempotency-Key).
+# Unlike the response store this survives restarts and is shared by every worker
+def created_by_this_request(row):
+    key = request_idempotency_key()
+    return key is not None and row.idempotency_key == key
+
+# Set up logging; debug output is opt-in (LOG_LEVEL=DEBUG) in production storage mode
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO' if SQLITE_PRODUCTION_MODE else 'DEBUG').upper())
+
+# Endpoints hit on every beep; their debug logging (through hot_debug) is sampled so it does not slow scanning down
+HOT_ENDPOINTS = {
+    'save_scan', 'add_manual_entry', 'save_validation', 'unvalidate_scooter',
+    'save_battery_scan', 'add_manual_battery_entry',
+    'save_scan_batch', 'save_validation_batch', 'save_battery_scan_batch',
+}
+app.config['DEBUG_LOG_SAMPLE_RATE'] = float(os.environ.get('DEBUG_LOG_SAMPLE_RATE', 0.01))
+
+# Metrics are only served to local clients unless this is enabled
+app.config['METRICS_ALLOW_REMOTE'] = os.environ.get('METRICS_ALLOW_REMOTE') == '1'
+
+# Latency histogram buckets (milliseconds) and samples kept per endpoint for percentiles
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+LATENCY_SAMPLE_SIZE = 1024
+
+# Number of duplicated scooters (or batteries) shown per page on /check_duplicates and /check_battery_duplicates
+DUPLICATES_PER_PAGE = 100
+
+# Bulk duplicate resolution policies: which scan of a duplicated scooter is kept
+DUPLICATE_POLICIES = ('keep_earliest', 'keep_newest_list', 'keep_warehouse')
+
+# Candidates reported when a partial scooter ID matches several scans
+SUFFIX_MATCH_LIMIT = 5
+
+# Global ID search: shortest prefix searched, IDs returned per search and lists shown per ID
+SEARCH_MIN_PREFIX = 2
+SEARCH_RESULT_LIMIT = 10
+SEARCH_LISTS_PER_ID = 5
+SEARCH_TYPES = ('all', 'scooter', 'battery')
+
+# Maximum number of IDs accepted by the batch endpoints, and IDs per SQL IN clause
+MAX_BATCH_SIZE = 1000
+SQL_IN_CHUNK_SIZE = 500
+
+# Manifest imports: accepted file types, header names recognised as the ID column,
+# rows inserted per write transaction and rejected rows listed in the report
+IMPORT_EXTENSIONS = ('.xlsx', '.csv')
+IMPORT_ID_HEADERS = ('scooter id', 'scooter_id', 'scooter', 'vehicle id', 'vehicle_id', 'qr code', 'id')
+IMPORT_CHUNK_SIZE = MAX_BATCH_SIZE
+IMPORT_REJECTED_REPORT_LIMIT = 100
+# Rows after the first one looked at to tell an unnamed header row from data
+IMPORT_HEADER_SAMPLE_ROWS = 5
+
+# Default and maximum number of scans per page of the list contents API
+LIST_PAGE_SIZE = 200
+MAX_LIST_PAGE_SIZE = 1000
+LIST_STATUS_FILTERS = ('all', 'validated', 'missing')
+
+# Default and maximum number of changes per request of the list changes feed
+CHANGES_PAGE_SIZE = 500
+MAX_CHANGES_PAGE_SIZE = 5000
+
+# Responses kept for client-supplied idempotency keys, and how long they are replayed
+IDEMPOTENCY_CACHE_SIZE = 10000
+IDEMPOTENCY_TTL_SECONDS = 600
+# Longest Idempotency-Key stored with the rows a request creates
+IDEMPOTENCY_KEY_MAX_LENGTH = 64
+# Seconds a retry waits for the original request with the same key to finish
+IDEMPOTENCY_WAIT_SECONDS = 30
+# Retry-After sent when that wait runs out while the original is still running
+IDEMPOTENCY_RETRY_AFTER_SECONDS = 5
+
+# Import time budget for a cold start, checked by `flask startup-report`
+app.config['COLD_START_BUDGET_MS'] = float(os.environ.get('COLD_START_BUDGET_MS', 1500))
+
+# Heavy dependencies imported on first use instead of at startup
+DEFERRED_IMPORTS = ['xlsxwriter', 'openpyxl']
+
+# Rows fetched per round trip when streaming exports from the database
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_TIMESTAMP_FORMAT = '%H:%M | %d.%m.%Y'
+# Part of the export cache key and ETag; bump it whenever the exported workbook changes
+# (columns, timestamp format, writer options) so no export of the old layout is served
+EXPORT_FORMAT_VERSION = 1
+
+# On-disk cache of finished xlsx exports, keyed by list revision and export format version, and its size limit
+app.config['EXPORT_CACHE_DIR'] = os.environ.get('EXPORT_CACHE_DIR', os.path.join(basedir, 'export_cache'))
+app.config['EXPORT_CACHE_MAX_BYTES'] = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+
+# Single-list exports up to this many rows (or already cached) are built in the request instead of a job
+EXPORT_SYNC_MAX_ROWS = int(os.environ.get('EXPORT_SYNC_MAX_ROWS', 2000))
+
+# Changes on every start so cached pages pick up new templates after a deploy
+PAGE_ETAG_SALT = str(time.time_ns())
+
+# Cold archive: validated lists untouched for this many days are moved into compressed files
+app.config['ARCHIVE_DIR'] = os.environ.get('ARCHIVE_DIR', os.path.join(basedir, 'archive'))
+app.config['ARCHIVE_AFTER_DAYS'] = int(os.environ.get('ARCHIVE_AFTER_DAYS', 90))
+ARCHIVE_FORMAT_VERSION = 1
+
+# Background jobs: worker threads per process, where finished artifacts are kept and for how long
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+app.config['JOB_ARTIFACT_DIR'] = os.environ.get('JOB_ARTIFACT_DIR', os.path.join(basedir, 'job_artifacts'))
+JOB_ARTIFACT_TTL_SECONDS = 24 * 60 * 60
 
 # Set your local timezone
 local_tz = pytz.timezone('Europe/Berlin')  # Replace with your timezone
 
 # Function to get local time
 def get_local_time():
-    logging.debug("Getting local time.")
     return datetime.now(local_tz)
 
+# Function to get the current UTC time (naive, as SQLite's CURRENT_TIMESTAMP)
+def get_utc_time():
+    return datetime.now(pytz.utc).replace(tzinfo=None)
+
 # Function to normalize scooter IDs
 def normalize_scooter_id(scooter_id):
-    logging.debug(f"Normalizing scooter ID: {scooter_id}")
     prefixes = ['https://tier.app/', 'https://qr.tier-services.io/']
     for prefix in prefixes:
         if scooter_id.startswith(prefix):
             scooter_id = scooter_id[len(prefix):]
             break
-    scooter_id = scooter_id.upper()
-    logging.debug(f"Normalized scooter ID: {scooter_id}")
-    return scooter_id
+    return scooter_id.upper()
+
+# Function to normalize battery IDs (surrounding whitespace and case are not significant)
+def normalize_battery_id(battery_id):
+    return (battery_id or '').strip().upper()
+
+# Function to check a normalized scooter ID has a valid length
+def is_valid_scooter_id(normalized_id):
+    return 5 <= len(normalized_id) <= 9
+
+# Function to split a list of values into chunks for SQL IN clauses
+def chunked(values, size=SQL_IN_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
 
 # Function to compare scooter IDs considering possible prefixes
 def scooter_id_matches(scooter_id_db, scooter_id_input):
-    logging.debug(f"Comparing scooter IDs: {scooter_id_db} and {scooter_id_input}")
     # Normalize both IDs
-    id_db_normalized = normalize_scooter_id(scooter_id_db)
-    id_input_normalized = normalize_scooter_id(scooter_id_input)
-    match = id_db_normalized == id_input_normalized
-    logging.debug(f"IDs match: {match}")
-    return match
+    return normalize_scooter_id(scooter_id_db) == normalize_scooter_id(scooter_id_input)
 
 # Models
 class List(db.Model):
-    logging.debug("Defining List model.")
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100))
     warehouse = db.Column(db.String(100))
@@ -67,37 +342,1519 @@ class List(db.Model):
     is_validated = db.Column(db.Boolean, default=False)
     validation_timestamp = db.Column(db.DateTime)
     validations = db.relationship('Validation', backref='list', lazy=True, cascade='all, delete-orphan')
+    # Bumped by the revision triggers on every change to the list, its scans or validations
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    modified_at = db.Column(db.DateTime, default=get_utc_time)  # UTC
+    # Kept by the counter triggers, so totals never count the scans; `flask repair-counters` recomputes them
+    scan_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    validated_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
 class Scan(db.Model):
-    logging.debug("Defining Scan model.")
     id = db.Column(db.Integer, primary_key=True)
     scooter_id = db.Column(db.String(200))
+    # Normalized scooter ID, kept in sync with scooter_id so duplicate checks are an index lookup
+    normalized_id = db.Column(db.String(200), index=True)
+    # Normalized ID reversed, so suffix searches become indexed prefix range scans
+    reversed_id = db.Column(db.String(200))
     timestamp = db.Column(db.DateTime, default=get_local_time)
-    list_id = db.Column(db.Integer, db.ForeignKey('list.id'), nullable=False)
+    # Indexed so list pages are keyset range scans on (list_id, id)
+    list_id = db.Column(db.Integer, db.ForeignKey('list.id'), nullable=False, index=True)
+    # Idempotency-Key of the request that created the scan, so a retried or replayed request gets its result back
+    idempotency_key = db.Column(db.String(IDEMPOTENCY_KEY_MAX_LENGTH), index=True, unique=True)
+    __table_args__ = (
+        db.UniqueConstraint('list_id', 'normalized_id', name='uq_scan_list_normalized_id'),
+        db.Index('ix_scan_list_reversed_id', 'list_id', 'reversed_id'),
+    )
+
+    @validates('scooter_id')
+    def set_normalized_id(self, key, scooter_id):
+        self.normalized_id = normalize_scooter_id(scooter_id)
+        self.reversed_id = self.normalized_id[::-1]
+        return scooter_id
 
 class Validation(db.Model):
-    logging.debug("Defining Validation model.")
     id = db.Column(db.Integer, primary_key=True)
     scooter_id = db.Column(db.String(200))
+    # Normalized scooter ID, kept in sync with scooter_id so duplicate checks are an index lookup
+    normalized_id = db.Column(db.String(200), index=True)
     timestamp = db.Column(db.DateTime, default=get_local_time)
     list_id = db.Column(db.Integer, db.ForeignKey('list.id'), nullable=False)
     is_valid = db.Column(db.Boolean, default=False)
+    # Idempotency-Key of the request that created the validation, like Scan.idempotency_key
+    idempotency_key = db.Column(db.String(IDEMPOTENCY_KEY_MAX_LENGTH), index=True, unique=True)
+    __table_args__ = (db.UniqueConstraint('list_id', 'normalized_id', name='uq_validation_list_normalized_id'),)
+
+    @validates('scooter_id')
+    def set_normalized_id(self, key, scooter_id):
+        self.normalized_id = normalize_scooter_id(scooter_id)
+        return scooter_id
+
+# Cross-list duplicate index: how many scans (one per list) exist for each normalized scooter ID.
+# Maintained by the triggers below on every insert, update and delete of a scan.
+class ScooterOccurrence(db.Model):
+    normalized_id = db.Column(db.String(200), primary_key=True)
+    scan_count = db.Column(db.Integer, nullable=False, default=0, index=True)
+
+SCOOTER_OCCURRENCE_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS scan_occurrence_insert AFTER INSERT ON scan
+    WHEN NEW.normalized_id IS NOT NULL
+    BEGIN
+        INSERT OR IGNORE INTO scooter_occurrence (normalized_id, scan_count) VALUES (NEW.normalized_id, 0);
+        UPDATE scooter_occurrence SET scan_count = scan_count + 1 WHERE normalized_id = NEW.normalized_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS scan_occurrence_delete AFTER DELETE ON scan
+    WHEN OLD.normalized_id IS NOT NULL
+    BEGIN
+        UPDATE scooter_occurrence SET scan_count = scan_count - 1 WHERE normalized_id = OLD.normalized_id;
+        DELETE FROM scooter_occurrence WHERE normalized_id = OLD.normalized_id AND scan_count <= 0;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS scan_occurrence_update AFTER UPDATE OF normalized_id ON scan
+    WHEN OLD.normalized_id IS NOT NEW.normalized_id
+    BEGIN
+        UPDATE scooter_occurrence SET scan_count = scan_count - 1 WHERE normalized_id = OLD.normalized_id;
+        DELETE FROM scooter_occurrence WHERE normalized_id = OLD.normalized_id AND scan_count <= 0;
+        INSERT OR IGNORE INTO scooter_occurrence (normalized_id, scan_count) SELECT NEW.normalized_id, 0 WHERE NEW.normalized_id IS NOT NULL;
+        UPDATE scooter_occurrence SET scan_count = scan_count + 1 WHERE normalized_id = NEW.normalized_id;
+    END""",
+]
+
+# Create the triggers once all tables exist (db.create_all); migrations create them explicitly
+for trigger_sql in SCOOTER_OCCURRENCE_TRIGGERS:
+    event.listen(db.metadata, 'after_create', DDL(trigger_sql).execute_if(dialect='sqlite'))
 
 # New Models for Battery Scanning
 class BatteryList(db.Model):
-    logging.debug("Defining BatteryList model.")
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100))
     warehouse = db.Column(db.String(100))
     timestamp = db.Column(db.DateTime, default=get_local_time)
     scans = db.relationship('BatteryScan', backref='battery_list', lazy=True, cascade='all, delete-orphan')
+    # Bumped by the revision triggers on every change to the list or its scans
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    modified_at = db.Column(db.DateTime, default=get_utc_time)  # UTC
+    # Kept by the counter triggers, like List.scan_count
+    scan_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
 class BatteryScan(db.Model):
-    logging.debug("Defining BatteryScan model.")
     id = db.Column(db.Integer, primary_key=True)
     battery_id = db.Column(db.String(200))
+    # Normalized battery ID, kept in sync with battery_id so duplicate checks are an index lookup
+    normalized_id = db.Column(db.String(200), index=True)
     timestamp = db.Column(db.DateTime, default=get_local_time)
-    list_id = db.Column(db.Integer, db.ForeignKey('battery_list.id'), nullable=False)
+    list_id = db.Column(db.Integer, db.ForeignKey('battery_list.id'), nullable=False, index=True)
+    # Idempotency-Key of the request that created the scan, like Scan.idempotency_key
+    idempotency_key = db.Column(db.String(IDEMPOTENCY_KEY_MAX_LENGTH), index=True, unique=True)
+    __table_args__ = (db.UniqueConstraint('list_id', 'normalized_id', name='uq_battery_scan_list_normalized_id'),)
+
+    @validates('battery_id')
+    def set_normalized_id(self, key, battery_id):
+        self.normalized_id = normalize_battery_id(battery_id)
+        return battery_id
+
+# List revisions: every insert, update and delete of a row below bumps its list's revision,
+# which keys ETags and the export cache
+LIST_REVISION_TABLES = [('scan', 'list'), ('validation', 'list'), ('battery_scan', 'battery_list')]
+
+# Function to build the triggers that bump a list's revision when one of its rows changes
+def list_revision_triggers(table, list_table):
+    bump = f"UPDATE {list_table} SET revision = revision + 1, modified_at = CURRENT_TIMESTAMP WHERE id"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_revision_insert AFTER INSERT ON {table} BEGIN {bump} = NEW.list_id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_revision_delete AFTER DELETE ON {table} BEGIN {bump} = OLD.list_id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_revision_update AFTER UPDATE ON {table} BEGIN {bump} IN (OLD.list_id, NEW.list_id); END",
+    ]
+
+LIST_REVISION_TRIGGERS = [trigger_sql for table, list_table in LIST_REVISION_TABLES for trigger_sql in list_revision_triggers(table, list_table)] + [
+    # Changes to the list itself (the revision columns are not in the column list, so this does not recurse)
+    "CREATE TRIGGER IF NOT EXISTS list_revision_update AFTER UPDATE OF name, warehouse, timestamp, is_validated, validation_timestamp ON list "
+    "BEGIN UPDATE list SET revision = revision + 1, modified_at = CURRENT_TIMESTAMP WHERE id = NEW.id; END",
+    "CREATE TRIGGER IF NOT EXISTS battery_list_revision_update AFTER UPDATE OF name, warehouse, timestamp ON battery_list "
+    "BEGIN UPDATE battery_list SET revision = revision + 1, modified_at = CURRENT_TIMESTAMP WHERE id = NEW.id; END",
+]
+
+for trigger_sql in LIST_REVISION_TRIGGERS:
+    event.listen(db.metadata, 'after_create', DDL(trigger_sql).execute_if(dialect='sqlite'))
+
+# List counters: (table, its list table, counter column), updated in the same statement as each
+# insert, delete or move of a row, so write responses read one list row instead of counting
+LIST_COUNTER_TABLES = [('scan', 'list', 'scan_count'), ('validation', 'list', 'validated_count'), ('battery_scan', 'battery_list', 'scan_count')]
+
+# Function to build the triggers that keep a list's counter in step with one of its tables
+def list_counter_triggers(table, list_table, column):
+    change = f"UPDATE {list_table} SET {column} = {column} {{sign}} 1 WHERE id = {{row}}.list_id;"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_counter_insert AFTER INSERT ON {table} BEGIN "
+        f"{change.format(sign='+', row='NEW')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_counter_delete AFTER DELETE ON {table} BEGIN "
+        f"{change.format(sign='-', row='OLD')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_counter_update AFTER UPDATE OF list_id ON {table} "
+        f"WHEN OLD.list_id IS NOT NEW.list_id BEGIN "
+        f"{change.format(sign='-', row='OLD')} {change.format(sign='+', row='NEW')} END",
+    ]
+
+LIST_COUNTER_TRIGGERS = [trigger_sql for table, list_table, column in LIST_COUNTER_TABLES for trigger_sql in list_counter_triggers(table, list_table, column)]
+
+for trigger_sql in LIST_COUNTER_TRIGGERS:
+    event.listen(db.metadata, 'after_create', DDL(trigger_sql).execute_if(dialect='sqlite'))
+
+# Changes feed: every insert, update and delete of a scan or validation is recorded under a
+# monotonic sequence number, so clients can fetch only what changed since their last refresh.
+# Only the latest change of each row is kept; deletions stay as tombstones until the list is deleted.
+class ListChange(db.Model):
+    seq = db.Column(db.Integer, primary_key=True)
+    list_id = db.Column(db.Integer, nullable=False)
+    item_type = db.Column(db.String(20), nullable=False)  # 'scan' or 'validation' (the table name)
+    row_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # 'upsert' or 'delete'
+    scooter_id = db.Column(db.String(200))
+    normalized_id = db.Column(db.String(200))
+    timestamp = db.Column(db.DateTime)
+    __table_args__ = (
+        db.Index('ix_list_change_list_seq', 'list_id', 'seq'),
+        db.Index('ix_list_change_item', 'item_type', 'row_id'),
+        # AUTOINCREMENT: sequence numbers are never reused, even after compaction
+        {'sqlite_autoincrement': True},
+    )
+
+LIST_CHANGE_TABLES = ['scan', 'validation']
+
+# Function to build the triggers that record the changes of a table in the changes feed
+def list_change_triggers(table):
+    forget = f"DELETE FROM list_change WHERE item_type = '{table}' AND row_id = {{row}}.id AND list_id = {{row}}.list_id;"
+    record = ("INSERT INTO list_change (list_id, item_type, row_id, op, scooter_id, normalized_id, timestamp) "
+              f"SELECT {{row}}.list_id, '{table}', {{row}}.id, '{{op}}', {{row}}.scooter_id, {{row}}.normalized_id, {{row}}.timestamp")
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_change_insert AFTER INSERT ON {table} BEGIN "
+        f"{forget.format(row='NEW')} {record.format(row='NEW', op='upsert')}; END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_change_delete AFTER DELETE ON {table} BEGIN "
+        f"{forget.format(row='OLD')} {record.format(row='OLD', op='delete')}; END",
+        # A row moved to another list is a deletion in the old list
+        f"CREATE TRIGGER IF NOT EXISTS {table}_change_update AFTER UPDATE ON {table} BEGIN "
+        f"{forget.format(row='OLD')} {record.format(row='OLD', op='delete')} WHERE OLD.list_id IS NOT NEW.list_id; "
+        f"{forget.format(row='NEW')} {record.format(row='NEW', op='upsert')}; END",
+    ]
+
+LIST_CHANGE_TRIGGERS = [trigger_sql for table in LIST_CHANGE_TABLES for trigger_sql in list_change_triggers(table)] + [
+    # A deleted list has no feed left to follow
+    "CREATE TRIGGER IF NOT EXISTS list_change_cleanup AFTER DELETE ON list BEGIN DELETE FROM list_change WHERE list_id = OLD.id; END",
+]
+
+for trigger_sql in LIST_CHANGE_TRIGGERS:
+    event.listen(db.metadata, 'after_create', DDL(trigger_sql).execute_if(dialect='sqlite'))
+
+# Warehouse daily rollups: scans, validated scans and battery scans counted per warehouse and day
+# (local time, like the timestamps), so warehouse reports never read the scan tables.
+# A validation is counted on the day of the scan it validates, so validations <= scans on every day.
+# Maintained by the triggers below; `flask rebuild-rollups` recomputes them.
+class WarehouseDailyRollup(db.Model):
+    warehouse = db.Column(db.String(100), primary_key=True)  # '' for lists without a warehouse
+    day = db.Column(db.String(10), primary_key=True)  # 'YYYY-MM-DD'
+    scans = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    validations = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Scans of the day that are validated
+    battery_scans = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    __table_args__ = (db.Index('ix_warehouse_daily_rollup_day', 'day'),)
+
+# Day of the scan a validation row validates (NULL when the scan is not in the list)
+def rollup_scan_day(row):
+    return f"(SELECT date(timestamp) FROM scan WHERE list_id = {row}.list_id AND normalized_id = {row}.normalized_id)"
+
+# Function to build the SQL that adds delta to a rollup column of a list's warehouse on a day
+def rollup_upsert(list_table, column, row, day, delta, condition=''):
+    return (f"INSERT INTO warehouse_daily_rollup (warehouse, day, {column}) "
+            f"SELECT COALESCE(warehouse, ''), {day}, {delta} FROM {list_table} "
+            f"WHERE id = {row}.list_id AND {day} IS NOT NULL {condition}"
+            f"ON CONFLICT (warehouse, day) DO UPDATE SET {column} = {column} + excluded.{column};")
+
+# Function to build the SQL that drops the rollups of a day that no longer count anything
+def rollup_cleanup(day):
+    return f"DELETE FROM warehouse_daily_rollup WHERE day = {day} AND scans = 0 AND validations = 0 AND battery_scans = 0;"
+
+# Function to build the SQL that adds (sign 1) or removes (sign -1) one row of a table from the rollups
+def rollup_change(table, row, sign):
+    if table == 'scan':
+        day = f"date({row}.timestamp)"
+        validated = f"AND EXISTS (SELECT 1 FROM validation WHERE list_id = {row}.list_id AND normalized_id = {row}.normalized_id) "
+        sql = rollup_upsert('list', 'scans', row, day, sign) + ' ' + rollup_upsert('list', 'validations', row, day, sign, validated)
+    elif table == 'validation':
+        day = rollup_scan_day(row)
+        sql = rollup_upsert('list', 'validations', row, day, sign)
+    else:
+        day = f"date({row}.timestamp)"
+        sql = rollup_upsert('battery_list', 'battery_scans', row, day, sign)
+    return f"{sql} {rollup_cleanup(day)}" if sign < 0 else sql
+
+# Columns whose change moves a row to another rollup
+ROLLUP_TABLES = [('scan', 'list_id, normalized_id, timestamp'), ('validation', 'list_id, normalized_id'), ('battery_scan', 'list_id, timestamp')]
+
+# Function to build the triggers that keep the rollups in step with a table
+def rollup_triggers(table, columns):
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_rollup_insert AFTER INSERT ON {table} BEGIN {rollup_change(table, 'NEW', 1)} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_rollup_delete AFTER DELETE ON {table} BEGIN {rollup_change(table, 'OLD', -1)} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_rollup_update AFTER UPDATE OF {columns} ON {table} BEGIN "
+        f"{rollup_change(table, 'OLD', -1)} {rollup_change(table, 'NEW', 1)} END",
+    ]
+
+# Function to build the trigger that moves a list's counts when its warehouse changes
+def rollup_warehouse_trigger(list_table, moves):
+    statements = []
+    for table, column, condition in moves:
+        for warehouse, sign in (('OLD', '-'), ('NEW', '')):
+            statements.append(f"INSERT INTO warehouse_daily_rollup (warehouse, day, {column}) "
+                              f"SELECT COALESCE({warehouse}.warehouse, ''), date(timestamp), {sign}count(*) FROM {table} "
+                              f"WHERE list_id = NEW.id AND timestamp IS NOT NULL {condition}GROUP BY date(timestamp) "
+                              f"ON CONFLICT (warehouse, day) DO UPDATE SET {column} = {column} + excluded.{column};")
+    statements.append("DELETE FROM warehouse_daily_rollup WHERE warehouse = COALESCE(OLD.warehouse, '') "
+                      "AND scans = 0 AND validations = 0 AND battery_scans = 0;")
+    return (f"CREATE TRIGGER IF NOT EXISTS {list_table}_rollup_warehouse AFTER UPDATE OF warehouse ON {list_table} "
+            f"WHEN OLD.warehouse IS NOT NEW.warehouse BEGIN {' '.join(statements)} END")
+
+ROLLUP_TRIGGERS = [trigger_sql for table, columns in ROLLUP_TABLES for trigger_sql in rollup_triggers(table, columns)] + [
+    rollup_warehouse_trigger('list', [
+        ('scan', 'scans', ''),
+        ('scan', 'validations', "AND EXISTS (SELECT 1 FROM validation WHERE validation.list_id = scan.list_id AND validation.normalized_id = scan.normalized_id) "),
+    ]),
+    rollup_warehouse_trigger('battery_list', [('battery_scan', 'battery_scans', '')]),
+]
+
+for trigger_sql in ROLLUP_TRIGGERS:
+    event.listen(db.metadata, 'after_create', DDL(trigger_sql).execute_if(dialect='sqlite'))
+
+# Cold archive: a list moved out of the hot tables. Its scans and validations live in a
+# compressed file under ARCHIVE_DIR; only this summary and a scooter ID index stay in the database.
+class ArchivedList(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    list_id = db.Column(db.Integer, index=True)  # ID the list had while it was live
+    name = db.Column(db.String(100))
+    warehouse = db.Column(db.String(100))
+    timestamp = db.Column(db.DateTime)
+    validation_timestamp = db.Column(db.DateTime)
+    scan_count = db.Column(db.Integer, nullable=False, default=0)
+    validation_count = db.Column(db.Integer, nullable=False, default=0)
+    archive_file = db.Column(db.String(255), nullable=False)  # Relative to ARCHIVE_DIR
+    archived_at = db.Column(db.DateTime, default=get_local_time)
+    scooters = db.relationship('ArchivedScooter', backref='archived_list', lazy=True, cascade='all, delete-orphan')
+
+# Search index of archived scans: which archived lists contain a normalized scooter ID
+class ArchivedScooter(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    normalized_id = db.Column(db.String(200), nullable=False, index=True)
+    is_validated = db.Column(db.Boolean, nullable=False, default=False)
+    archived_list_id = db.Column(db.Integer, db.ForeignKey('archived_list.id'), nullable=False, index=True)
+
+# Background job (exports and reports run off the request workers); the artifact is kept for download
+class Job(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text)  # JSON
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, finished, failed
+    progress = db.Column(db.Integer, nullable=False, default=0)  # Rows written
+    total = db.Column(db.Integer)  # Rows expected, when known
+    artifact = db.Column(db.String(255))  # Relative to JOB_ARTIFACT_DIR
+    download_name = db.Column(db.String(255))
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=get_utc_time, index=True)  # UTC
+    started_at = db.Column(db.DateTime)  # UTC
+    finished_at = db.Column(db.DateTime)  # UTC
+
+# Function to find a scan in a list by scooter ID (single index lookup)
+def find_scan(list_id, scooter_id):
+    return Scan.query.filter_by(list_id=list_id, normalized_id=normalize_scooter_id(scooter_id)).first()
+
+# Function to filter an indexed string column on a prefix as an index range scan
+def prefix_range(column, prefix):
+    # Every string starting with the prefix sorts between the prefix and the prefix with its last character incremented
+    upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return db.and_(column >= prefix, column < upper_bound)
+
+# Function to find the scans of a list whose normalized ID ends with a suffix (indexed range scan)
+def find_scans_by_suffix(list_id, suffix, limit=SUFFIX_MATCH_LIMIT):
+    reversed_prefix = normalize_scooter_id(suffix)[::-1]
+    if not reversed_prefix:
+        return []
+    return (Scan.query
+            .filter(Scan.list_id == list_id, prefix_range(Scan.reversed_id, reversed_prefix))
+            .order_by(Scan.reversed_id)
+            .limit(limit)
+            .all())
+
+# Function to find a validation in a list by scooter ID (single index lookup)
+def find_validation(list_id, scooter_id):
+    return Validation.query.filter_by(list_id=list_id, normalized_id=normalize_scooter_id(scooter_id)).first()
+
+# Function to find a battery scan in a list by battery ID (single index lookup)
+def find_battery_scan(list_id, battery_id):
+    return BatteryScan.query.filter_by(list_id=list_id, normalized_id=normalize_battery_id(battery_id)).first()
+
+# Function to load the normalized IDs of a list that already exist in a table
+def existing_normalized_ids(model, list_id, normalized_ids):
+    existing = set()
+    for chunk in chunked(list(normalized_ids)):
+        rows = db.session.query(model.normalized_id).filter(model.list_id == list_id, model.normalized_id.in_(chunk))
+        existing.update(row.normalized_id for row in rows)
+    return existing
+
+# Function to insert a batch of scooter scans into a list in one transaction
+def ingest_scan_batch(list_id, scooter_ids, keys=None):
+    hot_debug("Ingesting batch of %s scans into list %s", len(scooter_ids), list_id)
+    normalized_ids = [normalize_scooter_id(scooter_id) for scooter_id in scooter_ids]
+    # Duplicates against the DB and within the batch share one set
+    seen = existing_normalized_ids(Scan, list_id, {normalized_id for normalized_id in normalized_ids if is_valid_scooter_id(normalized_id)})
+
+    results = []
+    new_scans = []
+    for scooter_id, normalized_id, key in zip(scooter_ids, normalized_ids, keys or [None] * len(scooter_ids)):
+        if not is_valid_scooter_id(normalized_id):
+            results.append({'scooter_id': scooter_id, 'status': 'invalid'})
+        elif normalized_id in seen:
+            results.append({'scooter_id': scooter_id, 'status': 'duplicate'})
+        else:
+            seen.add(normalized_id)
+            result = {'scooter_id': scooter_id, 'status': 'success'}
+            new_scans.append((result, Scan(scooter_id=scooter_id, list_id=list_id, idempotency_key=key)))
+            results.append(result)
+    db.session.add_all(scan for result, scan in new_scans)
+    # IDs are read after the flush; after the commit every scan would be reloaded one by one
+    db.session.flush()
+    for result, scan in new_scans:
+        result['scan_id'] = scan.id
+    db.session.commit()
+    return results
+
+# Function to insert a batch of validations into a list in one transaction
+def ingest_validation_batch(list_id, scooter_ids, keys=None):
+    hot_debug("Ingesting batch of %s validations into list %s", len(scooter_ids), list_id)
+    normalized_ids = [normalize_scooter_id(scooter_id or '') for scooter_id in scooter_ids]
+    # Original scans of the list, looked up by normalized ID
+    original_scans = {}
+    for chunk in chunked(list(set(normalized_ids))):
+        for scan in Scan.query.filter(Scan.list_id == list_id, Scan.normalized_id.in_(chunk)):
+            original_scans[scan.normalized_id] = scan
+    existing = existing_normalized_ids(Validation, list_id, original_scans)
+
+    results = []
+    new_validations = []
+    for scooter_id, normalized_id, key in zip(scooter_ids, normalized_ids, keys or [None] * len(scooter_ids)):
+        original_scan = original_scans.get(normalized_id)
+        if not original_scan:
+            results.append({'scooter_id': scooter_id, 'status': 'not_in_list'})
+        elif normalized_id in existing:
+            results.append({'scooter_id': scooter_id, 'status': 'duplicate'})
+        else:
+            existing.add(normalized_id)
+            new_validations.append(Validation(scooter_id=original_scan.scooter_id, list_id=list_id, is_valid=True, idempotency_key=key))
+            results.append({'scooter_id': scooter_id, 'normalized_id': normalized_id, 'status': 'success'})
+    db.session.add_all(new_validations)
+    db.session.commit()
+    return results
+
+# Function to insert a batch of battery scans into a list in one transaction
+def ingest_battery_scan_batch(list_id, battery_ids, keys=None):
+    hot_debug("Ingesting batch of %s battery scans into list %s", len(battery_ids), list_id)
+    normalized_ids = [normalize_battery_id(battery_id) for battery_id in battery_ids]
+    # Duplicates against the DB and within the batch share one set
+    seen = existing_normalized_ids(BatteryScan, list_id, set(normalized_ids))
+
+    results = []
+    new_scans = []
+    for battery_id, normalized_id, key in zip(battery_ids, normalized_ids, keys or [None] * len(battery_ids)):
+        if normalized_id in seen:
+            results.append({'battery_id': battery_id, 'status': 'duplicate'})
+        else:
+            seen.add(normalized_id)
+            result = {'battery_id': battery_id, 'status': 'success'}
+            new_scans.append((result, BatteryScan(battery_id=battery_id, list_id=list_id, idempotency_key=key)))
+            results.append(result)
+    db.session.add_all(scan for result, scan in new_scans)
+    # IDs are read after the flush; after the commit every scan would be reloaded one by one
+    db.session.flush()
+    for result, scan in new_scans:
+        result['scan_id'] = scan.id
+    db.session.commit()
+    return results
+
+# Function to retry a batch once if a concurrent write caused a unique constraint violation
+def run_batch(ingest, list_id, ids, keys=None):
+    try:
+        return ingest(list_id, ids, keys)
+    except IntegrityError:
+        db.session.rollback()
+        hot_debug("Concurrent write while ingesting batch into list %s, retrying.", list_id)
+        return ingest(list_id, ids, keys)
+
+# Function to read and check the ID array of a batch request
+def get_batch_ids(data, key):
+    ids = data.get(key)
+    if not isinstance(ids, list) or len(ids) > MAX_BATCH_SIZE:
+        return None
+    return [str(item).strip() if item is not None else '' for item in ids]
+
+# Function to read the optional per-item idempotency keys of a batch request ([] when absent, None when malformed)
+def get_batch_keys(data, count):
+    keys = data.get('idempotency_keys')
+    if keys is None:
+        return []
+    if not isinstance(keys, list) or len(keys) != count:
+        return None
+    if not all(key is None or (isinstance(key, str) and len(key) <= IDEMPOTENCY_KEY_MAX_LENGTH) for key in keys):
+        return None
+    # A key repeated within the batch belongs to its first item only
+    seen = set()
+    return [key if key not in seen and not seen.add(key) else None for key in keys]
+
+# Function to run a batch where items whose idempotency key is already stored on a row get that row's
+# result back instead of being ingested again (they would come back as 'duplicate')
+def run_keyed_batch(model, id_field, ingest, list_id, ids, keys):
+    if not any(keys):
+        return run_batch(ingest, list_id, ids)
+    applied = {}
+    for chunk in chunked([key for key in keys if key]):
+        applied.update((row.idempotency_key, row) for row in model.query.filter(model.idempotency_key.in_(chunk)))
+    results = [None] * len(ids)
+    for index, key in enumerate(keys):
+        row = applied.get(key)
+        if row is not None:
+            # Already applied (and published) by an earlier attempt
+            results[index] = {id_field: ids[index], 'status': 'success', 'replayed': True}
+            if model is Validation:
+                results[index]['normalized_id'] = row.normalized_id
+            else:
+                results[index]['scan_id'] = row.id
+    pending = [index for index, result in enumerate(results) if result is None]
+    if pending:
+        ingested = run_batch(ingest, list_id, [ids[index] for index in pending], [keys[index] for index in pending])
+        for index, result in zip(pending, ingested):
+            results[index] = result
+    hot_debug("Batch of %s items into list %s: %s answered from their idempotency keys.", len(ids), list_id, len(ids) - len(pending))
+    return results
+
+# Function to reconcile a list's scans against its validations in linear time
+def reconcile_list(list_id):
+    logging.debug(f"Reconciling scans and validations for list {list_id}")
+    scans = Scan.query.filter_by(list_id=list_id).order_by(Scan.id).all()
+    validations = Validation.query.filter_by(list_id=list_id).order_by(Validation.id).all()
+    # Hash sets of normalized IDs, built once
+    scanned_ids = {scan.normalized_id for scan in scans}
+    validated_ids = {validation.normalized_id for validation in validations}
+    return {
+        'scans': scans,
+        'validations': validations,
+        'validated': [scan for scan in scans if scan.normalized_id in validated_ids],
+        'missing': [scan for scan in scans if scan.normalized_id not in validated_ids],
+        # Validations whose scan has since been deleted from the list
+        'unexpected': [validation for validation in validations if validation.normalized_id not in scanned_ids],
+        'validated_ids': validated_ids,
+    }
+
+# Function to load lists together with their scan and validation totals (the list counters)
+def lists_with_counts(list_query):
+    all_lists = list_query.all()
+    for lst in all_lists:
+        lst.total_scans = lst.scan_count
+        lst.total_validations = lst.validated_count
+    return all_lists
+
+# Function to prepare the list of scooters with validation status for the templates
+def scooters_with_validation_status(reconciliation):
+    validated_ids = reconciliation['validated_ids']
+    return [{
+        'scooter_id': scan.scooter_id,
+        'short_id': scan.normalized_id,  # IDs are displayed normalized
+        'is_validated': scan.normalized_id in validated_ids
+    } for scan in reconciliation['scans']]
+
+# Function to read the cursor and page size of a paginated list request
+def get_page_arguments():
+    after_id = max(request.args.get('after', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', LIST_PAGE_SIZE, type=int), 1), MAX_LIST_PAGE_SIZE)
+    return after_id, limit
+
+# Function to load one page of a list's scans with their validation status, keyed on the scan id
+def scan_page(list_id, after_id, limit, status='all'):
+    query = (db.session.query(Scan.id, Scan.scooter_id, Scan.normalized_id, Scan.timestamp, Validation.id.isnot(None))
+             .outerjoin(Validation, db.and_(Validation.list_id == Scan.list_id, Validation.normalized_id == Scan.normalized_id))
+             .filter(Scan.list_id == list_id, Scan.id > after_id))
+    if status == 'validated':
+        query = query.filter(Validation.id.isnot(None))
+    elif status == 'missing':
+        query = query.filter(Validation.id.is_(None))
+    # One extra row tells whether another page follows
+    rows = query.order_by(Scan.id).limit(limit + 1).all()
+    items = [{
+        'id': scan_id,
+        'scooter_id': scooter_id,
+        'short_id': normalized_id,
+        'timestamp': timestamp.isoformat() if timestamp else None,
+        'is_validated': bool(is_validated)
+    } for scan_id, scooter_id, normalized_id, timestamp, is_validated in rows[:limit]]
+    next_cursor = items[-1]['id'] if len(rows) > limit else None
+    return items, next_cursor
+
+# Function to load one page of a battery list's scans, keyed on the scan id
+def battery_scan_page(list_id, after_id, limit):
+    rows = (db.session.query(BatteryScan.id, BatteryScan.battery_id, BatteryScan.timestamp)
+            .filter(BatteryScan.list_id == list_id, BatteryScan.id > after_id)
+            .order_by(BatteryScan.id)
+            .limit(limit + 1)
+            .all())
+    items = [{
+        'id': scan_id,
+        'battery_id': battery_id,
+        'timestamp': timestamp.isoformat() if timestamp else None
+    } for scan_id, battery_id, timestamp in rows[:limit]]
+    next_cursor = items[-1]['id'] if len(rows) > limit else None
+    return items, next_cursor
+
+# Function to get the latest change sequence number of a list (0 before its first change)
+def current_change_seq(list_id):
+    return db.session.query(db.func.max(ListChange.seq)).filter(ListChange.list_id == list_id).scalar() or 0
+
+# Function to load the changes of a list after a sequence number, oldest first
+def change_page(list_id, since, limit):
+    # One extra row tells whether more changes follow
+    rows = (ListChange.query
+            .filter(ListChange.list_id == list_id, ListChange.seq > since)
+            .order_by(ListChange.seq)
+            .limit(limit + 1)
+            .all())
+    changes = [{
+        'seq': change.seq,
+        'type': change.item_type,
+        'op': change.op,
+        'id': change.row_id,
+        'scooter_id': change.scooter_id,
+        'short_id': change.normalized_id,
+        'timestamp': change.timestamp.isoformat() if change.timestamp else None
+    } for change in rows[:limit]]
+    next_since = changes[-1]['seq'] if changes else since
+    return changes, next_since, len(rows) > limit
+
+# Global ID search
+
+# Function to read the distinct IDs of an indexed column that start with a prefix, in index order
+# (one more than a search returns, which tells whether the results were cut off)
+def ids_with_prefix(column, prefix, limit=SEARCH_RESULT_LIMIT + 1):
+    query = db.session.query(column).filter(prefix_range(column, prefix)).distinct().order_by(column).limit(limit)
+    return [value for (value,) in query]
+
+# Function to collect the lists an ID appears in, most recent first: {id: [list, ...]}
+def id_locations(id_column, list_model, join_condition, ids, url, archived=False):
+    locations = defaultdict(list)
+    rows = (db.session.query(id_column, list_model.id, list_model.name, list_model.warehouse, list_model.timestamp)
+            .join(list_model, join_condition)
+            .filter(id_column.in_(ids))
+            .order_by(list_model.timestamp.desc(), list_model.id.desc()))
+    for normalized_id, list_id, name, warehouse, timestamp in rows:
+        locations[normalized_id].append({
+            'list_id': list_id,
+            'name': name,
+            'warehouse': warehouse,
+            'timestamp': timestamp.isoformat() if timestamp else None,
+            'archived': archived,
+            'url': url(list_id, normalized_id)
+        })
+    return locations
+
+# Function to search scooter and battery IDs across all lists (archived scooter lists included) by prefix
+def search_ids(query, search_type='all'):
+    candidates = []
+    if search_type in ('all', 'scooter'):
+        prefix = normalize_scooter_id(query)
+        if len(prefix) >= SEARCH_MIN_PREFIX:
+            # Distinct IDs come straight from the duplicate index and the archive's ID index
+            ids = sorted(set(ids_with_prefix(ScooterOccurrence.normalized_id, prefix)) | set(ids_with_prefix(ArchivedScooter.normalized_id, prefix)))
+            ids = ids[:SEARCH_RESULT_LIMIT + 1]
+            locations = id_locations(Scan.normalized_id, List, Scan.list_id == List.id, ids,
+                                     lambda list_id, normalized_id: f'/list/{list_id}')
+            archived = id_locations(ArchivedScooter.normalized_id, ArchivedList, ArchivedScooter.archived_list_id == ArchivedList.id, ids,
+                                    lambda list_id, normalized_id: f'/archive?scooter_id={normalized_id}', archived=True)
+            candidates.extend(('scooter', normalized_id, prefix, locations[normalized_id] + archived[normalized_id]) for normalized_id in ids)
+    if search_type in ('all', 'battery'):
+        prefix = normalize_battery_id(query)
+        if len(prefix) >= SEARCH_MIN_PREFIX:
+            ids = ids_with_prefix(BatteryScan.normalized_id, prefix)
+            locations = id_locations(BatteryScan.normalized_id, BatteryList, BatteryScan.list_id == BatteryList.id, ids,
+                                     lambda list_id, normalized_id: f'/battery_list/{list_id}')
+            candidates.extend(('battery', normalized_id, prefix, locations[normalized_id]) for normalized_id in ids)
+
+    results = [{
+        'type': id_type,
+        'id': normalized_id,
+        'exact': normalized_id == prefix,
+        'list_count': len(lists),
+        'lists': lists[:SEARCH_LISTS_PER_ID]
+    } for id_type, normalized_id, prefix, lists in candidates]
+    # Exact matches first, then the IDs seen most recently, then alphabetically
+    results.sort(key=lambda result: result['id'])
+    results.sort(key=lambda result: max((entry['timestamp'] or '' for entry in result['lists']), default=''), reverse=True)
+    results.sort(key=lambda result: not result['exact'])
+    return results[:SEARCH_RESULT_LIMIT], len(results) > SEARCH_RESULT_LIMIT
+
+# Live validation events (Server-Sent Events)
+
+# Seconds between keepalive comments, and events buffered per connected device
+SSE_KEEPALIVE_SECONDS = 15
+SSE_QUEUE_SIZE = 100
+
+list_subscribers = defaultdict(set)
+subscribers_lock = threading.Lock()
+
+# Function to broadcast an event to every device following a list
+def publish_list_event(list_id, event_type, payload):
+    message = f'event: {event_type}\ndata: {json.dumps(payload)}\n\n'
+    with subscribers_lock:
+        subscribers = list(list_subscribers.get(list_id, ()))
+    for subscriber in subscribers:
+        try:
+            subscriber.put_nowait(message)
+        except queue.Full:
+            # Slow device; every event carries the totals, so it catches up with the next one
+            pass
+
+# Function to read the validated and total scooters of a list from its counters (one primary key lookup)
+def validation_totals(list_id):
+    totals = db.session.query(List.validated_count, List.scan_count).filter(List.id == list_id).first()
+    return tuple(totals) if totals else (0, 0)
+
+# Function to publish a validation change with the list's running totals
+def publish_validation_change(list_id, event_type, scooter_ids, total_validated=None, total_scooters=None):
+    if total_validated is None:
+        total_validated, total_scooters = validation_totals(list_id)
+    publish_list_event(list_id, event_type, {'scooter_ids': scooter_ids, 'total_validated': total_validated, 'total_scooters': total_scooters})
+
+# Request metrics
+
+metrics_lock = threading.Lock()
+
+# Function to create the metrics record of one endpoint
+def new_endpoint_metrics():
+    return {
+        'requests': 0,
+        'latency_buckets': [0] * len(LATENCY_BUCKETS_MS),
+        'latency_sum_ms': 0.0,
+        'latency_samples': deque(maxlen=LATENCY_SAMPLE_SIZE),
+        'sql_statements': 0,
+        'rows_loaded': 0,
+        'response_bytes': 0,
+    }
+
+endpoint_metrics = defaultdict(new_endpoint_metrics)
+
+# Function to log a debug message from the hot write paths. Unless debug logging is on and this
+# request was sampled, nothing is formatted and no log record is created; pass values as %s args
+def hot_debug(message, *args):
+    if not has_request_context() or g.get('debug_logging', True):
+        logging.debug(message, *args)
+
+# Count every SQL statement issued while handling a request
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_sql_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_statements' in g:
+        g.sql_statements += 1
+
+# Count every ORM row loaded while handling a request
+@event.listens_for(db.Model, 'load', propagate=True)
+def count_loaded_row(target, context):
+    if has_request_context() and 'rows_loaded' in g:
+        g.rows_loaded += 1
+
+# Database schema check: the schema is no longer created at import time, so a database that was not
+# migrated (e.g. the bundled scooters.db before `flask db upgrade`) is reported instead of failing on every query
+schema_is_current = False
+
+# Function to read the database's migration revision and the latest one in migrations/
+def schema_revisions():
+    from alembic.migration import MigrationContext  # Deferred so alembic stays off the cold start path
+    from alembic.script import ScriptDirectory
+    head = ScriptDirectory.from_config(migrate.get_config()).get_current_head()
+    with db.engine.connect() as connection:
+        current = MigrationContext.configure(connection).get_current_revision()
+    return current, head
+
+# Function to describe how to bring the schema up to date, or None when it is current
+def schema_problem():
+    current, head = schema_revisions()
+    if current == head:
+        return None
+    if current is None:
+        return f'Database has no schema revision (latest is {head}). Run `flask init-db` for a new database or `flask db upgrade` for an existing one.'
+    return f'Database schema is at revision {current}, the app needs {head}. Run `flask db upgrade`.'
+
+@app.before_request
+def require_current_schema():
+    global schema_is_current
+    if schema_is_current:
+        return None
+    problem = schema_problem()
+    if problem is None:
+        # Checked once per process; migrations are applied before the app is (re)started
+        schema_is_current = True
+        return None
+    logging.error(problem)
+    return Response(problem, status=503, mimetype='text/plain')
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    g.sql_statements = 0
+    g.rows_loaded = 0
+    g.debug_logging = logging.getLogger().isEnabledFor(logging.DEBUG) and (
+        request.endpoint not in HOT_ENDPOINTS or random.random() < app.config['DEBUG_LOG_SAMPLE_RATE'])
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_start' not in g:
+        return response
+    elapsed_ms = (time.perf_counter() - g.request_start) * 1000
+    # Streamed responses have no length up front and are not counted
+    response_bytes = response.content_length or 0
+    with metrics_lock:
+        metrics = endpoint_metrics[request.endpoint or 'unknown']
+        metrics['requests'] += 1
+        metrics['latency_sum_ms'] += elapsed_ms
+        metrics['latency_samples'].append(elapsed_ms)
+        for index, bucket in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bucket:
+                metrics['latency_buckets'][index] += 1
+        metrics['sql_statements'] += g.sql_statements
+        metrics['rows_loaded'] += g.rows_loaded
+        metrics['response_bytes'] += response_bytes
+    return response
+
+# Function to get a percentile from a list of sorted samples
+def percentile(sorted_samples, fraction):
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(len(sorted_samples) - 1, int(fraction * len(sorted_samples)))]
+
+# Function to render the endpoint metrics in the Prometheus text format
+def render_metrics():
+    lines = [
+        '# HELP scanner_request_latency_ms Request latency in milliseconds.',
+        '# TYPE scanner_request_latency_ms histogram',
+    ]
+    with metrics_lock:
+        snapshot = {endpoint: dict(metrics, latency_samples=sorted(metrics['latency_samples'])) for endpoint, metrics in endpoint_metrics.items()}
+    for endpoint, metrics in sorted(snapshot.items()):
+        for bucket, count in zip(LATENCY_BUCKETS_MS, metrics['latency_buckets']):
+            lines.append(f'scanner_request_latency_ms_bucket{{endpoint="{endpoint}",le="{bucket}"}} {count}')
+        lines.append(f'scanner_request_latency_ms_bucket{{endpoint="{endpoint}",le="+Inf"}} {metrics["requests"]}')
+        lines.append(f'scanner_request_latency_ms_sum{{endpoint="{endpoint}"}} {metrics["latency_sum_ms"]:.3f}')
+        lines.append(f'scanner_request_latency_ms_count{{endpoint="{endpoint}"}} {metrics["requests"]}')
+    counters = [
+        ('scanner_request_latency_quantile_ms', 'gauge', f'Latency percentiles over the last {LATENCY_SAMPLE_SIZE} requests.', None),
+        ('scanner_sql_statements_total', 'counter', 'SQL statements issued.', 'sql_statements'),
+        ('scanner_rows_loaded_total', 'counter', 'ORM rows loaded.', 'rows_loaded'),
+        ('scanner_response_bytes_total', 'counter', 'Response bytes sent (non-streamed responses).', 'response_bytes'),
+    ]
+    for name, metric_type, description, key in counters:
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for endpoint, metrics in sorted(snapshot.items()):
+            if key is None:
+                for quantile in (0.5, 0.95, 0.99):
+                    value = percentile(metrics['latency_samples'], quantile)
+                    lines.append(f'{name}{{endpoint="{endpoint}",quantile="{quantile}"}} {value:.3f}')
+            else:
+                lines.append(f'{name}{{endpoint="{endpoint}"}} {metrics[key]}')
+    return '\n'.join(lines) + '\n'
+
+@app.route('/metrics')
+def metrics():
+    if not app.config['METRICS_ALLOW_REMOTE'] and request.remote_addr not in ('127.0.0.1', '::1'):
+        return 'Metrics are only available locally.', 403
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+# Export helpers
+
+# Function to format a minute for exports; scans arrive in bursts, so most rows hit the cache
+@lru_cache(maxsize=4096)
+def format_export_minute(minute):
+    return minute.astimezone(local_tz).strftime(EXPORT_TIMESTAMP_FORMAT)
+
+# Function to format a timestamp for exports
+def format_export_timestamp(timestamp):
+    if timestamp is None:
+        return ''
+    return format_export_minute(timestamp.replace(second=0, microsecond=0))
+
+# Function to stream the export rows of a scooter list straight from a DB cursor
+def list_export_rows(list_id):
+    query = db.session.query(Scan.normalized_id, Scan.timestamp).filter(Scan.list_id == list_id)
+    # Once a list has validations, only validated scooters are exported
+    if db.session.query(Validation.query.filter_by(list_id=list_id).exists()).scalar():
+        logging.debug(f"Validations found for list {list_id}. Exporting only validated scooters.")
+        query = query.join(Validation, db.and_(Validation.list_id == Scan.list_id, Validation.normalized_id == Scan.normalized_id))
+    for scooter_id, timestamp in query.order_by(Scan.id).yield_per(EXPORT_CHUNK_SIZE):
+        yield (scooter_id, format_export_timestamp(timestamp))
+
+# Function to stream the export rows of a battery list straight from a DB cursor
+def battery_export_rows(list_id):
+    query = db.session.query(BatteryScan.battery_id, BatteryScan.timestamp).filter(BatteryScan.list_id == list_id)
+    for battery_id, timestamp in query.order_by(BatteryScan.id).yield_per(EXPORT_CHUNK_SIZE):
+        yield (battery_id, format_export_timestamp(timestamp))
+
+# Function to stream duplicated scooters with their list names from the duplicate index
+def duplicate_export_rows():
+    rows = (db.session.query(ScooterOccurrence.normalized_id, ScooterOccurrence.scan_count, List.name)
+            .filter(ScooterOccurrence.scan_count > 1)
+            .join(Scan, Scan.normalized_id == ScooterOccurrence.normalized_id)
+            .join(List, Scan.list_id == List.id)
+            .order_by(ScooterOccurrence.normalized_id)
+            .yield_per(EXPORT_CHUNK_SIZE))
+    for (scooter_id, occurrences), group in groupby(rows, key=lambda row: (row.normalized_id, row.scan_count)):
+        yield (scooter_id, occurrences, ', '.join(sorted(set(row.name for row in group))))
+
+# Function to rank the scans of every duplicated scooter under a resolution policy (rank 1 is kept)
+def ranked_duplicate_scans(policy, warehouse=None):
+    in_warehouse = db.case((List.warehouse == warehouse, 1), else_=0)
+    order_by = {
+        'keep_earliest': [Scan.timestamp, Scan.id],
+        'keep_newest_list': [List.timestamp.desc(), List.id.desc()],
+        'keep_warehouse': [in_warehouse.desc(), Scan.timestamp, Scan.id],
+    }[policy]
+    ranked = (db.session.query(
+                  Scan.id.label('scan_id'),
+                  Scan.normalized_id,
+                  List.id.label('list_id'),
+                  List.name,
+                  List.warehouse,
+                  db.func.row_number().over(partition_by=Scan.normalized_id, order_by=order_by).label('rank'),
+                  db.func.max(in_warehouse).over(partition_by=Scan.normalized_id).label('has_warehouse'))
+              .join(List, Scan.list_id == List.id)
+              # Only scooters the duplicate index reports, matched exactly on the normalized ID
+              .join(ScooterOccurrence, ScooterOccurrence.normalized_id == Scan.normalized_id)
+              .filter(ScooterOccurrence.scan_count > 1)
+              .subquery())
+    # Scooters never scanned in the chosen warehouse are left alone
+    groups = ranked.c.has_warehouse == 1 if policy == 'keep_warehouse' else db.true()
+    return ranked, groups
+
+# Function to preview or apply a duplicate resolution policy to every duplicated scooter at once
+def resolve_duplicates(policy, warehouse=None, dry_run=True):
+    ranked, groups = ranked_duplicate_scans(policy, warehouse)
+    removed_scans = db.select(ranked.c.scan_id).where(groups, ranked.c.rank > 1)
+    group_count = db.session.query(db.func.count(db.distinct(ranked.c.normalized_id))).filter(groups).scalar()
+    removed_count = db.session.query(db.func.count()).select_from(removed_scans.subquery()).scalar()
+
+    # The first groups, kept scan first, so the dispatcher can check the policy does what they expect
+    preview_ids = (db.select(ranked.c.normalized_id).where(groups).distinct()
+                   .order_by(ranked.c.normalized_id).limit(DUPLICATES_PER_PAGE))
+    preview = []
+    rows = (db.session.query(ranked.c.normalized_id, ranked.c.rank, ranked.c.list_id, ranked.c.name, ranked.c.warehouse)
+            .filter(ranked.c.normalized_id.in_(preview_ids))
+            .order_by(ranked.c.normalized_id, ranked.c.rank))
+    for normalized_id, group in groupby(rows, key=lambda row: row.normalized_id):
+        group = [{'list_id': row.list_id, 'name': row.name, 'warehouse': row.warehouse} for row in group]
+        preview.append({'scooter_id': normalized_id, 'keep': group[0], 'remove': group[1:]})
+
+    if not dry_run and removed_count:
+        # One set-based DELETE; the scan triggers update the duplicate index, revisions and change feeds
+        Scan.query.filter(Scan.id.in_(removed_scans)).delete(synchronize_session=False)
+        db.session.commit()
+        logging.debug(f"Resolved {group_count} duplicated scooters with {policy}: {removed_count} scans removed.")
+    return {'groups': group_count, 'removed': removed_count, 'preview': preview}
+
+# Function to query battery IDs scanned in more than one list, aggregated over the normalized ID index
+def battery_duplicate_counts():
+    scan_count = db.func.count(BatteryScan.id).label('scan_count')
+    return (db.session.query(BatteryScan.normalized_id, scan_count)
+            .group_by(BatteryScan.normalized_id)
+            .having(scan_count > 1)
+            .order_by(BatteryScan.normalized_id))
+
+# Function to stream the battery duplicate report rows, one per battery ID
+def battery_duplicate_export_rows():
+    duplicates = battery_duplicate_counts().subquery()
+    rows = (db.session.query(duplicates.c.normalized_id, duplicates.c.scan_count, BatteryList.name)
+            .join(BatteryScan, BatteryScan.normalized_id == duplicates.c.normalized_id)
+            .join(BatteryList, BatteryScan.list_id == BatteryList.id)
+            .order_by(duplicates.c.normalized_id)
+            .yield_per(EXPORT_CHUNK_SIZE))
+    for (battery_id, occurrences), group in groupby(rows, key=lambda row: (row.normalized_id, row.scan_count)):
+        yield (battery_id, occurrences, ', '.join(sorted(set(row.name for row in group))))
+
+# Function to build a valid, unique Excel sheet name
+def excel_sheet_name(name, used_names):
+    name = ''.join('_' if char in '[]:*?/\\' else char for char in (name or 'Sheet'))[:31] or 'Sheet'
+    candidate = name
+    suffix = 2
+    while candidate.lower() in used_names:
+        candidate = f'{name[:31 - len(str(suffix)) - 1]}_{suffix}'
+        suffix += 1
+    used_names.add(candidate.lower())
+    return candidate
+
+# Function to write sheets of (name, headers, rows) into an xlsx file in constant memory
+def write_xlsx(sheets, output=None):
+    import xlsxwriter  # Deferred so the export stack stays off the cold start path
+    if output is None:
+        output = tempfile.TemporaryFile()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    used_names = set()
+    for sheet_name, headers, rows in sheets:
+        worksheet = workbook.add_worksheet(excel_sheet_name(sheet_name, used_names))
+        worksheet.write_row(0, 0, headers)
+        for row_number, row in enumerate(rows, start=1):
+            worksheet.write_row(row_number, 0, row)
+    workbook.close()
+    if hasattr(output, 'seek'):
+        output.seek(0)
+    return output
+
+# Function to drop the least recently used cached exports until the cache fits its size limit
+def evict_export_cache():
+    cache_dir = app.config['EXPORT_CACHE_DIR']
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith('.xlsx'):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total_bytes = sum(size for mtime, size, path in entries)
+    for mtime, size, path in sorted(entries):
+        if total_bytes <= app.config['EXPORT_CACHE_MAX_BYTES']:
+            break
+        try:
+            os.remove(path)
+            logging.debug(f"Evicted cached export {path}")
+        except FileNotFoundError:
+            pass
+        total_bytes -= size
+
+# Function to build the path of a cached export
+def export_cache_path(cache_key):
+    return os.path.join(app.config['EXPORT_CACHE_DIR'], f'{cache_key}.xlsx')
+
+# Function to build the export cache key of a list's current revision in the current export format
+def export_cache_key(lst):
+    return f"{lst.__tablename__.replace('_', '-')}-v{EXPORT_FORMAT_VERSION}-{list_revision_key(lst)}"
+
+# Function to open a cached xlsx export, building and caching it on a miss
+def cached_xlsx(cache_key, sheets):
+    cache_dir = app.config['EXPORT_CACHE_DIR']
+    path = export_cache_path(cache_key)
+    try:
+        output = open(path, 'rb')
+        os.utime(path)  # Mark as recently used
+        logging.debug(f"Serving cached export {path}")
+        return output
+    except FileNotFoundError:
+        pass
+    os.makedirs(cache_dir, exist_ok=True)
+    # Build under a temporary name so concurrent readers never see a partial file
+    fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    os.close(fd)
+    try:
+        write_xlsx(sheets(), temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    # Opened before eviction; an open file stays readable even if it is evicted
+    output = open(path, 'rb')
+    evict_export_cache()
+    logging.debug(f"Cached export {path}")
+    return output
+
+# Function to add an export file built by a job to the cache, so the next direct download is a hit
+def store_cached_export(cache_key, source_path):
+    cache_dir = app.config['EXPORT_CACHE_DIR']
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    os.close(fd)
+    try:
+        shutil.copyfile(source_path, temp_path)
+        os.replace(temp_path, export_cache_path(cache_key))
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    evict_export_cache()
+    logging.debug(f"Cached export {cache_key} from {source_path}")
+
+# Function to stream rows as CSV through a generator response
+def csv_response(filename, headers, rows):
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(headers)
+        for row_number, row in enumerate(rows, start=1):
+            writer.writerow(row)
+            if row_number % EXPORT_CHUNK_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        yield buffer.getvalue()
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
+    response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    return response
+
+# Function to send an export as xlsx (default) or CSV (?format=csv); xlsx files with a cache key are cached on disk
+def export_response(filename, headers, rows, cache_key=None):
+    if request.args.get('format') == 'csv':
+        return csv_response(f'{filename}.csv', headers, rows)
+    if cache_key:
+        output = cached_xlsx(cache_key, lambda: [('Sheet1', headers, rows)])
+    else:
+        output = write_xlsx([('Sheet1', headers, rows)])
+    return send_file(output, download_name=f'{filename}.xlsx', as_attachment=True)
+
+# Function to build the key of a list's current revision (changes with every write to the list)
+def list_revision_key(lst):
+    identity = f'{lst.__tablename__}:{lst.id}:{lst.timestamp}:{lst.revision}'
+    return hashlib.sha1(identity.encode()).hexdigest()
+
+# Function to answer a GET for a list with an ETag, or 304 when the client's copy is current.
+# salt tells apart representations of the same revision (format, page, filter).
+# No Last-Modified: it has one-second resolution, so a write in the same second would get a stale 304
+def conditional_list_response(lst, build_response, salt=''):
+    etag = list_revision_key(lst) + salt
+    if request.if_none_match.contains(etag):
+        logging.debug(f"{lst.__tablename__} {lst.id} unchanged at revision {lst.revision}, answering 304.")
+        response = Response(status=304)
+    else:
+        response = make_response(build_response())
+    response.set_etag(etag)
+    # Let clients keep a copy but always revalidate it
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# Function to read the list IDs of a multi-list export
+def get_export_list_ids():
+    list_ids = request.args.getlist('list_ids', type=int)
+    for value in request.args.getlist('ids'):
+        list_ids.extend(int(list_id) for list_id in value.split(',') if list_id.strip().isdigit())
+    return list_ids
+
+# Manifest imports
+
+# Function to turn a spreadsheet cell into an ID string (IDs typed as numbers lose their '.0')
+def manifest_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+# Function to stream the rows of an uploaded xlsx or CSV manifest without loading the whole file
+def manifest_rows(upload):
+    if os.path.splitext(upload.filename or '')[1].lower() == '.xlsx':
+        import openpyxl  # Deferred so the import stack stays off the cold start path
+        # Read-only workbooks parse the sheet row by row
+        workbook = openpyxl.load_workbook(upload.stream, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield [manifest_cell(value) for value in row]
+        finally:
+            workbook.close()
+    else:
+        text = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', errors='replace', newline='')
+        # Spreadsheets exported with a German locale separate columns with semicolons
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        for row in csv.reader(text, dialect):
+            yield [cell.strip() for cell in row]
+
+# Function to tell whether a manifest cell looks like a scooter ID: a valid length and, unlike
+# header words such as "Fahrzeug" (which pass the length check), at least one digit
+def looks_like_scooter_id(value):
+    normalized_id = normalize_scooter_id(value or '')
+    return is_valid_scooter_id(normalized_id) and any(char.isdigit() for char in normalized_id)
+
+# Function to find the ID column from a manifest's first row: (column index or None, whether the row is a header).
+# has_header (None when not given) overrides the detection; sample_rows are the rows that follow the first one
+def manifest_id_column(first_row, sample_rows, column_name=None, has_header=None):
+    headers = [cell.lower() for cell in first_row]
+    if column_name:
+        column_name = column_name.strip().lower()
+        return (headers.index(column_name), True) if column_name in headers else (None, False)
+    for header in IMPORT_ID_HEADERS:
+        if header in headers:
+            return headers.index(header), True
+    # The IDs are in the first column
+    if has_header is not None:
+        return 0, has_header
+    # An unknown header ("Fahrzeug", "Kennung"): the first cell is no ID but most of the next ones look like one
+    samples = [row[0] for row in sample_rows if row and row[0]]
+    is_header = (bool(samples) and not looks_like_scooter_id(first_row[0] if first_row else '')
+                 and sum(looks_like_scooter_id(value) for value in samples) * 2 > len(samples))
+    return 0, is_header
+
+# Function to insert the IDs of numbered manifest rows into a list in chunks, one write transaction per chunk
+def import_manifest(list_id, numbered_rows, column, skipped_header=None):
+    # skipped_header: the first row's cells when it was skipped as a header
+    summary = {'rows': 0, 'imported': 0, 'duplicates': 0, 'rejected_count': 0, 'rejected': [], 'skipped_header': skipped_header}
+    chunk = []
+
+    def flush():
+        # Scanners keep working between chunks; each chunk is one bulk insert
+        with serialized_write_transaction():
+            if not List.query.get(list_id):
+                raise LookupError(f'List {list_id} not found')
+            results = run_batch(ingest_scan_batch, list_id, [value for row_number, value in chunk])
+        for (row_number, value), result in zip(chunk, results):
+            if result['status'] == 'success':
+                summary['imported'] += 1
+                continue
+            if result['status'] == 'duplicate':
+                summary['duplicates'] += 1
+            else:
+                summary['rejected_count'] += 1
+            if len(summary['rejected']) < IMPORT_REJECTED_REPORT_LIMIT:
+                reason = 'invalid_length' if result['status'] == 'invalid' else result['status']
+                summary['rejected'].append({'row': row_number, 'scooter_id': value, 'reason': reason})
+        logging.debug(f"Imported chunk of {len(chunk)} manifest rows into list {list_id}")
+        chunk.clear()
+
+    for row_number, row in numbered_rows:
+        value = row[column] if column < len(row) else ''
+        if not value:
+            continue
+        summary['rows'] += 1
+        chunk.append((row_number, value))
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            flush()
+    if chunk:
+        flush()
+    return summary
+
+# Cold archive
+
+# Function to query the lists ready for archiving: validated, and unchanged since the cutoff (UTC)
+def archivable_lists(cutoff):
+    has_validations = db.session.query(Validation.id).filter(Validation.list_id == List.id).exists()
+    return (List.query
+            .filter(db.or_(List.is_validated == True, has_validations))
+            .filter(db.func.coalesce(List.modified_at, List.timestamp) < cutoff)
+            .order_by(List.id))
+
+# Function to read the rows of a table as columns (one array per column), in ID order
+def archive_columns(model, list_id, columns):
+    values = {column: [] for column in columns}
+    query = db.session.query(*[getattr(model, column) for column in columns]).filter(model.list_id == list_id)
+    for row in query.order_by(model.id).yield_per(EXPORT_CHUNK_SIZE):
+        for column, value in zip(columns, row):
+            values[column].append(value.isoformat() if isinstance(value, datetime) else value)
+    return values
+
+# Function to write a list, its scans and validations to a gzip-compressed columnar JSON file
+def write_list_archive(lst, path):
+    archive = {
+        'format': ARCHIVE_FORMAT_VERSION,
+        'list': {
+            'id': lst.id,
+            'name': lst.name,
+            'warehouse': lst.warehouse,
+            'timestamp': lst.timestamp.isoformat() if lst.timestamp else None,
+            'is_validated': lst.is_validated,
+            'validation_timestamp': lst.validation_timestamp.isoformat() if lst.validation_timestamp else None,
+        },
+        'scans': archive_columns(Scan, lst.id, ['scooter_id', 'normalized_id', 'timestamp']),
+        'validations': archive_columns(Validation, lst.id, ['scooter_id', 'normalized_id', 'timestamp', 'is_valid']),
+    }
+    # Written under a temporary name so a crash never leaves a partial archive behind
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as output:
+            output.write(json.dumps(archive, separators=(',', ':')).encode())
+            output.flush()
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return archive
+
+# Function to move a list out of the hot tables into an archive file (call inside a serialized write)
+def archive_list(lst):
+    list_id = lst.id
+    archive_dir = app.config['ARCHIVE_DIR']
+    os.makedirs(archive_dir, exist_ok=True)
+    archive_file = f'list-{list_id}-{lst.revision}-{get_local_time().strftime("%Y%m%d%H%M%S")}.json.gz'
+    path = os.path.join(archive_dir, archive_file)
+    archive = write_list_archive(lst, path)
+    scans, validations = archive['scans'], archive['validations']
+    validated_ids = set(validations['normalized_id'])
+    try:
+        archived = ArchivedList(list_id=list_id, name=lst.name, warehouse=lst.warehouse, timestamp=lst.timestamp,
+                                validation_timestamp=lst.validation_timestamp, scan_count=len(scans['normalized_id']),
+                                validation_count=len(validations['normalized_id']), archive_file=archive_file)
+        db.session.add(archived)
+        db.session.flush()
+        db.session.bulk_insert_mappings(ArchivedScooter, [
+            {'normalized_id': normalized_id, 'is_validated': normalized_id in validated_ids, 'archived_list_id': archived.id}
+            for normalized_id in scans['normalized_id']
+        ])
+        # Bulk deletes; the scan triggers keep the duplicate index in step
+        Validation.query.filter_by(list_id=list_id).delete(synchronize_session=False)
+        Scan.query.filter_by(list_id=list_id).delete(synchronize_session=False)
+        List.query.filter_by(id=list_id).delete(synchronize_session=False)
+        # The deletes took the list's counts out of the rollups; archived history stays in the reports
+        add_to_rollups(lst.warehouse, archive_rollup_counts(archive))
+        db.session.commit()
+    except BaseException:
+        db.session.rollback()
+        os.remove(path)
+        raise
+    logging.debug(f"Archived list {list_id} with {archived.scan_count} scans to {path}")
+    return archived
+
+# Function to read the contents of an archived list from its archive file
+def read_list_archive(archived):
+    path = os.path.join(app.config['ARCHIVE_DIR'], archived.archive_file)
+    with gzip.open(path, 'rb') as archive_input:
+        return json.loads(archive_input.read())
+
+# Function to yield the export rows of an archived list, as list_export_rows does for a live list
+def archived_export_rows(archive):
+    scans, validations = archive['scans'], archive['validations']
+    # Once a list has validations, only validated scooters are exported
+    validated_ids = set(validations['normalized_id']) if validations['normalized_id'] else None
+    for normalized_id, timestamp in zip(scans['normalized_id'], scans['timestamp']):
+        if validated_ids is None or normalized_id in validated_ids:
+            yield (normalized_id, format_export_timestamp(datetime.fromisoformat(timestamp) if timestamp else None))
+
+# Warehouse rollups
+
+# Function to count the scans and validated scans of an archive per day, as the rollup triggers count live rows
+def archive_rollup_counts(archive, since=None):
+    counts = defaultdict(lambda: {'scans': 0, 'validations': 0})
+    validated_ids = set(archive['validations']['normalized_id'])
+    for normalized_id, timestamp in zip(archive['scans']['normalized_id'], archive['scans']['timestamp']):
+        # ISO timestamps start with the day
+        if timestamp and (since is None or timestamp[:10] >= since):
+            counts[timestamp[:10]]['scans'] += 1
+            if normalized_id in validated_ids:
+                counts[timestamp[:10]]['validations'] += 1
+    return counts
+
+# Function to add per-day counts ({day: {column: count}}) to a warehouse's rollups
+def add_to_rollups(warehouse, counts):
+    for day, columns in counts.items():
+        upsert = sqlite_insert(WarehouseDailyRollup).values(warehouse=warehouse or '', day=day, **columns)
+        db.session.execute(upsert.on_conflict_do_update(
+            index_elements=['warehouse', 'day'],
+            set_={column: getattr(WarehouseDailyRollup, column) + upsert.excluded[column] for column in columns}))
+
+# Function to recompute the rollups from the day `since` on (all days when None) from the live
+# tables and the archives (call inside a serialized write)
+def rebuild_rollups(since=None):
+    stale = WarehouseDailyRollup.query
+    if since:
+        stale = stale.filter(WarehouseDailyRollup.day >= since)
+    stale.delete(synchronize_session=False)
+    validated = (db.session.query(Validation.id)
+                 .filter(Validation.list_id == Scan.list_id, Validation.normalized_id == Scan.normalized_id).exists())
+    # Validations are counted on the day of the scan they validate
+    for model, list_model, column, condition in ((Scan, List, 'scans', db.true()), (Scan, List, 'validations', validated),
+                                                 (BatteryScan, BatteryList, 'battery_scans', db.true())):
+        day = db.func.date(model.timestamp)
+        counts = (db.select(db.func.coalesce(list_model.warehouse, ''), day, db.func.count(model.id))
+                  .join(list_model, model.list_id == list_model.id)
+                  .where(model.timestamp.isnot(None), day >= since if since else db.true(), condition)
+                  .group_by(list_model.warehouse, day))
+        upsert = sqlite_insert(WarehouseDailyRollup).from_select(['warehouse', 'day', column], counts)
+        db.session.execute(upsert.on_conflict_do_update(
+            index_elements=['warehouse', 'day'],
+            set_={column: getattr(WarehouseDailyRollup, column) + upsert.excluded[column]}))
+    for archived in ArchivedList.query.order_by(ArchivedList.id):
+        try:
+            archive = read_list_archive(archived)
+        except FileNotFoundError:
+            logging.warning(f"Archive file {archived.archive_file} of archived list {archived.id} is missing; its days are not counted.")
+            continue
+        add_to_rollups(archived.warehouse, archive_rollup_counts(archive, since))
+    db.session.commit()
+
+# Function to parse a 'YYYY-MM-DD' query argument, falling back to a default day
+def day_arg(name, default):
+    try:
+        return datetime.strptime(request.args.get(name, ''), '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        return default
+
+# Function to read the rollups of a day range, optionally for one warehouse
+def warehouse_rollups(start, end, warehouse=None):
+    query = WarehouseDailyRollup.query.filter(WarehouseDailyRollup.day.between(start, end))
+    if warehouse is not None:
+        query = query.filter(WarehouseDailyRollup.warehouse == warehouse)
+    return query
+
+# Function to compute the share of scanned scooters that were validated, in percent
+def validation_rate(scans, validations):
+    return round(100 * validations / scans, 1) if scans else None
+
+# Background jobs
+
+# Progress of the jobs running in this process, {job id: rows written}; persisted when a job ends
+# so progress counting never competes with the scanners for the write lock. Written by the job
+# threads and read by request threads, so only touched under job_progress_lock
+job_progress = {}
+job_progress_lock = threading.Lock()
+job_executor = None
+job_executor_lock = threading.Lock()
+
+# Function to get the job worker pool, started on first use to keep it off the cold start path
+def get_job_executor():
+    global job_executor
+    with job_executor_lock:
+        if job_executor is None:
+            job_executor = ThreadPoolExecutor(max_workers=app.config['JOB_WORKERS'], thread_name_prefix='job')
+        return job_executor
+
+# Function to describe a list export job: (download name, sheets, expected rows)
+def export_list_job(params):
+    current_list = db.session.get(List, params.get('list_id'))
+    if not current_list:
+        raise LookupError('List not found')
+    total_validated, total_scooters = validation_totals(current_list.id)
+    filename = f'{current_list.name}_{current_list.warehouse}_{current_list.timestamp.strftime("%Y%m%d%H%M%S")}.xlsx'
+    # Once a list has validations, only validated scooters are exported
+    return filename, [('Sheet1', ['Scooter ID', 'Timestamp'], list_export_rows(current_list.id))], total_validated or total_scooters
+
+def export_lists_job(params):
+    lists = List.query.filter(List.id.in_(params.get('list_ids') or [])).order_by(List.timestamp).all()
+    if not lists:
+        raise LookupError('No data found for these lists.')
+    total = sum(validated or scooters for validated, scooters in (validation_totals(lst.id) for lst in lists))
+    sheets = [(f'{lst.name} {lst.warehouse}', ['Scooter ID', 'Timestamp'], list_export_rows(lst.id)) for lst in lists]
+    return f'Lists_{get_local_time().strftime("%Y%m%d%H%M%S")}.xlsx', sheets, total
+
+def export_duplicates_job(params):
+    total = ScooterOccurrence.query.filter(ScooterOccurrence.scan_count > 1).count()
+    return 'duplicate_scooters.xlsx', [('Sheet1', ['Scooter ID', 'Occurrences', 'Lists'], duplicate_export_rows())], total
+
+def export_battery_list_job(params):
+    current_list = db.session.get(BatteryList, params.get('list_id'))
+    if not current_list:
+        raise LookupError('Battery list not found')
+    total = current_list.scan_count
+    filename = f'Battery_{current_list.name}_{current_list.warehouse}_{current_list.timestamp.strftime("%Y%m%d%H%M%S")}.xlsx'
+    return filename, [('Sheet1', ['Battery ID', 'Timestamp'], battery_export_rows(current_list.id))], total
+
+def export_battery_lists_job(params):
+    lists = BatteryList.query.filter(BatteryList.id.in_(params.get('list_ids') or [])).order_by(BatteryList.timestamp).all()
+    if not lists:
+        raise LookupError('No data found for these battery lists.')
+    total = sum(lst.scan_count for lst in lists)
+    sheets = [(f'{lst.name} {lst.warehouse}', ['Battery ID', 'Timestamp'], battery_export_rows(lst.id)) for lst in lists]
+    return f'Battery_Lists_{get_local_time().strftime("%Y%m%d%H%M%S")}.xlsx', sheets, total
+
+def export_battery_duplicates_job(params):
+    total = battery_duplicate_counts().order_by(None).count()
+    return 'duplicate_batteries.xlsx', [('Sheet1', ['Battery ID', 'Occurrences', 'Lists'], battery_duplicate_export_rows())], total
+
+# Single-list export kinds served directly when cheap: kind -> (list model, export endpoint, rows exported)
+DIRECT_EXPORT_KINDS = {
+    'export_list': (List, 'export', lambda lst: lst.validated_count or lst.scan_count),
+    'export_battery_list': (BatteryList, 'export_battery_list', lambda lst: lst.scan_count),
+}
+
+JOB_KINDS = {
+    'export_list': export_list_job,
+    'export_lists': export_lists_job,
+    'export_duplicates': export_duplicates_job,
+    'export_battery_list': export_battery_list_job,
+    'export_battery_lists': export_battery_lists_job,
+    'export_battery_duplicates': export_battery_duplicates_job,
+}
+
+# Function to count the rows of a job's sheets as they are written
+def job_rows(job_id, rows):
+    for row in rows:
+        yield row
+        with job_progress_lock:
+            job_progress[job_id] = job_progress.get(job_id, 0) + 1
+
+# Function to run a job in a worker thread and record its outcome
+def run_job(job_id):
+    with app.app_context():
+        # Registered before the job shows as running, so prune_jobs never takes it for an interrupted one
+        with job_progress_lock:
+            job_progress[job_id] = 0
+        with serialized_write_transaction():
+            job = db.session.get(Job, job_id)
+            job.status = 'running'
+            job.started_at = get_utc_time()
+            db.session.commit()
+            kind, params = job.kind, json.loads(job.params or '{}')
+        logging.debug(f"Running job {job_id} ({kind}).")
+        artifact_dir = app.config['JOB_ARTIFACT_DIR']
+        os.makedirs(artifact_dir, exist_ok=True)
+        artifact = f'{job_id}.xlsx'
+        temp_path = os.path.join(artifact_dir, f'{artifact}.tmp')
+        outcome = {}
+        try:
+            download_name, sheets, total = JOB_KINDS[kind](params)
+            outcome['total'] = total
+            write_xlsx(((name, headers, job_rows(job_id, rows)) for name, headers, rows in sheets), temp_path)
+            os.replace(temp_path, os.path.join(artifact_dir, artifact))
+            outcome.update(status='finished', artifact=artifact, download_name=download_name)
+            if params.get('cache_key'):
+                try:
+                    store_cached_export(params['cache_key'], os.path.join(artifact_dir, artifact))
+                except OSError:
+                    logging.exception(f"Could not cache the artifact of job {job_id}.")
+        except LookupError as error:
+            # The list was deleted (or never existed) before the job ran
+            outcome.update(status='failed', error=str(error))
+        except Exception as error:
+            logging.exception(f"Job {job_id} ({kind}) failed.")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            outcome.update(status='failed', error=f'{type(error).__name__}: {error}')
+        with job_progress_lock:
+            progress = job_progress.pop(job_id, 0)
+        with serialized_write_transaction():
+            Job.query.filter_by(id=job_id).update(dict(outcome, progress=progress, finished_at=get_utc_time()))
+            db.session.commit()
+        logging.debug(f"Job {job_id} ({kind}) {outcome['status']}.")
+
+# Function to drop expired jobs and their artifacts (call inside a serialized write)
+def prune_jobs():
+    cutoff = get_utc_time() - timedelta(seconds=JOB_ARTIFACT_TTL_SECONDS)
+    with job_progress_lock:
+        running_job_ids = set(job_progress)
+    for job in Job.query.filter(Job.created_at < cutoff):
+        if job.status in ('queued', 'running') and job.id not in running_job_ids:
+            # Its worker is gone (e.g. the process restarted); report it instead of dropping it silently
+            job.status = 'failed'
+            job.error = 'Interrupted'
+            job.created_at = get_utc_time()
+            continue
+        if job.status in ('queued', 'running'):
+            continue
+        if job.artifact:
+            try:
+                os.remove(os.path.join(app.config['JOB_ARTIFACT_DIR'], job.artifact))
+            except FileNotFoundError:
+                pass
+        db.session.delete(job)
+    db.session.commit()
+
+# Function to describe a job for the status endpoints
+def job_payload(job):
+    with job_progress_lock:
+        progress = job_progress.get(job.id, job.progress)
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        # Live progress while the job runs in this process
+        'progress': progress,
+        'total': job.total,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'download_url': url_for('download_job', job_id=job.id) if job.status == 'finished' else None
+    }
 
 @app.route('/')
 def index():
@@ -105,6 +1862,7 @@ def index():
     return render_template('index.html')
 
 @app.route('/scan', methods=['GET', 'POST'])
+@serialized_write
 def scan():
     if request.method == 'POST':
         logging.debug("Received POST request at /scan.")
@@ -140,94 +1898,105 @@ def validate_scan(list_id):
     current_list = List.query.get(list_id)
     if current_list:
         logging.debug(f"List found: {current_list.id}")
-        scans = Scan.query.filter_by(list_id=list_id).all()
+        # Read before the list, so changes made in between are fetched again rather than missed
+        change_seq = current_change_seq(list_id)
+        reconciliation = reconcile_list(list_id)
+        scans = reconciliation['scans']
         total_scooters = len(scans)
         logging.debug(f"Total scooters in list: {total_scooters}")
         # Prepare scooter IDs for validation
         scooter_ids = [scan.scooter_id for scan in scans]
-        # Get validations
-        validations = Validation.query.filter_by(list_id=list_id).all()
-        validated_scooter_ids = [validation.scooter_id for validation in validations]
-        validated_count = len(validated_scooter_ids)
+        validated_count = len(reconciliation['validations'])
         logging.debug(f"Total validated scooters: {validated_count}")
         # Prepare list of scooters with validation status
-        scooters_with_status = []
-        for scan in scans:
-            scooter_id = scan.scooter_id
-            short_id = normalize_scooter_id(scooter_id)
-            is_validated = any(scooter_id_matches(validation_id, scooter_id) for validation_id in validated_scooter_ids)
-            scooters_with_status.append({'scooter_id': scooter_id, 'short_id': short_id, 'is_validated': is_validated})
-        return render_template('validate_scan.html', session_id=list_id, list_name=current_list.name, total_scooters=total_scooters, scooter_ids=scooter_ids, scooters_with_status=scooters_with_status, validated_count=validated_count)
+        scooters_with_status = scooters_with_validation_status(reconciliation)
+        return render_template('validate_scan.html', session_id=list_id, list_name=current_list.name, total_scooters=total_scooters, scooter_ids=scooter_ids, scooters_with_status=scooters_with_status, validated_count=validated_count,
+                               change_seq=change_seq)
     else:
         logging.debug(f"List ID {list_id} not found.")
         return redirect(url_for('validate_lists'))
 
 @app.route('/save_validation', methods=['POST'])
+@idempotent
+@serialized_write
 def save_validation():
     data = request.get_json()
-    logging.debug(f"Received validation data: {data}")
+    hot_debug("Received validation data: %s", data)
     session_id = data.get('session_id')
     scooter_id = data.get('scooter_id')
-    logging.debug(f"Session ID: {session_id}, Scooter ID: {scooter_id}")
+    hot_debug("Session ID: %s, Scooter ID: %s", session_id, scooter_id)
 
     normalized_scooter_id = normalize_scooter_id(scooter_id)
 
     current_list = List.query.get(session_id)
     if current_list:
-        logging.debug(f"List found: {current_list.id}")
+        hot_debug("List found: %s", current_list.id)
         # Check if scooter_id is in the original list
-        original_scan = next((scan for scan in current_list.scans if scooter_id_matches(scan.scooter_id, scooter_id)), None)
+        original_scan = find_scan(current_list.id, scooter_id)
         if original_scan:
-            logging.debug(f"Scooter ID {scooter_id} is in the original list.")
+            hot_debug("Scooter ID %s is in the original list.", scooter_id)
             # Check if already validated
-            existing_validation = next((val for val in current_list.validations if scooter_id_matches(val.scooter_id, scooter_id)), None)
+            existing_validation = find_validation(current_list.id, scooter_id)
+            if existing_validation and created_by_this_request(existing_validation):
+                # A retry of a validation that was saved (possibly by another worker or before a restart)
+                total_validated, total_scooters = validation_totals(current_list.id)
+                return jsonify({'status': 'success', 'total_validated': total_validated, 'total_scooters': total_scooters, 'scooter_id': normalized_scooter_id})
             if existing_validation:
-                logging.debug(f"Scooter ID {scooter_id} already validated.")
+                hot_debug("Scooter ID %s already validated.", scooter_id)
                 return jsonify({'status': 'duplicate'})
             else:
                 # Add validation entry
-                new_validation = Validation(scooter_id=original_scan.scooter_id, list_id=session_id, is_valid=True)
+                new_validation = Validation(scooter_id=original_scan.scooter_id, list_id=current_list.id, is_valid=True,
+                                            idempotency_key=request_idempotency_key())
                 db.session.add(new_validation)
-                db.session.commit()
-                total_validated = len(current_list.validations)
-                total_scooters = len(current_list.scans)
-                logging.debug(f"Scooter ID {scooter_id} validated successfully. Total validated: {total_validated}/{total_scooters}")
+                try:
+                    db.session.commit()
+                except IntegrityError:
+                    # Validated concurrently by another device
+                    db.session.rollback()
+                    hot_debug("Scooter ID %s already validated.", scooter_id)
+                    return jsonify({'status': 'duplicate'})
+                total_validated, total_scooters = validation_totals(current_list.id)
+                publish_validation_change(current_list.id, 'validated', [normalized_scooter_id], total_validated, total_scooters)
+                hot_debug("Scooter ID %s validated successfully. Total validated: %s/%s", scooter_id, total_validated, total_scooters)
                 return jsonify({'status': 'success', 'total_validated': total_validated, 'total_scooters': total_scooters, 'scooter_id': normalized_scooter_id})
         else:
-            logging.debug(f"Scooter ID {scooter_id} is NOT in the original list.")
+            hot_debug("Scooter ID %s is NOT in the original list.", scooter_id)
             return jsonify({'status': 'not_in_list'})
     else:
-        logging.debug(f"Session ID {session_id} not found.")
+        hot_debug("Session ID %s not found.", session_id)
         return jsonify({'status': 'error'})
 
 @app.route('/unvalidate_scooter', methods=['POST'])
+@serialized_write
 def unvalidate_scooter():
     data = request.get_json()
-    logging.debug(f"Received unvalidation data: {data}")
+    hot_debug("Received unvalidation data: %s", data)
     session_id = data.get('session_id')
     scooter_id = data.get('scooter_id')
-    logging.debug(f"Session ID: {session_id}, Scooter ID: {scooter_id}")
+    hot_debug("Session ID: %s, Scooter ID: %s", session_id, scooter_id)
 
     current_list = List.query.get(session_id)
     if current_list:
-        logging.debug(f"List found: {current_list.id}")
+        hot_debug("List found: %s", current_list.id)
         # Find the validation entry
-        validation_entry = next((val for val in current_list.validations if scooter_id_matches(val.scooter_id, scooter_id)), None)
+        validation_entry = find_validation(current_list.id, scooter_id)
         if validation_entry:
             db.session.delete(validation_entry)
             db.session.commit()
-            total_validated = len(current_list.validations)
-            total_scooters = len(current_list.scans)
-            logging.debug(f"Scooter ID {scooter_id} unvalidated successfully. Total validated: {total_validated}/{total_scooters}")
+            total_validated, total_scooters = validation_totals(current_list.id)
+            publish_validation_change(current_list.id, 'unvalidated', [normalize_scooter_id(scooter_id)], total_validated, total_scooters)
+            hot_debug("Scooter ID %s unvalidated successfully. Total validated: %s/%s", scooter_id, total_validated, total_scooters)
             return jsonify({'status': 'success', 'total_validated': total_validated, 'total_scooters': total_scooters, 'scooter_id': normalize_scooter_id(scooter_id)})
         else:
-            logging.debug(f"Scooter ID {scooter_id} not found in validations.")
+            hot_debug("Scooter ID %s not found in validations.", scooter_id)
             return jsonify({'status': 'not_validated'})
     else:
-        logging.debug(f"Session ID {session_id} not found.")
+        hot_debug("Session ID %s not found.", session_id)
         return jsonify({'status': 'error'})
 
 @app.route('/unvalidate_scooter_in_list', methods=['POST'])
+@serialized_write
 def unvalidate_scooter_in_list():
     logging.debug("Unvalidating a scooter from list overview.")
     data = request.get_json()
@@ -238,10 +2007,12 @@ def unvalidate_scooter_in_list():
     current_list = List.query.get(list_id)
     if current_list:
         # Find the validation entry
-        validation_entry = next((val for val in current_list.validations if scooter_id_matches(val.scooter_id, scooter_id)), None)
+        validation_entry = find_validation(current_list.id, scooter_id)
         if validation_entry:
+            normalized_id = validation_entry.normalized_id
             db.session.delete(validation_entry)
             db.session.commit()
+            publish_validation_change(current_list.id, 'unvalidated', [normalized_id])
             logging.debug(f"Scooter {scooter_id} unvalidated in list {list_id}")
             return jsonify({'status': 'success'})
         else:
@@ -252,82 +2023,154 @@ def unvalidate_scooter_in_list():
         return jsonify({'status': 'error', 'message': 'List not found'})
 
 @app.route('/save_scan', methods=['POST'])
+@idempotent
+@serialized_write
 def save_scan():
     data = request.get_json()
-    logging.debug(f"Received scan data: {data}")
+    hot_debug("Received scan data: %s", data)
     session_id = data.get('session_id')
     scooter_id = data.get('scooter_id')
-    logging.debug(f"Session ID: {session_id}, Scooter ID: {scooter_id}")
+    hot_debug("Session ID: %s, Scooter ID: %s", session_id, scooter_id)
 
     # No change here, as we want to store the scooter ID as scanned
 
     # Validate scooter_id
-    is_valid_id = len(normalize_scooter_id(scooter_id)) >= 5 and len(normalize_scooter_id(scooter_id)) <= 9
+    is_valid_id = is_valid_scooter_id(normalize_scooter_id(scooter_id))
     if not is_valid_id:
-        logging.debug(f"Invalid scooter ID format after normalizing: {scooter_id}")
+        hot_debug("Invalid scooter ID format after normalizing: %s", scooter_id)
         return jsonify({'status': 'invalid'})
 
     # Check if list exists
     current_list = List.query.get(session_id)
     if current_list:
-        logging.debug(f"List found: {current_list.id}")
+        hot_debug("List found: %s", current_list.id)
         # Check for duplicates within the list
-        existing_scan = next((scan for scan in current_list.scans if scooter_id_matches(scan.scooter_id, scooter_id)), None)
+        existing_scan = find_scan(current_list.id, scooter_id)
+        if existing_scan and created_by_this_request(existing_scan):
+            # A retry of a scan that was saved (possibly by another worker or before a restart)
+            return jsonify({'status': 'success', 'total': current_list.scan_count, 'scan_id': existing_scan.id})
         if existing_scan:
-            logging.debug(f"Scooter ID {scooter_id} already scanned in session {session_id}.")
+            hot_debug("Scooter ID %s already scanned in session %s.", scooter_id, session_id)
             return jsonify({'status': 'duplicate'})
         else:
             # Add new scan
-            new_scan = Scan(scooter_id=scooter_id, list_id=session_id)
+            new_scan = Scan(scooter_id=scooter_id, list_id=current_list.id, idempotency_key=request_idempotency_key())
             db.session.add(new_scan)
-            db.session.commit()
-            total_scans = len(current_list.scans)
-            logging.debug(f"Scooter ID {scooter_id} added to session {session_id}. Total items: {total_scans}")
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Scanned concurrently by another device
+                db.session.rollback()
+                hot_debug("Scooter ID %s already scanned in session %s.", scooter_id, session_id)
+                return jsonify({'status': 'duplicate'})
+            total_scans = current_list.scan_count
+            hot_debug("Scooter ID %s added to session %s. Total items: %s", scooter_id, session_id, total_scans)
             return jsonify({'status': 'success', 'total': total_scans, 'scan_id': new_scan.id})
     else:
-        logging.debug(f"Session ID {session_id} not found.")
+        hot_debug("Session ID %s not found.", session_id)
         return jsonify({'status': 'error'})
 
 @app.route('/add_manual_entry', methods=['POST'])
+@idempotent
+@serialized_write
 def add_manual_entry():
     data = request.get_json()
-    logging.debug(f"Received manual entry data: {data}")
+    hot_debug("Received manual entry data: %s", data)
     list_id = data.get('list_id')
     scooter_id = data.get('scooter_id').strip()
-    logging.debug(f"List ID: {list_id}, Scooter ID: {scooter_id}")
+    hot_debug("List ID: %s, Scooter ID: %s", list_id, scooter_id)
 
     scooter_id = normalize_scooter_id(scooter_id)
 
     # Validate scooter ID length
     if len(scooter_id) < 5 or len(scooter_id) > 9:
-        logging.debug("Invalid scooter ID length.")
+        hot_debug("Invalid scooter ID length.")
         return jsonify({'status': 'invalid_length'})
     if any(scooter_id.startswith(prefix.upper()) for prefix in ['http://', 'https://']):
-        logging.debug("Invalid scooter ID: cannot be a URL.")
+        hot_debug("Invalid scooter ID: cannot be a URL.")
         return jsonify({'status': 'invalid_format'})
 
     # Check if list exists
     current_list = List.query.get(list_id)
     if current_list:
-        logging.debug(f"List found: {current_list.id}")
+        hot_debug("List found: %s", current_list.id)
         # Check for duplicates within the list
-        existing_scan = next((scan for scan in current_list.scans if scooter_id_matches(scan.scooter_id, scooter_id)), None)
+        existing_scan = find_scan(current_list.id, scooter_id)
+        if existing_scan and created_by_this_request(existing_scan):
+            # A retry of a scan that was saved (possibly by another worker or before a restart)
+            return jsonify({'status': 'success', 'total': current_list.scan_count, 'scan_id': existing_scan.id})
         if existing_scan:
-            logging.debug(f"Scooter ID {scooter_id} already exists in list {list_id}.")
+            hot_debug("Scooter ID %s already exists in list %s.", scooter_id, list_id)
             return jsonify({'status': 'duplicate'})
         else:
             # Add new scan
-            new_scan = Scan(scooter_id=scooter_id, list_id=list_id)
+            new_scan = Scan(scooter_id=scooter_id, list_id=current_list.id, idempotency_key=request_idempotency_key())
             db.session.add(new_scan)
-            db.session.commit()
-            total_scans = len(current_list.scans)
-            logging.debug(f"Scooter ID {scooter_id} added manually to list {list_id}. Total items: {total_scans}")
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Added concurrently by another device
+                db.session.rollback()
+                hot_debug("Scooter ID %s already exists in list %s.", scooter_id, list_id)
+                return jsonify({'status': 'duplicate'})
+            total_scans = current_list.scan_count
+            hot_debug("Scooter ID %s added manually to list %s. Total items: %s", scooter_id, list_id, total_scans)
             return jsonify({'status': 'success', 'total': total_scans, 'scan_id': new_scan.id})
     else:
-        logging.debug(f"List ID {list_id} not found.")
+        hot_debug("List ID %s not found.", list_id)
+        return jsonify({'status': 'error'})
+
+@app.route('/save_scan_batch', methods=['POST'])
+@serialized_write
+def save_scan_batch():
+    data = request.get_json()
+    session_id = data.get('session_id')
+    scooter_ids = get_batch_ids(data, 'scooter_ids')
+    hot_debug("Received scan batch for session %s", session_id)
+    if scooter_ids is None:
+        return jsonify({'status': 'invalid', 'message': f'scooter_ids must be a list of at most {MAX_BATCH_SIZE} IDs'}), 400
+    idempotency_keys = get_batch_keys(data, len(scooter_ids))
+    if idempotency_keys is None:
+        return jsonify({'status': 'invalid', 'message': 'idempotency_keys must be a list with one key (or null) per ID'}), 400
+
+    current_list = List.query.get(session_id)
+    if current_list:
+        results = run_keyed_batch(Scan, 'scooter_id', ingest_scan_batch, current_list.id, scooter_ids, idempotency_keys)
+        total_scans = current_list.scan_count
+        hot_debug("Scan batch saved to session %s. Total items: %s", session_id, total_scans)
+        return jsonify({'status': 'success', 'results': results, 'total': total_scans})
+    else:
+        hot_debug("Session ID %s not found.", session_id)
+        return jsonify({'status': 'error'})
+
+@app.route('/save_validation_batch', methods=['POST'])
+@serialized_write
+def save_validation_batch():
+    data = request.get_json()
+    session_id = data.get('session_id')
+    scooter_ids = get_batch_ids(data, 'scooter_ids')
+    hot_debug("Received validation batch for session %s", session_id)
+    if scooter_ids is None:
+        return jsonify({'status': 'invalid', 'message': f'scooter_ids must be a list of at most {MAX_BATCH_SIZE} IDs'}), 400
+    idempotency_keys = get_batch_keys(data, len(scooter_ids))
+    if idempotency_keys is None:
+        return jsonify({'status': 'invalid', 'message': 'idempotency_keys must be a list with one key (or null) per ID'}), 400
+
+    current_list = List.query.get(session_id)
+    if current_list:
+        results = run_keyed_batch(Validation, 'scooter_id', ingest_validation_batch, current_list.id, scooter_ids, idempotency_keys)
+        total_validated, total_scooters = validation_totals(current_list.id)
+        validated_ids = [result['normalized_id'] for result in results if result['status'] == 'success' and not result.get('replayed')]
+        if validated_ids:
+            publish_validation_change(current_list.id, 'validated', validated_ids, total_validated, total_scooters)
+        hot_debug("Validation batch saved to session %s. Total validated: %s/%s", session_id, total_validated, total_scooters)
+        return jsonify({'status': 'success', 'results': results, 'total_validated': total_validated, 'total_scooters': total_scooters})
+    else:
+        hot_debug("Session ID %s not found.", session_id)
         return jsonify({'status': 'error'})
 
 @app.route('/add_manual_validation', methods=['POST'])
+@serialized_write
 def add_manual_validation():
     logging.debug("Adding manual validation entry.")
     data = request.get_json()
@@ -340,64 +2183,132 @@ def add_manual_validation():
     current_list = List.query.get(list_id)
     if current_list:
         logging.debug(f"List found: {current_list.id}")
-        # Find matching scooter in scans (allow partial match)
-        matching_scan = next((scan for scan in current_list.scans if normalize_scooter_id(scan.scooter_id).endswith(normalized_input_id)), None)
+        # Find matching scooter in scans; an exact match wins, otherwise allow a partial (suffix) match
+        matching_scan = find_scan(current_list.id, normalized_input_id)
         if not matching_scan:
-            logging.debug(f"Scooter ID {scooter_id_input} is not in the original scans.")
-            return jsonify({'status': 'not_in_list'})
+            matching_scans = find_scans_by_suffix(current_list.id, normalized_input_id)
+            if not matching_scans:
+                logging.debug(f"Scooter ID {scooter_id_input} is not in the original scans.")
+                return jsonify({'status': 'not_in_list'})
+            if len(matching_scans) > 1:
+                logging.debug(f"Partial scooter ID {scooter_id_input} matches several scans.")
+                return jsonify({'status': 'ambiguous', 'matches': [scan.normalized_id for scan in matching_scans]})
+            matching_scan = matching_scans[0]
         # Use the original scooter ID from the scans
         full_scooter_id = matching_scan.scooter_id
         logging.debug(f"Full scooter ID found: {full_scooter_id}")
 
         # Check if already validated
-        existing_validation = next((val for val in current_list.validations if scooter_id_matches(val.scooter_id, full_scooter_id)), None)
+        existing_validation = find_validation(current_list.id, full_scooter_id)
         if existing_validation:
             logging.debug(f"Scooter ID {full_scooter_id} already validated.")
             return jsonify({'status': 'duplicate'})
         else:
             # Add validation entry
-            new_validation = Validation(scooter_id=full_scooter_id, list_id=list_id, is_valid=True)
+            new_validation = Validation(scooter_id=full_scooter_id, list_id=current_list.id, is_valid=True)
             db.session.add(new_validation)
-            db.session.commit()
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                logging.debug(f"Scooter ID {full_scooter_id} already validated.")
+                return jsonify({'status': 'duplicate'})
+            publish_validation_change(current_list.id, 'validated', [new_validation.normalized_id])
             logging.debug(f"Scooter ID {full_scooter_id} manually validated in list {list_id}")
             return jsonify({'status': 'success'})
     else:
         logging.debug(f"List {list_id} not found.")
         return jsonify({'status': 'error', 'message': 'List not found'})
 
+@app.route('/validation_events/<int:list_id>')
+def validation_events(list_id):
+    logging.debug(f"Device subscribed to validation events of list {list_id}.")
+    subscriber = queue.Queue(maxsize=SSE_QUEUE_SIZE)
+    with subscribers_lock:
+        list_subscribers[list_id].add(subscriber)
+    total_validated, total_scooters = validation_totals(list_id)
+
+    def stream():
+        try:
+            yield f'event: totals\ndata: {json.dumps({"total_validated": total_validated, "total_scooters": total_scooters})}\n\n'
+            while True:
+                try:
+                    yield subscriber.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            with subscribers_lock:
+                list_subscribers[list_id].discard(subscriber)
+                if not list_subscribers[list_id]:
+                    del list_subscribers[list_id]
+            logging.debug(f"Device unsubscribed from validation events of list {list_id}.")
+
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/lists/<int:list_id>/scans')
+def list_scans_api(list_id):
+    after_id, limit = get_page_arguments()
+    status = request.args.get('status', 'all')
+    logging.debug(f"Fetching scans of list {list_id} after scan {after_id}. Limit: {limit}, status: {status}")
+    if status not in LIST_STATUS_FILTERS:
+        return jsonify({'status': 'invalid', 'message': f'status must be one of {", ".join(LIST_STATUS_FILTERS)}'}), 400
+    current_list = List.query.get(list_id)
+    if not current_list:
+        logging.debug(f"List {list_id} not found.")
+        return jsonify({'status': 'error', 'message': 'List not found'}), 404
+
+    def render():
+        items, next_cursor = scan_page(list_id, after_id, limit, status)
+        logging.debug(f"Returning {len(items)} scans of list {list_id}. Next cursor: {next_cursor}")
+        return jsonify({'status': 'success', 'items': items, 'next_cursor': next_cursor})
+    return conditional_list_response(current_list, render, f'-{status}-{after_id}-{limit}')
+
+@app.route('/api/lists/<int:list_id>/changes')
+def list_changes_api(list_id):
+    since = max(request.args.get('since', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', CHANGES_PAGE_SIZE, type=int), 1), MAX_CHANGES_PAGE_SIZE)
+    logging.debug(f"Fetching changes of list {list_id} since {since}. Limit: {limit}")
+    current_list = List.query.get(list_id)
+    if not current_list:
+        logging.debug(f"List {list_id} not found.")
+        return jsonify({'status': 'error', 'message': 'List not found'}), 404
+
+    def render():
+        changes, next_since, has_more = change_page(list_id, since, limit)
+        total_validated, total_scooters = validation_totals(list_id)
+        logging.debug(f"Returning {len(changes)} changes of list {list_id}. Next since: {next_since}")
+        return jsonify({'status': 'success', 'changes': changes, 'since': next_since, 'has_more': has_more,
+                        'total_validated': total_validated, 'total_scooters': total_scooters})
+    # A client polling with an unchanged list gets a 304 for its cursor
+    return conditional_list_response(current_list, render, f'-{since}-{limit}')
+
+@app.route('/search')
+def search():
+    logging.debug("Rendering search page.")
+    return render_template('search.html', min_prefix=SEARCH_MIN_PREFIX)
+
+@app.route('/api/search')
+def search_api():
+    query = request.args.get('q', '').strip()
+    search_type = request.args.get('type', 'all')
+    logging.debug(f"Searching IDs starting with {query!r}. Type: {search_type}")
+    if search_type not in SEARCH_TYPES:
+        return jsonify({'status': 'invalid', 'message': f'type must be one of {", ".join(SEARCH_TYPES)}'}), 400
+    results, truncated = search_ids(query, search_type)
+    logging.debug(f"Returning {len(results)} IDs for {query!r}. Truncated: {truncated}")
+    return jsonify({'status': 'success', 'query': query, 'results': results, 'truncated': truncated})
+
 @app.route('/export/<int:list_id>')
 def export(list_id):
     logging.debug(f"Exporting data for list {list_id}.")
     current_list = List.query.get(list_id)
     if current_list:
         logging.debug(f"List found: {current_list.id}")
-        # Check if validations exist
-        validation_count = len(current_list.validations)
-        if validation_count > 0:
-            logging.debug(f"{validation_count} validations found. Exporting only validated scooters.")
-            validated_scooter_ids = [val.scooter_id for val in current_list.validations]
-            scans = [scan for scan in current_list.scans if any(scooter_id_matches(scan.scooter_id, val_id) for val_id in validated_scooter_ids)]
-        else:
-            logging.debug("No validations found. Exporting all scooters.")
-            scans = current_list.scans
-
-        data = []
-        for scan in scans:
-            scooter_id = normalize_scooter_id(scan.scooter_id)
-            local_time = scan.timestamp.astimezone(local_tz)
-            data.append({
-                'Scooter ID': scooter_id,
-                'Timestamp': local_time.strftime('%H:%M | %d.%m.%Y')
-            })
-
-        df = pd.DataFrame(data)
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df.to_excel(writer, index=False)
-        output.seek(0)
-        filename = f'{current_list.name}_{current_list.warehouse}_{current_list.timestamp.strftime("%Y%m%d%H%M%S")}.xlsx'
-        logging.debug(f"Data exported successfully for list {list_id}. Filename: {filename}")
-        return send_file(output, download_name=filename, as_attachment=True)
+        filename = f'{current_list.name}_{current_list.warehouse}_{current_list.timestamp.strftime("%Y%m%d%H%M%S")}'
+        logging.debug(f"Streaming export for list {list_id}. Filename: {filename}")
+        cache_key = export_cache_key(current_list)
+        return conditional_list_response(current_list, lambda: export_response(filename, ['Scooter ID', 'Timestamp'], list_export_rows(list_id), cache_key),
+                                         f'-{request.args.get("format", "xlsx")}-v{EXPORT_FORMAT_VERSION}')
     else:
         logging.debug(f"No data found for list {list_id}.")
         return 'No data found for this list.'
@@ -408,23 +2319,12 @@ def validate_list_overview(list_id):
     current_list = List.query.get(list_id)
     if current_list:
         logging.debug(f"List found: {current_list.id}")
-        scans = current_list.scans
-        total_scooters = len(scans)
-        validations = current_list.validations
-        validated_count = len(validations)
-        # Prepare scooters with validation status
-        scooters_with_status = []
-        for scan in scans:
-            scooter_id = scan.scooter_id
-            short_id = normalize_scooter_id(scooter_id)
-            is_validated = any(scooter_id_matches(val.scooter_id, scooter_id) for val in validations)
-            scooters_with_status.append({
-                'scooter_id': scooter_id,
-                'short_id': short_id,  # IDs are displayed normalized
-                'is_validated': is_validated
-            })
-        logging.debug(f"Total scooters: {total_scooters}, Validated scooters: {validated_count}")
-        return render_template('validate_list_overview.html', list=current_list, total_scooters=total_scooters, validated_count=validated_count, scooters_with_status=scooters_with_status)
+        # Scooters are loaded page by page from the list contents API
+        def render():
+            validated_count, total_scooters = validation_totals(list_id)
+            logging.debug(f"Total scooters: {total_scooters}, Validated scooters: {validated_count}")
+            return render_template('validate_list_overview.html', list=current_list, total_scooters=total_scooters, validated_count=validated_count, page_size=LIST_PAGE_SIZE)
+        return conditional_list_response(current_list, render, PAGE_ETAG_SALT)
     else:
         logging.debug(f"List {list_id} not found.")
         return 'List not found', 404
@@ -433,18 +2333,9 @@ def validate_list_overview(list_id):
 def list_lists():
     logging.debug("Fetching all lists.")
     all_lists = List.query.order_by(List.timestamp.desc()).all()
-    unique_scooter_ids = set()
-    for lst in all_lists:
-        for scan in lst.scans:
-            unique_scooter_ids.add(normalize_scooter_id(scan.scooter_id))
-    total_scooters = len(unique_scooter_ids)
-    # Count duplicates
-    scooter_counts = {}
-    for lst in all_lists:
-        for scan in lst.scans:
-            norm_id = normalize_scooter_id(scan.scooter_id)
-            scooter_counts[norm_id] = scooter_counts.get(norm_id, 0) + 1
-    duplicate_count = sum(1 for count in scooter_counts.values() if count > 1)
+    total_scooters = ScooterOccurrence.query.count()
+    # Count scooters found in more than one list
+    duplicate_count = ScooterOccurrence.query.filter(ScooterOccurrence.scan_count > 1).count()
     logging.debug(f"Total lists found: {len(all_lists)}")
     logging.debug(f"Total unique scooters: {total_scooters}")
     logging.debug(f"Total duplicates: {duplicate_count}")
@@ -456,17 +2347,19 @@ def view_list(list_id):
     current_list = List.query.get(list_id)
     if current_list:
         logging.debug(f"List found: {current_list.id}")
-        scans = current_list.scans
-        logging.debug(f"Total scans in list: {len(scans)}")
-        # Process scans to add scooter_id_short
-        for scan in scans:
-            scan.scooter_id_short = normalize_scooter_id(scan.scooter_id)
-        return render_template('view_list.html', list=current_list, scans=scans)
+        # Scans are loaded page by page from the list contents API
+        def render():
+            total_scans = current_list.scan_count
+            logging.debug(f"Total scans in list: {total_scans}")
+            return render_template('view_list.html', list=current_list, total_scans=total_scans, page_size=LIST_PAGE_SIZE,
+                                   change_seq=current_change_seq(list_id))
+        return conditional_list_response(current_list, render, PAGE_ETAG_SALT)
     else:
         logging.debug(f"List {list_id} not found.")
         return 'List not found', 404
 
 @app.route('/delete_list/<int:list_id>', methods=['POST'])
+@serialized_write
 def delete_list(list_id):
     logging.debug(f"Deleting list {list_id}.")
     current_list = List.query.get(list_id)
@@ -480,14 +2373,17 @@ def delete_list(list_id):
         return 'List not found', 404
 
 @app.route('/delete_scan/<int:scan_id>', methods=['POST'])
+@serialized_write
 def delete_scan(scan_id):
     logging.debug(f"Deleting scan {scan_id}.")
     scan = Scan.query.get(scan_id)
     if scan:
+        current_list = db.session.get(List, scan.list_id)
         db.session.delete(scan)
         db.session.commit()
-        logging.debug(f"Scan {scan_id} deleted successfully.")
-        return jsonify({'status': 'success'})
+        total_scans = current_list.scan_count
+        logging.debug(f"Scan {scan_id} deleted successfully. Total items: {total_scans}")
+        return jsonify({'status': 'success', 'total': total_scans})
     else:
         logging.debug(f"Scan {scan_id} not found.")
         return jsonify({'status': 'error'})
@@ -495,100 +2391,287 @@ def delete_scan(scan_id):
 @app.route('/validate_lists')
 def validate_lists():
     logging.debug("Fetching lists for validation.")
-    all_lists = List.query.order_by(List.timestamp.desc()).all()
     # Calculate validated counts for each list
-    for lst in all_lists:
-        total_scans = len(lst.scans)
-        total_validations = len(lst.validations)
-        lst.total_scans = total_scans
-        lst.total_validations = total_validations
-        logging.debug(f"List ID {lst.id}: Total Scans: {total_scans}, Total Validations: {total_validations}")
+    all_lists = lists_with_counts(List.query.order_by(List.timestamp.desc()))
+    logging.debug(f"Total lists found: {len(all_lists)}")
     return render_template('validate_lists.html', lists=all_lists)
 
 @app.route('/validatedlists')
 def validated_lists():
     logging.debug("Fetching validated lists.")
-    validated_lists = List.query.filter(List.is_validated == True).order_by(List.validation_timestamp.desc()).all()
-    for lst in validated_lists:
-        total_scans = len(lst.scans)
-        total_validations = len(lst.validations)
-        lst.total_scans = total_scans
-        lst.total_validations = total_validations
-        logging.debug(f"Validated List ID {lst.id}: Total Scans: {total_scans}, Total Validations: {total_validations}")
+    validated_lists = lists_with_counts(List.query.filter(List.is_validated == True).order_by(List.validation_timestamp.desc()))
     logging.debug(f"Total validated lists found: {len(validated_lists)}")
     return render_template('validatedlists.html', validated_lists=validated_lists)
 
 @app.route('/check_duplicates')
 def check_duplicates():
     logging.debug("Checking for duplicates.")
-    all_scans = db.session.query(Scan).all()
-    # Create a mapping of normalized scooter IDs
-    from collections import defaultdict
-    scooter_counts = defaultdict(list)
-    for scan in all_scans:
-        norm_id = normalize_scooter_id(scan.scooter_id)
-        scooter_counts[norm_id].append({'list_id': scan.list_id, 'full_id': scan.scooter_id})
-
-    # Find duplicates
+    page = request.args.get('page', 1, type=int)
+    # Read one page of duplicated scooters from the duplicate index
+    pagination = (ScooterOccurrence.query
+                  .filter(ScooterOccurrence.scan_count > 1)
+                  .order_by(ScooterOccurrence.normalized_id)
+                  .paginate(page=page, per_page=DUPLICATES_PER_PAGE, error_out=False))
+    page_ids = [occurrence.normalized_id for occurrence in pagination.items]
+
+    # Fetch the scans and lists for this page in one query
+    entries = defaultdict(list)
+    if page_ids:
+        rows = (db.session.query(Scan.normalized_id, Scan.scooter_id, List)
+                .join(List, Scan.list_id == List.id)
+                .filter(Scan.normalized_id.in_(page_ids))
+                .order_by(Scan.id))
+        for normalized_id, full_id, lst in rows:
+            entries[normalized_id].append((full_id, lst))
+
     duplicate_details = []
-    for scooter_id, entries in scooter_counts.items():
-        if len(entries) > 1:
-            list_ids = [entry['list_id'] for entry in entries]
-            lists = List.query.filter(List.id.in_(list_ids)).all()
-            duplicate_details.append({
-                'scooter_id': scooter_id,
-                'count': len(entries),
-                'lists': lists,
-                'full_ids': [entry['full_id'] for entry in entries]
-            })
-    logging.debug(f"Total duplicates found: {len(duplicate_details)}")
-    return render_template('duplicates.html', duplicates=duplicate_details)
+    for occurrence in pagination.items:
+        duplicate_details.append({
+            'scooter_id': occurrence.normalized_id,
+            'count': occurrence.scan_count,
+            'lists': [lst for full_id, lst in entries[occurrence.normalized_id]],
+            'full_ids': [full_id for full_id, lst in entries[occurrence.normalized_id]]
+        })
+    logging.debug(f"Duplicates on page {page}: {len(duplicate_details)} of {pagination.total}")
+    warehouses = [warehouse for (warehouse,) in db.session.query(List.warehouse).distinct().order_by(List.warehouse) if warehouse]
+    return render_template('duplicates.html', duplicates=duplicate_details, pagination=pagination, warehouses=warehouses)
 
 @app.route('/export_duplicates')
 def export_duplicates():
     logging.debug("Exporting duplicates to Excel.")
-    all_scans = db.session.query(Scan).all()
-    # Create a mapping of normalized scooter IDs
-    from collections import defaultdict
-    scooter_counts = defaultdict(list)
-    for scan in all_scans:
-        norm_id = normalize_scooter_id(scan.scooter_id)
-        scooter_counts[norm_id].append(scan)
-
-    data = []
-    for scooter_id, scans in scooter_counts.items():
-        if len(scans) > 1:
-            list_names = ', '.join(set(scan.list.name for scan in scans))
-            data.append({'Scooter ID': scooter_id, 'Occurrences': len(scans), 'Lists': list_names})
-
-    df = pd.DataFrame(data)
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False)
-    output.seek(0)
-    filename = 'duplicate_scooters.xlsx'
-    logging.debug("Duplicates exported successfully.")
+    logging.debug("Streaming duplicates export.")
+    return export_response('duplicate_scooters', ['Scooter ID', 'Occurrences', 'Lists'], duplicate_export_rows())
+
+@app.route('/export_lists')
+def export_lists():
+    list_ids = get_export_list_ids()
+    logging.debug(f"Exporting lists {list_ids} into one workbook.")
+    lists = List.query.filter(List.id.in_(list_ids)).order_by(List.timestamp).all() if list_ids else []
+    if not lists:
+        return 'No data found for these lists.'
+    # One sheet per list, each streamed from its own cursor
+    sheets = ((f'{lst.name} {lst.warehouse}', ['Scooter ID', 'Timestamp'], list_export_rows(lst.id)) for lst in lists)
+    output = write_xlsx(sheets)
+    filename = f'Lists_{get_local_time().strftime("%Y%m%d%H%M%S")}.xlsx'
     return send_file(output, download_name=filename, as_attachment=True)
 
 @app.route('/remove_duplicate', methods=['POST'])
+@serialized_write
 def remove_duplicate():
     scooter_id = request.form.get('scooter_id')
     list_id = request.form.get('list_id')
     logging.debug(f"Removing scooter {scooter_id} from list {list_id}.")
 
-    # Find the scan entry
-    scan = Scan.query.filter(Scan.list_id == list_id).filter(Scan.scooter_id.like(f"%{scooter_id}%")).first()
+    # Find the scan entry (exact match on the normalized ID)
+    scan = find_scan(list_id, scooter_id) if scooter_id and list_id else None
     if scan:
         db.session.delete(scan)
         db.session.commit()
         logging.debug(f"Scooter {scooter_id} removed from list {list_id}.")
     else:
         logging.debug(f"Scooter {scooter_id} not found in list {list_id}.")
-    return redirect(url_for('check_duplicates'))
+    if request.form.get('format') == 'json':
+        occurrence = db.session.get(ScooterOccurrence, normalize_scooter_id(scooter_id or ''))
+        return jsonify({'status': 'success' if scan else 'error', 'count': occurrence.scan_count if occurrence else 0})
+    return redirect(url_for('check_duplicates', page=request.form.get('page', 1, type=int)))
+
+@app.route('/resolve_duplicates', methods=['POST'])
+@serialized_write
+def resolve_duplicates_route():
+    data = request.get_json()
+    policy = data.get('policy')
+    warehouse = data.get('warehouse')
+    dry_run = data.get('dry_run', True) is not False
+    logging.debug(f"Resolving duplicates with {policy} (warehouse: {warehouse}, dry run: {dry_run}).")
+    if policy not in DUPLICATE_POLICIES:
+        return jsonify({'status': 'invalid', 'message': f'policy must be one of {", ".join(DUPLICATE_POLICIES)}'}), 400
+    if policy == 'keep_warehouse' and not warehouse:
+        return jsonify({'status': 'invalid', 'message': 'keep_warehouse needs a warehouse'}), 400
+    result = resolve_duplicates(policy, warehouse, dry_run)
+    return jsonify({'status': 'success', 'policy': policy, 'dry_run': dry_run, **result})
+
+@app.route('/import_list', methods=['POST'])
+def import_list():
+    upload = request.files.get('file')
+    list_id = request.form.get('list_id', type=int)
+    logging.debug(f"Importing manifest {upload.filename if upload else None} into list {list_id or 'new'}.")
+    if not upload or os.path.splitext(upload.filename or '')[1].lower() not in IMPORT_EXTENSIONS:
+        return jsonify({'status': 'invalid', 'message': 'Upload an .xlsx or .csv file'}), 400
+
+    # Read the first row before creating anything, so a bad file leaves no empty list behind
+    numbered_rows = enumerate(manifest_rows(upload), start=1)
+    try:
+        first_row = next(numbered_rows, None)
+    except zipfile.BadZipFile:
+        return jsonify({'status': 'invalid', 'message': 'The file is not a valid .xlsx workbook'}), 400
+    if first_row is None:
+        return jsonify({'status': 'invalid', 'message': 'The file is empty'}), 400
+    column_name = request.form.get('column')
+    has_header = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}.get((request.form.get('has_header') or '').lower())
+    sample_rows = list(islice(numbered_rows, IMPORT_HEADER_SAMPLE_ROWS))
+    numbered_rows = chain(sample_rows, numbered_rows)
+    column, is_header = manifest_id_column(first_row[1], [row for row_number, row in sample_rows], column_name, has_header)
+    if column is None:
+        return jsonify({'status': 'invalid', 'message': f'Column {column_name} not found'}), 400
+    if not is_header:
+        numbered_rows = chain([first_row], numbered_rows)
+    logging.debug(f"Manifest first row {first_row[1]} {'skipped as a header' if is_header else 'imported'}; ID column {column}.")
+
+    if list_id:
+        if not List.query.get(list_id):
+            logging.debug(f"List {list_id} not found.")
+            return jsonify({'status': 'error', 'message': 'List not found'}), 404
+    else:
+        list_name = request.form.get('list_name')
+        warehouse_name = request.form.get('warehouse_name')
+        if not list_name or not warehouse_name:
+            return jsonify({'status': 'invalid', 'message': 'list_id, or list_name and warehouse_name, are required'}), 400
+        with serialized_write_transaction():
+            new_list = List(name=list_name, warehouse=warehouse_name)
+            db.session.add(new_list)
+            db.session.commit()
+            list_id = new_list.id
+        logging.debug(f"New list created for manifest import: {list_id}")
+
+    try:
+        summary = import_manifest(list_id, numbered_rows, column, first_row[1] if is_header else None)
+    except LookupError:
+        logging.debug(f"List {list_id} deleted during manifest import.")
+        return jsonify({'status': 'error', 'message': 'List not found'}), 404
+    total_scans = validation_totals(list_id)[1]
+    logging.debug(f"Manifest imported into list {list_id}: {summary['imported']} of {summary['rows']} rows. Total items: {total_scans}")
+    return jsonify({'status': 'success', 'list_id': list_id, 'total': total_scans, **summary})
+
+# Archive Routes (read-only)
+
+@app.route('/archive')
+def archived_lists():
+    page = request.args.get('page', 1, type=int)
+    scooter_id = request.args.get('scooter_id', '').strip()
+    logging.debug(f"Fetching archived lists. Page: {page}, scooter: {scooter_id or '-'}")
+    query = ArchivedList.query
+    if scooter_id:
+        # Archived lists containing the scooter, found through the archive's scooter ID index
+        query = (query.join(ArchivedScooter, ArchivedScooter.archived_list_id == ArchivedList.id)
+                 .filter(ArchivedScooter.normalized_id == normalize_scooter_id(scooter_id))
+                 .add_columns(ArchivedScooter.is_validated))
+    pagination = query.order_by(ArchivedList.timestamp.desc()).paginate(page=page, per_page=DUPLICATES_PER_PAGE, error_out=False)
+    if scooter_id:
+        archived = []
+        for archived_list, is_validated in pagination.items:
+            archived_list.scooter_validated = is_validated
+            archived.append(archived_list)
+    else:
+        archived = pagination.items
+    logging.debug(f"Archived lists on page {page}: {len(archived)} of {pagination.total}")
+    return render_template('archive.html', archived_lists=archived, pagination=pagination, scooter_id=scooter_id)
+
+@app.route('/archive/<int:archived_list_id>/export')
+def export_archived_list(archived_list_id):
+    logging.debug(f"Exporting archived list {archived_list_id}.")
+    archived = ArchivedList.query.get(archived_list_id)
+    if not archived:
+        logging.debug(f"Archived list {archived_list_id} not found.")
+        return 'No data found for this list.', 404
+    filename = f'{archived.name}_{archived.warehouse}_{archived.timestamp.strftime("%Y%m%d%H%M%S")}'
+    # Archives never change, so the xlsx is cached under the archive file's name
+    return export_response(filename, ['Scooter ID', 'Timestamp'], archived_export_rows(read_list_archive(archived)),
+                           f'archive-{archived.archive_file.split(".")[0]}')
+
+# Warehouse Summary Routes
+
+# Function to read the day range and warehouse of a summary request (last 30 days by default)
+def summary_args():
+    today = get_local_time().date()
+    end = day_arg('end', today.isoformat())
+    start = day_arg('start', (today - timedelta(days=29)).isoformat())
+    return start, end, request.args.get('warehouse') or None
+
+@app.route('/warehouse_summary')
+def warehouse_summary():
+    start, end, warehouse = summary_args()
+    logging.debug(f"Warehouse summary from {start} to {end} for {warehouse or 'all warehouses'}.")
+    sums = [db.func.sum(WarehouseDailyRollup.scans), db.func.sum(WarehouseDailyRollup.validations), db.func.sum(WarehouseDailyRollup.battery_scans)]
+    # Range scans over the rollups only: every warehouse's totals (so one can be picked), and per-day totals
+    totals = (warehouse_rollups(start, end).with_entities(WarehouseDailyRollup.warehouse, *sums)
+              .group_by(WarehouseDailyRollup.warehouse).order_by(WarehouseDailyRollup.warehouse))
+    daily = (warehouse_rollups(start, end, warehouse).with_entities(WarehouseDailyRollup.day, *sums)
+             .group_by(WarehouseDailyRollup.day).order_by(WarehouseDailyRollup.day.desc()))
+    warehouses = [{'warehouse': name, 'scans': scans, 'validations': validations,
+                   'validation_rate': validation_rate(scans, validations), 'battery_scans': battery_scans}
+                  for name, scans, validations, battery_scans in totals]
+    days = [{'day': day, 'scans': scans, 'validations': validations,
+             'validation_rate': validation_rate(scans, validations), 'battery_scans': battery_scans}
+            for day, scans, validations, battery_scans in daily]
+    logging.debug(f"Warehouse summary: {len(warehouses)} warehouses, {len(days)} days.")
+    return render_template('warehouse_summary.html', start=start, end=end, warehouse=warehouse,
+                           warehouses=warehouses, days=days)
+
+@app.route('/export_warehouse_summary')
+def export_warehouse_summary():
+    start, end, warehouse = summary_args()
+    logging.debug(f"Exporting warehouse summary from {start} to {end} for {warehouse or 'all warehouses'}.")
+    rows = ((rollup.warehouse, rollup.day, rollup.scans, rollup.validations,
+             validation_rate(rollup.scans, rollup.validations), rollup.battery_scans)
+            for rollup in warehouse_rollups(start, end, warehouse).order_by(WarehouseDailyRollup.warehouse, WarehouseDailyRollup.day))
+    return export_response(f'Warehouse_Summary_{start}_{end}',
+                           ['Warehouse', 'Day', 'Scooters Scanned', 'Scooters Validated', 'Validation Rate (%)', 'Batteries Scanned'], rows)
+
+# Background Job Routes
+
+@app.route('/jobs', methods=['POST'])
+@serialized_write
+def create_job():
+    data = request.get_json() or {}
+    kind = data.pop('kind', None)
+    data.pop('cache_key', None)  # Only set by the server
+    logging.debug(f"Creating {kind} job with {data}.")
+    if kind not in JOB_KINDS:
+        return jsonify({'status': 'invalid', 'message': f'kind must be one of {", ".join(JOB_KINDS)}'}), 400
+    if kind in DIRECT_EXPORT_KINDS:
+        model, endpoint, export_rows = DIRECT_EXPORT_KINDS[kind]
+        lst = db.session.get(model, data.get('list_id'))
+        if lst:
+            cache_key = export_cache_key(lst)
+            if os.path.exists(export_cache_path(cache_key)) or export_rows(lst) <= EXPORT_SYNC_MAX_ROWS:
+                # A cache hit or a small list is cheap enough for the download request itself
+                logging.debug(f"Serving {kind} of list {lst.id} directly.")
+                return jsonify({'status': 'success', 'download_url': url_for(endpoint, list_id=lst.id)})
+            # The job's workbook is the export of this revision; cache it for later downloads
+            data['cache_key'] = cache_key
+    prune_jobs()
+    job = Job(id=uuid.uuid4().hex, kind=kind, params=json.dumps(data))
+    db.session.add(job)
+    db.session.commit()
+    # Submitted after the commit; the worker waits for this request's write lock anyway
+    get_job_executor().submit(run_job, job.id)
+    logging.debug(f"Job {job.id} queued.")
+    response = jsonify({'status': 'success', 'job': job_payload(job)})
+    response.status_code = 202
+    response.headers['Location'] = url_for('job_status', job_id=job.id)
+    return response
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = db.session.get(Job, job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify({'status': 'success', 'job': job_payload(job)})
+
+@app.route('/jobs/<job_id>/download')
+def download_job(job_id):
+    job = db.session.get(Job, job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    if job.status != 'finished':
+        return jsonify({'status': 'error', 'message': f'Job is {job.status}'}), 409
+    logging.debug(f"Downloading artifact of job {job_id}.")
+    return send_file(os.path.join(app.config['JOB_ARTIFACT_DIR'], job.artifact), download_name=job.download_name, as_attachment=True)
 
 # Battery Scanning Routes
 
 @app.route('/battery_scan', methods=['GET', 'POST'])
+@serialized_write
 def battery_scan():
     if request.method == 'POST':
         logging.debug("Received POST request at /battery_scan.")
@@ -619,73 +2702,121 @@ def battery_scan():
         return redirect(url_for('index'))
 
 @app.route('/save_battery_scan', methods=['POST'])
+@idempotent
+@serialized_write
 def save_battery_scan():
     data = request.get_json()
-    logging.debug(f"Received battery scan data: {data}")
+    hot_debug("Received battery scan data: %s", data)
     session_id = data.get('session_id')
     battery_id = data.get('battery_id')
-    logging.debug(f"Session ID: {session_id}, Battery ID: {battery_id}")
+    hot_debug("Session ID: %s, Battery ID: %s", session_id, battery_id)
 
     # Check if list exists
     current_list = BatteryList.query.get(session_id)
     if current_list:
-        logging.debug(f"Battery list found: {current_list.id}")
+        hot_debug("Battery list found: %s", current_list.id)
         # No validation on battery_id length or format
         # Check for duplicates within the list
-        existing_scan = next((scan for scan in current_list.scans if scan.battery_id == battery_id), None)
+        existing_scan = find_battery_scan(current_list.id, battery_id)
+        if existing_scan and created_by_this_request(existing_scan):
+            # A retry of a battery scan that was saved (possibly by another worker or before a restart)
+            return jsonify({'status': 'success', 'total': current_list.scan_count, 'scan_id': existing_scan.id})
         if existing_scan:
-            logging.debug(f"Battery ID {battery_id} already scanned in session {session_id}.")
+            hot_debug("Battery ID %s already scanned in session %s.", battery_id, session_id)
             return jsonify({'status': 'duplicate'})
         else:
             # Add new scan
-            new_scan = BatteryScan(battery_id=battery_id, list_id=session_id)
+            new_scan = BatteryScan(battery_id=battery_id, list_id=current_list.id, idempotency_key=request_idempotency_key())
             db.session.add(new_scan)
-            db.session.commit()
-            total_scans = len(current_list.scans)
-            logging.debug(f"Battery ID {battery_id} added to session {session_id}. Total items: {total_scans}")
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Scanned concurrently by another device
+                db.session.rollback()
+                hot_debug("Battery ID %s already scanned in session %s.", battery_id, session_id)
+                return jsonify({'status': 'duplicate'})
+            total_scans = current_list.scan_count
+            hot_debug("Battery ID %s added to session %s. Total items: %s", battery_id, session_id, total_scans)
             return jsonify({'status': 'success', 'total': total_scans, 'scan_id': new_scan.id})
     else:
-        logging.debug(f"Session ID {session_id} not found.")
+        hot_debug("Session ID %s not found.", session_id)
         return jsonify({'status': 'error'})
 
 @app.route('/add_manual_battery_entry', methods=['POST'])
+@idempotent
+@serialized_write
 def add_manual_battery_entry():
     data = request.get_json()
-    logging.debug(f"Received manual battery entry data: {data}")
+    hot_debug("Received manual battery entry data: %s", data)
     list_id = data.get('list_id')
     battery_id = data.get('battery_id').strip()
-    logging.debug(f"List ID: {list_id}, Battery ID: {battery_id}")
+    hot_debug("List ID: %s, Battery ID: %s", list_id, battery_id)
 
     # No validation on battery_id
     # Check if list exists
     current_list = BatteryList.query.get(list_id)
     if current_list:
-        logging.debug(f"Battery list found: {current_list.id}")
+        hot_debug("Battery list found: %s", current_list.id)
         # Check for duplicates within the list
-        existing_scan = next((scan for scan in current_list.scans if scan.battery_id == battery_id), None)
+        existing_scan = find_battery_scan(current_list.id, battery_id)
+        if existing_scan and created_by_this_request(existing_scan):
+            # A retry of a battery scan that was saved (possibly by another worker or before a restart)
+            return jsonify({'status': 'success', 'total': current_list.scan_count, 'scan_id': existing_scan.id})
         if existing_scan:
-            logging.debug(f"Battery ID {battery_id} already exists in battery list {list_id}.")
+            hot_debug("Battery ID %s already exists in battery list %s.", battery_id, list_id)
             return jsonify({'status': 'duplicate'})
         else:
             # Add new scan
-            new_scan = BatteryScan(battery_id=battery_id, list_id=list_id)
+            new_scan = BatteryScan(battery_id=battery_id, list_id=current_list.id, idempotency_key=request_idempotency_key())
             db.session.add(new_scan)
-            db.session.commit()
-            total_scans = len(current_list.scans)
-            logging.debug(f"Battery ID {battery_id} added manually to battery list {list_id}. Total items: {total_scans}")
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Added concurrently by another device
+                db.session.rollback()
+                hot_debug("Battery ID %s already exists in battery list %s.", battery_id, list_id)
+                return jsonify({'status': 'duplicate'})
+            total_scans = current_list.scan_count
+            hot_debug("Battery ID %s added manually to battery list %s. Total items: %s", battery_id, list_id, total_scans)
             return jsonify({'status': 'success', 'total': total_scans, 'scan_id': new_scan.id})
     else:
-        logging.debug(f"Battery list ID {list_id} not found.")
+        hot_debug("Battery list ID %s not found.", list_id)
+        return jsonify({'status': 'error'})
+
+@app.route('/save_battery_scan_batch', methods=['POST'])
+@serialized_write
+def save_battery_scan_batch():
+    data = request.get_json()
+    session_id = data.get('session_id')
+    battery_ids = get_batch_ids(data, 'battery_ids')
+    hot_debug("Received battery scan batch for session %s", session_id)
+    if battery_ids is None:
+        return jsonify({'status': 'invalid', 'message': f'battery_ids must be a list of at most {MAX_BATCH_SIZE} IDs'}), 400
+    idempotency_keys = get_batch_keys(data, len(battery_ids))
+    if idempotency_keys is None:
+        return jsonify({'status': 'invalid', 'message': 'idempotency_keys must be a list with one key (or null) per ID'}), 400
+
+    current_list = BatteryList.query.get(session_id)
+    if current_list:
+        results = run_keyed_batch(BatteryScan, 'battery_id', ingest_battery_scan_batch, current_list.id, battery_ids, idempotency_keys)
+        total_scans = current_list.scan_count
+        hot_debug("Battery scan batch saved to session %s. Total items: %s", session_id, total_scans)
+        return jsonify({'status': 'success', 'results': results, 'total': total_scans})
+    else:
+        hot_debug("Session ID %s not found.", session_id)
         return jsonify({'status': 'error'})
 
 @app.route('/battery_lists')
 def battery_lists():
     logging.debug("Fetching all battery lists.")
     all_lists = BatteryList.query.order_by(BatteryList.timestamp.desc()).all()
-    total_batteries = sum(len(lst.scans) for lst in all_lists)
+    total_batteries = db.session.query(db.func.count(BatteryScan.id)).scalar()
+    # Count batteries found in more than one list
+    duplicate_count = battery_duplicate_counts().order_by(None).count()
     logging.debug(f"Total battery lists found: {len(all_lists)}")
     logging.debug(f"Total batteries scanned: {total_batteries}")
-    return render_template('battery_lists.html', lists=all_lists, total_batteries=total_batteries)
+    logging.debug(f"Total battery duplicates: {duplicate_count}")
+    return render_template('battery_lists.html', lists=all_lists, total_batteries=total_batteries, duplicate_count=duplicate_count)
 
 @app.route('/battery_list/<int:list_id>')
 def view_battery_list(list_id):
@@ -693,41 +2824,93 @@ def view_battery_list(list_id):
     current_list = BatteryList.query.get(list_id)
     if current_list:
         logging.debug(f"Battery list found: {current_list.id}")
-        scans = current_list.scans
-        logging.debug(f"Total scans in battery list: {len(scans)}")
-        return render_template('view_battery_list.html', list=current_list, scans=scans)
+        # Scans are loaded page by page from the list contents API
+        def render():
+            total_scans = current_list.scan_count
+            logging.debug(f"Total scans in battery list: {total_scans}")
+            return render_template('view_battery_list.html', list=current_list, total_scans=total_scans, page_size=LIST_PAGE_SIZE)
+        return conditional_list_response(current_list, render, PAGE_ETAG_SALT)
     else:
         logging.debug(f"Battery list {list_id} not found.")
         return 'Battery list not found', 404
 
+@app.route('/api/battery_lists/<int:list_id>/scans')
+def battery_list_scans_api(list_id):
+    after_id, limit = get_page_arguments()
+    logging.debug(f"Fetching scans of battery list {list_id} after scan {after_id}. Limit: {limit}")
+    current_list = BatteryList.query.get(list_id)
+    if not current_list:
+        logging.debug(f"Battery list {list_id} not found.")
+        return jsonify({'status': 'error', 'message': 'Battery list not found'}), 404
+
+    def render():
+        items, next_cursor = battery_scan_page(list_id, after_id, limit)
+        logging.debug(f"Returning {len(items)} scans of battery list {list_id}. Next cursor: {next_cursor}")
+        return jsonify({'status': 'success', 'items': items, 'next_cursor': next_cursor})
+    return conditional_list_response(current_list, render, f'-{after_id}-{limit}')
+
 @app.route('/export_battery_list/<int:list_id>')
 def export_battery_list(list_id):
     logging.debug(f"Exporting battery data for list {list_id}.")
     current_list = BatteryList.query.get(list_id)
     if current_list:
         logging.debug(f"Battery list found: {current_list.id}")
-        data = []
-        for scan in current_list.scans:
-            battery_id = scan.battery_id  # No normalization
-            local_time = scan.timestamp.astimezone(local_tz)
-            data.append({
-                'Battery ID': battery_id,
-                'Timestamp': local_time.strftime('%H:%M | %d.%m.%Y')
-            })
-
-        df = pd.DataFrame(data)
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df.to_excel(writer, index=False)
-        output.seek(0)
-        filename = f'Battery_{current_list.name}_{current_list.warehouse}_{current_list.timestamp.strftime("%Y%m%d%H%M%S")}.xlsx'
-        logging.debug(f"Battery data exported successfully for list {list_id}. Filename: {filename}")
-        return send_file(output, download_name=filename, as_attachment=True)
+        filename = f'Battery_{current_list.name}_{current_list.warehouse}_{current_list.timestamp.strftime("%Y%m%d%H%M%S")}'
+        logging.debug(f"Streaming battery export for list {list_id}. Filename: {filename}")
+        cache_key = export_cache_key(current_list)
+        return conditional_list_response(current_list, lambda: export_response(filename, ['Battery ID', 'Timestamp'], battery_export_rows(list_id), cache_key),
+                                         f'-{request.args.get("format", "xlsx")}-v{EXPORT_FORMAT_VERSION}')
     else:
         logging.debug(f"No data found for battery list {list_id}.")
         return 'No data found for this battery list.'
 
+@app.route('/export_battery_lists')
+def export_battery_lists():
+    list_ids = get_export_list_ids()
+    logging.debug(f"Exporting battery lists {list_ids} into one workbook.")
+    lists = BatteryList.query.filter(BatteryList.id.in_(list_ids)).order_by(BatteryList.timestamp).all() if list_ids else []
+    if not lists:
+        return 'No data found for these battery lists.'
+    sheets = ((f'{lst.name} {lst.warehouse}', ['Battery ID', 'Timestamp'], battery_export_rows(lst.id)) for lst in lists)
+    output = write_xlsx(sheets)
+    filename = f'Battery_Lists_{get_local_time().strftime("%Y%m%d%H%M%S")}.xlsx'
+    return send_file(output, download_name=filename, as_attachment=True)
+
+@app.route('/check_battery_duplicates')
+def check_battery_duplicates():
+    logging.debug("Checking for battery duplicates.")
+    page = request.args.get('page', 1, type=int)
+    # Read one page of duplicated batteries from the aggregate over the normalized ID index
+    pagination = battery_duplicate_counts().paginate(page=page, per_page=DUPLICATES_PER_PAGE, error_out=False)
+    page_ids = [row.normalized_id for row in pagination.items]
+
+    # Fetch the scans and lists for this page in one query
+    entries = defaultdict(list)
+    if page_ids:
+        rows = (db.session.query(BatteryScan.normalized_id, BatteryList)
+                .join(BatteryList, BatteryScan.list_id == BatteryList.id)
+                .filter(BatteryScan.normalized_id.in_(page_ids))
+                .order_by(BatteryScan.id))
+        for normalized_id, lst in rows:
+            entries[normalized_id].append(lst)
+
+    duplicate_details = []
+    for row in pagination.items:
+        duplicate_details.append({
+            'battery_id': row.normalized_id,
+            'count': row.scan_count,
+            'lists': entries[row.normalized_id]
+        })
+    logging.debug(f"Battery duplicates on page {page}: {len(duplicate_details)} of {pagination.total}")
+    return render_template('battery_duplicates.html', duplicates=duplicate_details, pagination=pagination)
+
+@app.route('/export_battery_duplicates')
+def export_battery_duplicates():
+    logging.debug("Streaming battery duplicates export.")
+    return export_response('duplicate_batteries', ['Battery ID', 'Occurrences', 'Lists'], battery_duplicate_export_rows())
+
 @app.route('/delete_battery_list/<int:list_id>', methods=['POST'])
+@serialized_write
 def delete_battery_list(list_id):
     logging.debug(f"Deleting battery list {list_id}.")
     current_list = BatteryList.query.get(list_id)
@@ -741,14 +2924,17 @@ def delete_battery_list(list_id):
         return 'Battery list not found', 404
 
 @app.route('/delete_battery_scan/<int:scan_id>', methods=['POST'])
+@serialized_write
 def delete_battery_scan(scan_id):
     logging.debug(f"Deleting battery scan {scan_id}.")
     scan = BatteryScan.query.get(scan_id)
     if scan:
+        current_list = db.session.get(BatteryList, scan.list_id)
         db.session.delete(scan)
         db.session.commit()
-        logging.debug(f"Battery scan {scan_id} deleted successfully.")
-        return jsonify({'status': 'success'})
+        total_scans = current_list.scan_count
+        logging.debug(f"Battery scan {scan_id} deleted successfully. Total items: {total_scans}")
+        return jsonify({'status': 'success', 'total': total_scans})
     else:
         logging.debug(f"Battery scan {scan_id} not found.")
         return jsonify({'status': 'error'})
@@ -759,12 +2945,211 @@ def sw():
     logging.debug("Serving service worker.")
     return app.send_static_file('sw.js')
 
-# Initialize the database
-with app.app_context():
+# Function to measure the import time of a module in a fresh interpreter, broken down by its direct imports
+def measure_import_times(module):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=basedir, capture_output=True, text=True)
+    timings = {}
+    # -X importtime lists each module after its own imports, so collect direct imports until the module itself
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        if depth == 0:
+            if name == module:
+                timings[f'{module} (module body)'] = int(self_us) / 1000
+                return timings
+            timings = {}
+        elif depth == 1:
+            timings[name] = timings.get(name, 0) + int(cumulative_us) / 1000
+    return timings
+
+# Database initialization (no longer run at import time)
+@app.cli.command('init-db')
+def init_db():
+    """Create the schema for a fresh database and stamp it at the latest migration."""
+    if db.inspect(db.engine).get_table_names():
+        click.echo('Database already has tables; run `flask db upgrade` instead.')
+        return
     logging.debug("Initializing database.")
     db.create_all()
-    logging.debug("Database initialized.")
+    stamp()
+    click.echo('Database initialized.')
+
+@app.cli.command('concurrency-check')
+@click.option('--scanners', default=8, help='Number of scanners posting in parallel.')
+@click.option('--scooters', default=200, help='Number of distinct scooters every scanner posts.')
+@click.option('--in-place', is_flag=True, hidden=True, help='Run against the configured database (used for the temporary one).')
+def concurrency_check(scanners, scooters, in_place):
+    """Run parallel scanners against a throwaway database and verify no scan is lost or duplicated."""
+    if not in_place:
+        # A temporary database, created like a fresh install (schema, triggers, migration stamp) and
+        # opened with the same pragmas (they are set per connection), so the real one is never written
+        with tempfile.TemporaryDirectory(prefix='concurrency-check-') as temp_dir:
+            env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(temp_dir, 'check.db'), FLASK_APP=os.path.join(basedir, 'app.py'))
+            flask = [sys.executable, '-m', 'flask']
+            setup = subprocess.run(flask + ['init-db'], cwd=basedir, env=env, capture_output=True, text=True)
+            if setup.returncode:
+                raise click.ClickException(f'Creating the temporary database failed:\n{setup.stderr[-2000:]}')
+            check = subprocess.run(flask + ['concurrency-check', '--scanners', str(scanners), '--scooters', str(scooters), '--in-place'],
+                                   cwd=basedir, env=env)
+        if check.returncode:
+            sys.exit(check.returncode)
+        return
+
+    with serialized_write_transaction():
+        check_list = List(name='__concurrency_check__', warehouse='__concurrency_check__')
+        db.session.add(check_list)
+        db.session.commit()
+        list_id = check_list.id
+    scooter_ids = [f'CC{number:05d}' for number in range(scooters)]
+
+    # Every scanner posts every scooter, mixing URL and plain IDs, in its own order
+    def run_scanner(scanner_number):
+        client = app.test_client()
+        order = random.Random(scanner_number).sample(scooter_ids, len(scooter_ids))
+        statuses = defaultdict(int)
+        for scooter_id in order:
+            posted_id = f'https://tier.app/{scooter_id.lower()}' if scanner_number % 2 else scooter_id
+            response = client.post('/save_scan', json={'session_id': list_id, 'scooter_id': posted_id})
+            statuses[response.get_json()['status'] if response.status_code == 200 else f'http_{response.status_code}'] += 1
+            response = client.post('/save_validation', json={'session_id': list_id, 'scooter_id': posted_id})
+            statuses['validation_' + (response.get_json()['status'] if response.status_code == 200 else f'http_{response.status_code}')] += 1
+        return statuses
+
+    started = time.perf_counter()
+    totals = defaultdict(int)
+    try:
+        with ThreadPoolExecutor(max_workers=scanners) as executor:
+            for statuses in executor.map(run_scanner, range(scanners)):
+                for status, count in statuses.items():
+                    totals[status] += count
+        elapsed = time.perf_counter() - started
+        stored = db.session.query(Scan.normalized_id, db.func.count(Scan.id)).filter(Scan.list_id == list_id).group_by(Scan.normalized_id).all()
+        stored_validations = Validation.query.filter_by(list_id=list_id).count()
+        counted = validation_totals(list_id)
+    finally:
+        # Removed even when a scanner fails
+        db.session.rollback()
+        with serialized_write_transaction():
+            db.session.delete(List.query.get(list_id))
+            db.session.commit()
+
+    click.echo(f'{scanners} scanners x {scooters} scooters in {elapsed:.2f}s: {dict(totals)}')
+    problems = []
+    if len(stored) != scooters:
+        problems.append(f'{scooters - len(stored)} scans lost')
+    if any(count > 1 for normalized_id, count in stored):
+        problems.append('duplicate scans stored')
+    if totals['success'] != scooters or totals['validation_success'] != scooters:
+        problems.append('success count does not match the number of scooters')
+    if stored_validations != scooters:
+        problems.append(f'{stored_validations} validations stored instead of {scooters}')
+    if counted != (stored_validations, sum(count for normalized_id, count in stored)):
+        problems.append(f'list counters {counted} do not match the stored rows')
+    if set(totals) - {'success', 'duplicate', 'validation_success', 'validation_duplicate'}:
+        problems.append('unexpected statuses returned')
+    if problems:
+        raise click.ClickException('; '.join(problems))
+    click.echo('No scans lost or duplicated.')
+
+@app.cli.command('startup-report')
+@click.option('--budget-ms', type=float, default=None, help='Fail if importing app.py takes longer than this.')
+def startup_report(budget_ms):
+    """Report the import-time breakdown of app.py against the cold start budget."""
+    budget_ms = budget_ms if budget_ms is not None else app.config['COLD_START_BUDGET_MS']
+    timings = measure_import_times('app')
+    total_ms = sum(timings.values())
+    click.echo(f'{"Import":<40} {"ms":>10}')
+    for name, elapsed_ms in sorted(timings.items(), key=lambda item: item[1], reverse=True):
+        click.echo(f'{name:<40} {elapsed_ms:>10.1f}')
+    click.echo(f'{"Total":<40} {total_ms:>10.1f} (budget {budget_ms:.0f})')
+    for name in DEFERRED_IMPORTS:
+        deferred_ms = sum(measure_import_times(name).values())
+        click.echo(f'{name + " (deferred to first use)":<40} {deferred_ms:>10.1f}')
+    problem = schema_problem()
+    click.echo(f'Database schema: {problem or "up to date"}')
+    if total_ms > budget_ms:
+        raise click.ClickException(f'Cold start import took {total_ms:.1f} ms, over the {budget_ms:.0f} ms budget.')
+    if problem:
+        raise click.ClickException(problem)
+
+@app.cli.command('archive-lists')
+@click.option('--older-than-days', type=int, default=None, help='Archive validated lists unchanged for this many days (default ARCHIVE_AFTER_DAYS).')
+@click.option('--dry-run', is_flag=True, help='Only report the lists that would be archived.')
+@click.option('--vacuum', is_flag=True, help='Compact the database file afterwards.')
+def archive_lists(older_than_days, dry_run, vacuum):
+    """Move validated lists older than the archive age out of the hot tables into archive files."""
+    older_than_days = older_than_days if older_than_days is not None else app.config['ARCHIVE_AFTER_DAYS']
+    cutoff = get_utc_time() - timedelta(days=older_than_days)
+    list_ids = [lst.id for lst in archivable_lists(cutoff)]
+    click.echo(f'{len(list_ids)} validated lists unchanged for {older_than_days} days.')
+    if dry_run:
+        return
+    archived_scans = 0
+    for list_id in list_ids:
+        # One write transaction per list, so scanners are only held up briefly
+        with serialized_write_transaction():
+            # Re-checked under the write lock: the list may have changed or gone since
+            lst = archivable_lists(cutoff).filter(List.id == list_id).first()
+            if not lst:
+                continue
+            archived = archive_list(lst)
+            archived_scans += archived.scan_count
+            click.echo(f'Archived list {list_id} ({archived.name} - {archived.warehouse}): {archived.scan_count} scans.')
+    click.echo(f'Archived {archived_scans} scans to {app.config["ARCHIVE_DIR"]}.')
+    if vacuum:
+        with serialized_write_transaction():
+            # VACUUM cannot run inside a transaction, so it goes through a raw connection
+            connection = db.engine.raw_connection()
+            try:
+                connection.driver_connection.execute('VACUUM')
+            finally:
+                connection.close()
+        click.echo('Database compacted.')
+
+@app.cli.command('repair-counters')
+@click.option('--dry-run', is_flag=True, help='Only report the lists whose counters are wrong.')
+def repair_counters(dry_run):
+    """Recompute the scan and validation counters of every list and battery list."""
+    counters = [
+        (List, {'scan_count': (Scan, Scan.list_id), 'validated_count': (Validation, Validation.list_id)}),
+        (BatteryList, {'scan_count': (BatteryScan, BatteryScan.list_id)}),
+    ]
+    with serialized_write_transaction():
+        for list_model, columns in counters:
+            # Counted with correlated subqueries over the list_id indexes
+            actual = {column: db.select(db.func.count(model.id)).where(list_id == list_model.id).scalar_subquery()
+                      for column, (model, list_id) in columns.items()}
+            drifted = list_model.query.filter(db.or_(*[getattr(list_model, column) != count for column, count in actual.items()]))
+            for lst in drifted.with_entities(list_model.id, *[getattr(list_model, column) for column in columns], *actual.values()):
+                click.echo(f'{list_model.__tablename__} {lst[0]}: {dict(zip(columns, lst[1:1 + len(columns)]))} -> {dict(zip(columns, lst[1 + len(columns):]))}')
+            repaired = drifted.count()
+            if not dry_run and repaired:
+                drifted.update({getattr(list_model, column): count for column, count in actual.items()}, synchronize_session=False)
+                db.session.commit()
+            click.echo(f'{repaired} {list_model.__tablename__} counters {"wrong" if dry_run else "repaired"}.')
+
+@app.cli.command('rebuild-rollups')
+@click.option('--since', default=None, help='Only recompute days from this day on (YYYY-MM-DD); all days by default.')
+def rebuild_rollups_command(since):
+    """Recompute the warehouse daily rollups from the lists, their scans and the archives."""
+    if since:
+        try:
+            since = datetime.strptime(since, '%Y-%m-%d').strftime('%Y-%m-%d')
+        except ValueError:
+            raise click.BadParameter('Use the YYYY-MM-DD format.', param_hint='--since')
+    started = time.perf_counter()
+    with serialized_write_transaction():
+        rebuild_rollups(since)
+        rollup_days = warehouse_rollups(since or '', '9999-12-31').count()
+    click.echo(f'Rebuilt {rollup_days} warehouse days{f" from {since} on" if since else ""} in {time.perf_counter() - started:.2f}s.')
 
 
 if __name__ == '__main__':
+    with app.app_context():
+        problem = schema_problem()
+    if problem:
+        sys.exit(problem)
     app.run(debug=True)
@@ -0,0 +1,296 @@
+"""Benchmark suite modelling warehouse scanning sessions.
+
+Generates a synthetic scooters database, replays scan / validate / export /
+duplicate workloads through the Flask test client with simulated concurrent
+devices and writes per-workload throughput and per-route tail latency as JSON.
+Exports run twice: first against an empty export cache (cold), then again
+with the cache filled by the first run (warm).
+
+Usage:
+    python benchmark.py --lists 300 --scans 30000 --devices 4 --output bench.json
+    python benchmark.py --output new.json --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+URL_PREFIXES = ['https://tier.app/', 'https://qr.tier-services.io/', '']
+URL_PREFIX_WEIGHTS = [0.6, 0.3, 0.1]
+WAREHOUSES = ['Wien', 'Graz', 'Linz', 'Salzburg', 'Innsbruck']
+
+
+# Function to parse command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lists', type=int, default=300, help='Number of historical lists to generate.')
+    parser.add_argument('--scans', type=int, default=30000, help='Total number of historical scans.')
+    parser.add_argument('--duplicate-rate', type=float, default=0.05, help='Share of scans that reuse a scooter from another list.')
+    parser.add_argument('--validated-rate', type=float, default=0.3, help='Share of lists that have been validated.')
+    parser.add_argument('--devices', type=int, default=4, help='Number of concurrent devices replaying workloads.')
+    parser.add_argument('--session-size', type=int, default=200, help='Scooters scanned per device in the scan workload.')
+    parser.add_argument('--repeat', type=int, default=5, help='Requests per device for page and export workloads.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database', help='SQLite file to use (default: a temporary file).')
+    parser.add_argument('--output', default='bench_results.json', help='Where to write the JSON results.')
+    parser.add_argument('--compare', help='Previous results JSON to compare against.')
+    return parser.parse_args()
+
+
+# Function to generate a random scooter ID as a scanner would read it
+def random_scanned_id(rng, short_id):
+    prefix = rng.choices(URL_PREFIXES, URL_PREFIX_WEIGHTS)[0]
+    if prefix:
+        return prefix + short_id
+    # Manual entries are typed in either case
+    return short_id.lower() if rng.random() < 0.5 else short_id
+
+
+# Function to fill the database with synthetic lists, scans and validations
+def generate_dataset(app_module, args, rng):
+    db, List, Scan, Validation = app_module.db, app_module.List, app_module.Scan, app_module.Validation
+    started = time.perf_counter()
+    scans_per_list = max(1, args.scans // args.lists)
+    now = datetime.now()
+    used_ids = []
+    next_number = 100000
+    with app_module.app.app_context():
+        db.create_all()
+        # Mark the fresh schema as current, like `flask init-db`
+        app_module.stamp()
+        for list_number in range(args.lists):
+            timestamp = now - timedelta(days=args.lists - list_number)
+            is_validated = rng.random() < args.validated_rate
+            lst = List(name=f'Bench list {list_number}', warehouse=rng.choice(WAREHOUSES), timestamp=timestamp,
+                       is_validated=is_validated, validation_timestamp=timestamp if is_validated else None)
+            db.session.add(lst)
+            db.session.flush()
+            short_ids = set()
+            while len(short_ids) < scans_per_list:
+                if used_ids and rng.random() < args.duplicate_rate:
+                    short_ids.add(rng.choice(used_ids))
+                else:
+                    short_ids.add(f'{rng.choice(["AE", "BB", "CC"])}{next_number}')
+                    next_number += 1
+            scan_rows = []
+            validation_rows = []
+            for short_id in short_ids:
+                scan_rows.append({'scooter_id': random_scanned_id(rng, short_id), 'normalized_id': short_id,
+                                  'reversed_id': short_id[::-1], 'timestamp': timestamp, 'list_id': lst.id})
+                if is_validated and rng.random() < 0.95:
+                    validation_rows.append({'scooter_id': scan_rows[-1]['scooter_id'], 'normalized_id': short_id,
+                                            'timestamp': timestamp, 'list_id': lst.id, 'is_valid': True})
+            used_ids.extend(short_ids)
+            db.session.execute(Scan.__table__.insert(), scan_rows)
+            if validation_rows:
+                db.session.execute(Validation.__table__.insert(), validation_rows)
+        db.session.commit()
+    return {'seconds': round(time.perf_counter() - started, 3), 'lists': args.lists, 'scans': scans_per_list * args.lists}
+
+
+# Function to pick the list IDs the read workloads use, distinct while there are enough lists
+def sample_list_ids(app_module, rng, count):
+    with app_module.app.app_context():
+        list_ids = [row.id for row in app_module.db.session.query(app_module.List.id)]
+    if count <= len(list_ids):
+        return rng.sample(list_ids, count)
+    return [rng.choice(list_ids) for _ in range(count)]
+
+
+# Function to empty the export cache so the next exports are built from scratch
+def clear_export_cache(app_module):
+    cache_dir = app_module.app.config['EXPORT_CACHE_DIR']
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.makedirs(cache_dir)
+
+
+# Function to create a fresh list for each device's scanning session
+def create_session_lists(app_module, devices):
+    with app_module.app.app_context():
+        session_lists = [app_module.List(name=f'Bench session {device_number}', warehouse='Wien') for device_number in range(devices)]
+        app_module.db.session.add_all(session_lists)
+        app_module.db.session.commit()
+        return [lst.id for lst in session_lists]
+
+
+# Function to replay requests from several devices concurrently and collect latencies per route
+def replay(app_module, devices, device_requests):
+    latencies = {}
+
+    def run_device(device_number):
+        client = app_module.app.test_client()
+        timings = []
+        for route, method, url, payload in device_requests(device_number, client):
+            started = time.perf_counter()
+            if method == 'POST':
+                response = client.post(url, json=payload)
+            else:
+                response = client.get(url)
+                response.get_data()
+            timings.append((route, (time.perf_counter() - started) * 1000, response.status_code))
+        return timings
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=devices) as executor:
+        for timings in executor.map(run_device, range(devices)):
+            for route, elapsed_ms, status_code in timings:
+                latencies.setdefault(route, {'samples': [], 'errors': 0})
+                latencies[route]['samples'].append(elapsed_ms)
+                if status_code >= 500:
+                    latencies[route]['errors'] += 1
+    return latencies, time.perf_counter() - started
+
+
+# Function to summarize latency samples of one route.
+# Routes of a workload run interleaved, so throughput is only reported per workload
+def summarize(samples, errors):
+    samples = sorted(samples)
+
+    def percentile(fraction):
+        return round(samples[min(len(samples) - 1, int(fraction * len(samples)))], 3)
+
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'mean_ms': round(sum(samples) / len(samples), 3),
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': round(samples[-1], 3),
+    }
+
+
+# Function to run every workload and return the per-route results
+def run_workloads(app_module, args, rng):
+    read_list_ids = sample_list_ids(app_module, rng, args.devices * args.repeat)
+    with app_module.app.app_context():
+        duplicated_ids = [row.normalized_id for row in app_module.ScooterOccurrence.query.filter(app_module.ScooterOccurrence.scan_count > 1).limit(args.session_size)]
+    session_list_ids = create_session_lists(app_module, args.devices)
+
+    def scan_session(device_number, client):
+        # Each device scans its own list; a few IDs are re-scanned or already in other lists
+        list_id = session_list_ids[device_number]
+        device_rng = random.Random(args.seed + device_number)
+        short_ids = [f'DV{device_number:02d}{number:05d}' for number in range(args.session_size)]
+        for short_id in short_ids:
+            if duplicated_ids and device_rng.random() < args.duplicate_rate:
+                short_id = device_rng.choice(duplicated_ids)
+            yield 'save_scan', 'POST', '/save_scan', {'session_id': list_id, 'scooter_id': random_scanned_id(device_rng, short_id)}
+            if device_rng.random() < 0.05:
+                yield 'save_scan', 'POST', '/save_scan', {'session_id': list_id, 'scooter_id': short_id}
+        for short_id in short_ids:
+            yield 'save_validation', 'POST', '/save_validation', {'session_id': list_id, 'scooter_id': random_scanned_id(device_rng, short_id)}
+
+    def page_session(device_number, client):
+        for repeat in range(args.repeat):
+            list_id = read_list_ids[device_number * args.repeat + repeat]
+            yield 'validate_list_overview', 'GET', f'/validate_list_overview/{list_id}', None
+            yield 'validate_scan', 'GET', f'/validate_scan/{list_id}', None
+            yield 'view_list', 'GET', f'/list/{list_id}', None
+            yield 'list_scans_api', 'GET', f'/api/lists/{list_id}/scans?status=missing', None
+            yield 'lists', 'GET', '/lists', None
+            yield 'validate_lists', 'GET', '/validate_lists', None
+            if duplicated_ids:
+                # Typeahead: a dispatcher typing the first characters of a scooter ID
+                yield 'search_api', 'GET', f'/api/search?q={duplicated_ids[repeat % len(duplicated_ids)][:4]}', None
+
+    # Each device exports different lists, so the cold run never hits a cache entry built by another device
+    def export_session(device_number, client):
+        for repeat in range(args.repeat):
+            list_id = read_list_ids[device_number * args.repeat + repeat]
+            yield 'export', 'GET', f'/export/{list_id}', None
+            yield 'export_csv', 'GET', f'/export/{list_id}?format=csv', None
+
+    def duplicate_session(device_number, client):
+        for repeat in range(args.repeat):
+            yield 'check_duplicates', 'GET', '/check_duplicates', None
+        yield 'export_duplicates', 'GET', '/export_duplicates', None
+
+    results = {}
+    workloads = [('scan', scan_session), ('pages', page_session), ('export_cold', export_session),
+                 ('export_warm', export_session), ('duplicates', duplicate_session)]
+    for workload, device_requests in workloads:
+        if workload == 'export_cold':
+            clear_export_cache(app_module)
+        latencies, wall_seconds = replay(app_module, args.devices, device_requests)
+        requests = sum(len(data['samples']) for data in latencies.values())
+        results[workload] = {
+            'requests': requests,
+            'wall_seconds': round(wall_seconds, 3),
+            'throughput_rps': round(requests / wall_seconds, 2) if wall_seconds else None,
+            'routes': {route: summarize(data['samples'], data['errors']) for route, data in latencies.items()},
+        }
+        print(f'{workload}: {requests} requests in {wall_seconds:.2f}s ({results[workload]["throughput_rps"]} req/s)')
+        for route, summary in results[workload]['routes'].items():
+            print(f'  {route:<24} {summary["requests"]:>6} req  p50 {summary["p50_ms"]:>8} ms  p95 {summary["p95_ms"]:>8} ms  p99 {summary["p99_ms"]:>8} ms')
+    return results
+
+
+# Function to print the change of each route's p95 against previous results
+def compare(results, previous_path):
+    with open(previous_path) as previous_file:
+        previous = json.load(previous_file)
+    print(f'Compared with {previous_path} ({previous.get("started_at")}):')
+    for workload, workload_summary in results['workloads'].items():
+        previous_workload = previous.get('workloads', {}).get(workload, {})
+        # Older results kept the routes directly under the workload
+        previous_routes = previous_workload.get('routes', previous_workload)
+        for route, summary in workload_summary['routes'].items():
+            before = previous_routes.get(route)
+            if not before:
+                continue
+            change = (summary['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+            print(f'  {workload}/{route:<24} p95 {before["p95_ms"]:>8} -> {summary["p95_ms"]:>8} ms ({change:+.1f}%)')
+
+
+# Function to read the current git commit, if any
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp(prefix='scooter-bench-')
+    database = args.database or os.path.join(work_dir, 'bench.db')
+    # Configure the app before importing it; exports are cached in the run's own directory
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(database)
+    os.environ['EXPORT_CACHE_DIR'] = os.path.join(work_dir, 'export_cache')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as app_module
+
+    results = {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'database': database,
+        'export_cache_dir': os.environ['EXPORT_CACHE_DIR'],
+    }
+    print(f'Generating dataset in {database} ...')
+    results['dataset'] = generate_dataset(app_module, args, rng)
+    print(f'Dataset: {results["dataset"]}')
+    results['workloads'] = run_workloads(app_module, args, rng)
+
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f'Results written to {args.output}')
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Add the list changes feed recorded by triggers on scan and validation
+
+Revision ID: 017e02f3b9fa
+Revises: 59926ccd648b
+Create Date: 2026-10-18 15:48:03.402716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '017e02f3b9fa'
+down_revision = '59926ccd648b'
+branch_labels = None
+depends_on = None
+
+# Kept in sync with LIST_CHANGE_TRIGGERS in app.py
+LIST_CHANGE_TABLES = ['scan', 'validation']
+
+
+def list_change_triggers(table):
+    forget = f"DELETE FROM list_change WHERE item_type = '{table}' AND row_id = {{row}}.id AND list_id = {{row}}.list_id;"
+    record = ("INSERT INTO list_change (list_id, item_type, row_id, op, scooter_id, normalized_id, timestamp) "
+              f"SELECT {{row}}.list_id, '{table}', {{row}}.id, '{{op}}', {{row}}.scooter_id, {{row}}.normalized_id, {{row}}.timestamp")
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_change_insert AFTER INSERT ON {table} BEGIN "
+        f"{forget.format(row='NEW')} {record.format(row='NEW', op='upsert')}; END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_change_delete AFTER DELETE ON {table} BEGIN "
+        f"{forget.format(row='OLD')} {record.format(row='OLD', op='delete')}; END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_change_update AFTER UPDATE ON {table} BEGIN "
+        f"{forget.format(row='OLD')} {record.format(row='OLD', op='delete')} WHERE OLD.list_id IS NOT NEW.list_id; "
+        f"{forget.format(row='NEW')} {record.format(row='NEW', op='upsert')}; END",
+    ]
+
+
+TRIGGERS = [trigger_sql for table in LIST_CHANGE_TABLES for trigger_sql in list_change_triggers(table)] + [
+    "CREATE TRIGGER IF NOT EXISTS list_change_cleanup AFTER DELETE ON list BEGIN DELETE FROM list_change WHERE list_id = OLD.id; END",
+]
+
+TRIGGER_NAMES = [f'{table}_change_{action}' for table in LIST_CHANGE_TABLES for action in ('insert', 'delete', 'update')] + [
+    'list_change_cleanup'
+]
+
+
+def upgrade():
+    op.create_table('list_change',
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('list_id', sa.Integer(), nullable=False),
+    sa.Column('item_type', sa.String(length=20), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(length=10), nullable=False),
+    sa.Column('scooter_id', sa.String(length=200), nullable=True),
+    sa.Column('normalized_id', sa.String(length=200), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('seq'),
+    sqlite_autoincrement=True
+    )
+    with op.batch_alter_table('list_change', schema=None) as batch_op:
+        batch_op.create_index('ix_list_change_item', ['item_type', 'row_id'], unique=False)
+        batch_op.create_index('ix_list_change_list_seq', ['list_id', 'seq'], unique=False)
+
+    # Existing rows become the initial feed, so a client starting from 0 sees the whole list
+    for table in LIST_CHANGE_TABLES:
+        op.execute(
+            "INSERT INTO list_change (list_id, item_type, row_id, op, scooter_id, normalized_id, timestamp) "
+            f"SELECT list_id, '{table}', id, 'upsert', scooter_id, normalized_id, timestamp FROM {table} ORDER BY id"
+        )
+
+    for trigger_sql in TRIGGERS:
+        op.execute(trigger_sql)
+
+
+def downgrade():
+    for trigger_name in reversed(TRIGGER_NAMES):
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger_name}')
+
+    with op.batch_alter_table('list_change', schema=None) as batch_op:
+        batch_op.drop_index('ix_list_change_list_seq')
+        batch_op.drop_index('ix_list_change_item')
+
+    op.drop_table('list_change')
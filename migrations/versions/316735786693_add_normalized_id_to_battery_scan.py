@@ -0,0 +1,97 @@
+"""Add normalized battery ID to BatteryScan
+
+Revision ID: 316735786693
+Revises: 532729f39b7b
+Create Date: 2026-10-18 13:24:52.671049
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '316735786693'
+down_revision = '532729f39b7b'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+# Number of rows backfilled per UPDATE batch
+BACKFILL_CHUNK_SIZE = 1000
+
+
+# Kept in sync with normalize_battery_id in app.py (migrations must not import the app)
+def normalize_battery_id(battery_id):
+    return (battery_id or '').strip().upper()
+
+
+def backfill_normalized_ids():
+    connection = op.get_bind()
+    battery_scan = sa.table('battery_scan',
+                            sa.column('id', sa.Integer),
+                            sa.column('battery_id', sa.String),
+                            sa.column('normalized_id', sa.String))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(battery_scan.c.id, battery_scan.c.battery_id)
+            .where(battery_scan.c.id > last_id)
+            .order_by(battery_scan.c.id)
+            .limit(BACKFILL_CHUNK_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        connection.execute(
+            battery_scan.update().where(battery_scan.c.id == sa.bindparam('row_id')).values(normalized_id=sa.bindparam('norm_id')),
+            [{'row_id': row.id, 'norm_id': normalize_battery_id(row.battery_id)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def remove_duplicates():
+    # Keep the earliest row per (list_id, normalized_id) so the unique constraint can be created.
+    # The dropped rows are copied to battery_scan_removed_duplicates first; downgrade puts them back
+    connection = op.get_bind()
+    duplicates = ('FROM battery_scan WHERE id NOT IN '
+                  '(SELECT MIN(id) FROM battery_scan GROUP BY list_id, normalized_id)')
+    removed_ids = [row.id for row in connection.execute(sa.text(f'SELECT id {duplicates} ORDER BY id'))]
+    if not removed_ids:
+        return
+    op.execute(f'CREATE TABLE battery_scan_removed_duplicates AS SELECT * {duplicates}')
+    op.execute(f'DELETE {duplicates}')
+    logger.warning(f"Removed {len(removed_ids)} duplicate battery_scan rows "
+                   f"(copied to battery_scan_removed_duplicates): ids {removed_ids}")
+
+
+def restore_duplicates():
+    if not sa.inspect(op.get_bind()).has_table('battery_scan_removed_duplicates'):
+        return
+    op.execute('INSERT INTO battery_scan SELECT * FROM battery_scan_removed_duplicates')
+    op.execute('DROP TABLE battery_scan_removed_duplicates')
+    logger.info("Restored the duplicate battery_scan rows from battery_scan_removed_duplicates.")
+
+
+def upgrade():
+    with op.batch_alter_table('battery_scan', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('normalized_id', sa.String(length=200), nullable=True))
+
+    backfill_normalized_ids()
+    remove_duplicates()
+
+    with op.batch_alter_table('battery_scan', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_battery_scan_normalized_id'), ['normalized_id'], unique=False)
+        batch_op.create_unique_constraint('uq_battery_scan_list_normalized_id', ['list_id', 'normalized_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('battery_scan', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_battery_scan_list_normalized_id', type_='unique')
+
+    restore_duplicates()
+
+    with op.batch_alter_table('battery_scan', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_battery_scan_normalized_id'))
+        batch_op.drop_column('normalized_id')
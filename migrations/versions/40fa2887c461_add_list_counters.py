@@ -0,0 +1,59 @@
+"""Add scan and validation counters to List and BatteryList maintained by triggers
+
+Revision ID: 40fa2887c461
+Revises: e9934681058f
+Create Date: 2026-10-18 18:20:14.902731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '40fa2887c461'
+down_revision = 'e9934681058f'
+branch_labels = None
+depends_on = None
+
+# Kept in sync with LIST_COUNTER_TRIGGERS in app.py
+LIST_COUNTER_TABLES = [('scan', 'list', 'scan_count'), ('validation', 'list', 'validated_count'), ('battery_scan', 'battery_list', 'scan_count')]
+
+
+def list_counter_triggers(table, list_table, column):
+    change = f"UPDATE {list_table} SET {column} = {column} {{sign}} 1 WHERE id = {{row}}.list_id;"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_counter_insert AFTER INSERT ON {table} BEGIN "
+        f"{change.format(sign='+', row='NEW')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_counter_delete AFTER DELETE ON {table} BEGIN "
+        f"{change.format(sign='-', row='OLD')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_counter_update AFTER UPDATE OF list_id ON {table} "
+        f"WHEN OLD.list_id IS NOT NEW.list_id BEGIN "
+        f"{change.format(sign='-', row='OLD')} {change.format(sign='+', row='NEW')} END",
+    ]
+
+
+TRIGGERS = [trigger_sql for table, list_table, column in LIST_COUNTER_TABLES for trigger_sql in list_counter_triggers(table, list_table, column)]
+
+TRIGGER_NAMES = [f'{table}_counter_{action}' for table, list_table, column in LIST_COUNTER_TABLES for action in ('insert', 'delete', 'update')]
+
+COUNTER_COLUMNS = [('list', 'scan_count'), ('list', 'validated_count'), ('battery_list', 'scan_count')]
+
+
+def upgrade():
+    # Plain ALTER TABLE ADD/DROP COLUMN: recreating the list tables would drop their triggers
+    for table_name, column in COUNTER_COLUMNS:
+        op.add_column(table_name, sa.Column(column, sa.Integer(), server_default='0', nullable=False))
+
+    for table, list_table, column in LIST_COUNTER_TABLES:
+        op.execute(f"UPDATE {list_table} SET {column} = (SELECT count(*) FROM {table} WHERE {table}.list_id = {list_table}.id)")
+
+    for trigger_sql in TRIGGERS:
+        op.execute(trigger_sql)
+
+
+def downgrade():
+    for trigger_name in reversed(TRIGGER_NAMES):
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger_name}')
+
+    for table_name, column in reversed(COUNTER_COLUMNS):
+        op.drop_column(table_name, column)
@@ -0,0 +1,32 @@
+"""Index scan and battery_scan list IDs for keyset-paginated list pages
+
+Revision ID: 532729f39b7b
+Revises: e95bc81a6cee
+Create Date: 2026-10-18 12:41:19.305672
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '532729f39b7b'
+down_revision = 'e95bc81a6cee'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scan', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_scan_list_id'), ['list_id'], unique=False)
+
+    with op.batch_alter_table('battery_scan', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_battery_scan_list_id'), ['list_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('battery_scan', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_battery_scan_list_id'))
+
+    with op.batch_alter_table('scan', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_scan_list_id'))
@@ -0,0 +1,58 @@
+"""Add ArchivedList and ArchivedScooter for the cold archive tier
+
+Revision ID: 59926ccd648b
+Revises: 816629cbfce7
+Create Date: 2026-10-18 15:10:42.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '59926ccd648b'
+down_revision = '816629cbfce7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('archived_list',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('list_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(length=100), nullable=True),
+    sa.Column('warehouse', sa.String(length=100), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('validation_timestamp', sa.DateTime(), nullable=True),
+    sa.Column('scan_count', sa.Integer(), nullable=False),
+    sa.Column('validation_count', sa.Integer(), nullable=False),
+    sa.Column('archive_file', sa.String(length=255), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_list', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_list_list_id'), ['list_id'], unique=False)
+
+    op.create_table('archived_scooter',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('normalized_id', sa.String(length=200), nullable=False),
+    sa.Column('is_validated', sa.Boolean(), nullable=False),
+    sa.Column('archived_list_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['archived_list_id'], ['archived_list.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_scooter', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_scooter_archived_list_id'), ['archived_list_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_archived_scooter_normalized_id'), ['normalized_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('archived_scooter', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_scooter_normalized_id'))
+        batch_op.drop_index(batch_op.f('ix_archived_scooter_archived_list_id'))
+
+    op.drop_table('archived_scooter')
+    with op.batch_alter_table('archived_list', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_list_list_id'))
+
+    op.drop_table('archived_list')
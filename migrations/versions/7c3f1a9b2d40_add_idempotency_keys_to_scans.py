@@ -0,0 +1,34 @@
+"""Store the Idempotency-Key of the creating request on scans, validations and battery scans
+
+Revision ID: 7c3f1a9b2d40
+Revises: 40fa2887c461
+Create Date: 2026-10-18 21:04:37.215804
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3f1a9b2d40'
+down_revision = '40fa2887c461'
+branch_labels = None
+depends_on = None
+
+# Kept in sync with IDEMPOTENCY_KEY_MAX_LENGTH in app.py
+IDEMPOTENCY_KEY_MAX_LENGTH = 64
+
+KEYED_TABLES = ['scan', 'validation', 'battery_scan']
+
+
+def upgrade():
+    # Plain ADD COLUMN / CREATE INDEX: recreating the tables (batch_alter_table) would drop their triggers
+    for table_name in KEYED_TABLES:
+        op.add_column(table_name, sa.Column('idempotency_key', sa.String(length=IDEMPOTENCY_KEY_MAX_LENGTH), nullable=True))
+        op.create_index(op.f(f'ix_{table_name}_idempotency_key'), table_name, ['idempotency_key'], unique=True)
+
+
+def downgrade():
+    for table_name in reversed(KEYED_TABLES):
+        op.drop_index(op.f(f'ix_{table_name}_idempotency_key'), table_name=table_name)
+        op.drop_column(table_name, 'idempotency_key')
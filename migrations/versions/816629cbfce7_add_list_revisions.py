@@ -0,0 +1,61 @@
+"""Add revision counters to List and BatteryList maintained by triggers
+
+Revision ID: 816629cbfce7
+Revises: 316735786693
+Create Date: 2026-10-18 14:02:37.518264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '816629cbfce7'
+down_revision = '316735786693'
+branch_labels = None
+depends_on = None
+
+# Kept in sync with LIST_REVISION_TRIGGERS in app.py
+LIST_REVISION_TABLES = [('scan', 'list'), ('validation', 'list'), ('battery_scan', 'battery_list')]
+
+
+def list_revision_triggers(table, list_table):
+    bump = f"UPDATE {list_table} SET revision = revision + 1, modified_at = CURRENT_TIMESTAMP WHERE id"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_revision_insert AFTER INSERT ON {table} BEGIN {bump} = NEW.list_id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_revision_delete AFTER DELETE ON {table} BEGIN {bump} = OLD.list_id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_revision_update AFTER UPDATE ON {table} BEGIN {bump} IN (OLD.list_id, NEW.list_id); END",
+    ]
+
+
+TRIGGERS = [trigger_sql for table, list_table in LIST_REVISION_TABLES for trigger_sql in list_revision_triggers(table, list_table)] + [
+    "CREATE TRIGGER IF NOT EXISTS list_revision_update AFTER UPDATE OF name, warehouse, timestamp, is_validated, validation_timestamp ON list "
+    "BEGIN UPDATE list SET revision = revision + 1, modified_at = CURRENT_TIMESTAMP WHERE id = NEW.id; END",
+    "CREATE TRIGGER IF NOT EXISTS battery_list_revision_update AFTER UPDATE OF name, warehouse, timestamp ON battery_list "
+    "BEGIN UPDATE battery_list SET revision = revision + 1, modified_at = CURRENT_TIMESTAMP WHERE id = NEW.id; END",
+]
+
+TRIGGER_NAMES = [f'{table}_revision_{action}' for table, list_table in LIST_REVISION_TABLES for action in ('insert', 'delete', 'update')] + [
+    'list_revision_update', 'battery_list_revision_update'
+]
+
+
+def upgrade():
+    for table_name in ('list', 'battery_list'):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('revision', sa.Integer(), server_default='0', nullable=False))
+            batch_op.add_column(sa.Column('modified_at', sa.DateTime(), nullable=True))
+        op.execute(f'UPDATE {table_name} SET modified_at = CURRENT_TIMESTAMP')
+
+    for trigger_sql in TRIGGERS:
+        op.execute(trigger_sql)
+
+
+def downgrade():
+    for trigger_name in reversed(TRIGGER_NAMES):
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger_name}')
+
+    for table_name in ('battery_list', 'list'):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.drop_column('modified_at')
+            batch_op.drop_column('revision')
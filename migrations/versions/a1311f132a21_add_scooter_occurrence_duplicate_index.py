@@ -0,0 +1,68 @@
+"""Add scooter_occurrence duplicate index maintained by scan triggers
+
+Revision ID: a1311f132a21
+Revises: d04e991b86fe
+Create Date: 2026-10-18 10:03:47.215904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1311f132a21'
+down_revision = 'd04e991b86fe'
+branch_labels = None
+depends_on = None
+
+# Kept in sync with SCOOTER_OCCURRENCE_TRIGGERS in app.py
+TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS scan_occurrence_insert AFTER INSERT ON scan
+    WHEN NEW.normalized_id IS NOT NULL
+    BEGIN
+        INSERT OR IGNORE INTO scooter_occurrence (normalized_id, scan_count) VALUES (NEW.normalized_id, 0);
+        UPDATE scooter_occurrence SET scan_count = scan_count + 1 WHERE normalized_id = NEW.normalized_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS scan_occurrence_delete AFTER DELETE ON scan
+    WHEN OLD.normalized_id IS NOT NULL
+    BEGIN
+        UPDATE scooter_occurrence SET scan_count = scan_count - 1 WHERE normalized_id = OLD.normalized_id;
+        DELETE FROM scooter_occurrence WHERE normalized_id = OLD.normalized_id AND scan_count <= 0;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS scan_occurrence_update AFTER UPDATE OF normalized_id ON scan
+    WHEN OLD.normalized_id IS NOT NEW.normalized_id
+    BEGIN
+        UPDATE scooter_occurrence SET scan_count = scan_count - 1 WHERE normalized_id = OLD.normalized_id;
+        DELETE FROM scooter_occurrence WHERE normalized_id = OLD.normalized_id AND scan_count <= 0;
+        INSERT OR IGNORE INTO scooter_occurrence (normalized_id, scan_count) SELECT NEW.normalized_id, 0 WHERE NEW.normalized_id IS NOT NULL;
+        UPDATE scooter_occurrence SET scan_count = scan_count + 1 WHERE normalized_id = NEW.normalized_id;
+    END""",
+]
+
+
+def upgrade():
+    op.create_table('scooter_occurrence',
+        sa.Column('normalized_id', sa.String(length=200), nullable=False),
+        sa.Column('scan_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('normalized_id')
+    )
+    with op.batch_alter_table('scooter_occurrence', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_scooter_occurrence_scan_count'), ['scan_count'], unique=False)
+
+    # Build the index from the existing scans, then keep it current with triggers
+    op.execute(
+        'INSERT INTO scooter_occurrence (normalized_id, scan_count) '
+        'SELECT normalized_id, COUNT(*) FROM scan WHERE normalized_id IS NOT NULL GROUP BY normalized_id'
+    )
+    for trigger_sql in TRIGGERS:
+        op.execute(trigger_sql)
+
+
+def downgrade():
+    op.execute('DROP TRIGGER IF EXISTS scan_occurrence_update')
+    op.execute('DROP TRIGGER IF EXISTS scan_occurrence_delete')
+    op.execute('DROP TRIGGER IF EXISTS scan_occurrence_insert')
+    with op.batch_alter_table('scooter_occurrence', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_scooter_occurrence_scan_count'))
+
+    op.drop_table('scooter_occurrence')
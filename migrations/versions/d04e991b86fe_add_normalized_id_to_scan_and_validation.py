@@ -0,0 +1,107 @@
+"""Add normalized scooter ID to Scan and Validation
+
+Revision ID: d04e991b86fe
+Revises: bb8000642fab
+Create Date: 2026-10-18 09:12:31.482113
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd04e991b86fe'
+down_revision = 'bb8000642fab'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+# Number of rows backfilled per UPDATE batch
+BACKFILL_CHUNK_SIZE = 1000
+
+# Kept in sync with normalize_scooter_id in app.py (migrations must not import the app)
+SCOOTER_ID_PREFIXES = ['https://tier.app/', 'https://qr.tier-services.io/']
+
+
+def normalize_scooter_id(scooter_id):
+    scooter_id = scooter_id or ''
+    for prefix in SCOOTER_ID_PREFIXES:
+        if scooter_id.startswith(prefix):
+            scooter_id = scooter_id[len(prefix):]
+            break
+    return scooter_id.upper()
+
+
+def backfill_normalized_ids(table_name):
+    connection = op.get_bind()
+    table = sa.table(table_name,
+                     sa.column('id', sa.Integer),
+                     sa.column('scooter_id', sa.String),
+                     sa.column('normalized_id', sa.String))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(table.c.id, table.c.scooter_id)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(BACKFILL_CHUNK_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        connection.execute(
+            table.update().where(table.c.id == sa.bindparam('row_id')).values(normalized_id=sa.bindparam('norm_id')),
+            [{'row_id': row.id, 'norm_id': normalize_scooter_id(row.scooter_id)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def remove_duplicates(table_name):
+    # Keep the earliest row per (list_id, normalized_id) so the unique constraint can be created.
+    # The dropped rows are copied to <table>_removed_duplicates first; downgrade puts them back
+    connection = op.get_bind()
+    duplicates = (f'FROM {table_name} WHERE id NOT IN '
+                  f'(SELECT MIN(id) FROM {table_name} GROUP BY list_id, normalized_id)')
+    removed_ids = [row.id for row in connection.execute(sa.text(f'SELECT id {duplicates} ORDER BY id'))]
+    if not removed_ids:
+        return
+    backup_table = f'{table_name}_removed_duplicates'
+    op.execute(f'CREATE TABLE {backup_table} AS SELECT * {duplicates}')
+    op.execute(f'DELETE {duplicates}')
+    logger.warning(f"Removed {len(removed_ids)} duplicate {table_name} rows (copied to {backup_table}): ids {removed_ids}")
+
+
+def restore_duplicates(table_name):
+    backup_table = f'{table_name}_removed_duplicates'
+    if not sa.inspect(op.get_bind()).has_table(backup_table):
+        return
+    op.execute(f'INSERT INTO {table_name} SELECT * FROM {backup_table}')
+    op.execute(f'DROP TABLE {backup_table}')
+    logger.info(f"Restored the duplicate {table_name} rows from {backup_table}.")
+
+
+def upgrade():
+    for table_name in ('scan', 'validation'):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('normalized_id', sa.String(length=200), nullable=True))
+
+        backfill_normalized_ids(table_name)
+        remove_duplicates(table_name)
+
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.create_index(batch_op.f(f'ix_{table_name}_normalized_id'), ['normalized_id'], unique=False)
+            batch_op.create_unique_constraint(f'uq_{table_name}_list_normalized_id', ['list_id', 'normalized_id'])
+
+
+def downgrade():
+    for table_name in ('validation', 'scan'):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.drop_constraint(f'uq_{table_name}_list_normalized_id', type_='unique')
+
+        restore_duplicates(table_name)
+
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table_name}_normalized_id'))
+            batch_op.drop_column('normalized_id')
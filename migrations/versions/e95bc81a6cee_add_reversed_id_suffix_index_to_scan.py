@@ -0,0 +1,58 @@
+"""Add reversed scooter ID suffix index to Scan
+
+Revision ID: e95bc81a6cee
+Revises: a1311f132a21
+Create Date: 2026-10-18 11:26:05.873410
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e95bc81a6cee'
+down_revision = 'a1311f132a21'
+branch_labels = None
+depends_on = None
+
+# Number of rows backfilled per UPDATE batch
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def backfill_reversed_ids():
+    connection = op.get_bind()
+    scan = sa.table('scan',
+                    sa.column('id', sa.Integer),
+                    sa.column('normalized_id', sa.String),
+                    sa.column('reversed_id', sa.String))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(scan.c.id, scan.c.normalized_id)
+            .where(scan.c.id > last_id)
+            .order_by(scan.c.id)
+            .limit(BACKFILL_CHUNK_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        connection.execute(
+            scan.update().where(scan.c.id == sa.bindparam('row_id')).values(reversed_id=sa.bindparam('rev_id')),
+            [{'row_id': row.id, 'rev_id': (row.normalized_id or '')[::-1]} for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    with op.batch_alter_table('scan', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('reversed_id', sa.String(length=200), nullable=True))
+
+    backfill_reversed_ids()
+
+    with op.batch_alter_table('scan', schema=None) as batch_op:
+        batch_op.create_index('ix_scan_list_reversed_id', ['list_id', 'reversed_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('scan', schema=None) as batch_op:
+        batch_op.drop_index('ix_scan_list_reversed_id')
+        batch_op.drop_column('reversed_id')
@@ -0,0 +1,123 @@
+"""Add warehouse daily rollups maintained by triggers on scan, validation and battery_scan
+
+Revision ID: e9934681058f
+Revises: e1d60ac31c09
+Create Date: 2026-10-18 17:41:52.630917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9934681058f'
+down_revision = 'e1d60ac31c09'
+branch_labels = None
+depends_on = None
+
+# Kept in sync with ROLLUP_TRIGGERS in app.py
+ROLLUP_TABLES = [('scan', 'list_id, normalized_id, timestamp'), ('validation', 'list_id, normalized_id'), ('battery_scan', 'list_id, timestamp')]
+
+
+def rollup_scan_day(row):
+    return f"(SELECT date(timestamp) FROM scan WHERE list_id = {row}.list_id AND normalized_id = {row}.normalized_id)"
+
+
+def rollup_upsert(list_table, column, row, day, delta, condition=''):
+    return (f"INSERT INTO warehouse_daily_rollup (warehouse, day, {column}) "
+            f"SELECT COALESCE(warehouse, ''), {day}, {delta} FROM {list_table} "
+            f"WHERE id = {row}.list_id AND {day} IS NOT NULL {condition}"
+            f"ON CONFLICT (warehouse, day) DO UPDATE SET {column} = {column} + excluded.{column};")
+
+
+def rollup_cleanup(day):
+    return f"DELETE FROM warehouse_daily_rollup WHERE day = {day} AND scans = 0 AND validations = 0 AND battery_scans = 0;"
+
+
+def rollup_change(table, row, sign):
+    if table == 'scan':
+        day = f"date({row}.timestamp)"
+        validated = f"AND EXISTS (SELECT 1 FROM validation WHERE list_id = {row}.list_id AND normalized_id = {row}.normalized_id) "
+        sql = rollup_upsert('list', 'scans', row, day, sign) + ' ' + rollup_upsert('list', 'validations', row, day, sign, validated)
+    elif table == 'validation':
+        day = rollup_scan_day(row)
+        sql = rollup_upsert('list', 'validations', row, day, sign)
+    else:
+        day = f"date({row}.timestamp)"
+        sql = rollup_upsert('battery_list', 'battery_scans', row, day, sign)
+    return f"{sql} {rollup_cleanup(day)}" if sign < 0 else sql
+
+
+def rollup_triggers(table, columns):
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_rollup_insert AFTER INSERT ON {table} BEGIN {rollup_change(table, 'NEW', 1)} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_rollup_delete AFTER DELETE ON {table} BEGIN {rollup_change(table, 'OLD', -1)} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_rollup_update AFTER UPDATE OF {columns} ON {table} BEGIN "
+        f"{rollup_change(table, 'OLD', -1)} {rollup_change(table, 'NEW', 1)} END",
+    ]
+
+
+def rollup_warehouse_trigger(list_table, moves):
+    statements = []
+    for table, column, condition in moves:
+        for warehouse, sign in (('OLD', '-'), ('NEW', '')):
+            statements.append(f"INSERT INTO warehouse_daily_rollup (warehouse, day, {column}) "
+                              f"SELECT COALESCE({warehouse}.warehouse, ''), date(timestamp), {sign}count(*) FROM {table} "
+                              f"WHERE list_id = NEW.id AND timestamp IS NOT NULL {condition}GROUP BY date(timestamp) "
+                              f"ON CONFLICT (warehouse, day) DO UPDATE SET {column} = {column} + excluded.{column};")
+    statements.append("DELETE FROM warehouse_daily_rollup WHERE warehouse = COALESCE(OLD.warehouse, '') "
+                      "AND scans = 0 AND validations = 0 AND battery_scans = 0;")
+    return (f"CREATE TRIGGER IF NOT EXISTS {list_table}_rollup_warehouse AFTER UPDATE OF warehouse ON {list_table} "
+            f"WHEN OLD.warehouse IS NOT NEW.warehouse BEGIN {' '.join(statements)} END")
+
+
+TRIGGERS = [trigger_sql for table, columns in ROLLUP_TABLES for trigger_sql in rollup_triggers(table, columns)] + [
+    rollup_warehouse_trigger('list', [
+        ('scan', 'scans', ''),
+        ('scan', 'validations', "AND EXISTS (SELECT 1 FROM validation WHERE validation.list_id = scan.list_id AND validation.normalized_id = scan.normalized_id) "),
+    ]),
+    rollup_warehouse_trigger('battery_list', [('battery_scan', 'battery_scans', '')]),
+]
+
+TRIGGER_NAMES = [f'{table}_rollup_{action}' for table, columns in ROLLUP_TABLES for action in ('insert', 'delete', 'update')] + [
+    'list_rollup_warehouse', 'battery_list_rollup_warehouse'
+]
+
+
+def upgrade():
+    op.create_table('warehouse_daily_rollup',
+    sa.Column('warehouse', sa.String(length=100), nullable=False),
+    sa.Column('day', sa.String(length=10), nullable=False),
+    sa.Column('scans', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('validations', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('battery_scans', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('warehouse', 'day')
+    )
+    with op.batch_alter_table('warehouse_daily_rollup', schema=None) as batch_op:
+        batch_op.create_index('ix_warehouse_daily_rollup_day', ['day'], unique=False)
+
+    # Backfilled from the live tables (validations on the day of the scan they validate);
+    # lists already archived are added by `flask rebuild-rollups`
+    validated = "AND EXISTS (SELECT 1 FROM validation WHERE validation.list_id = scan.list_id AND validation.normalized_id = scan.normalized_id) "
+    for table, list_table, column, condition in (('scan', 'list', 'scans', ''), ('scan', 'list', 'validations', validated),
+                                                 ('battery_scan', 'battery_list', 'battery_scans', '')):
+        op.execute(
+            f"INSERT INTO warehouse_daily_rollup (warehouse, day, {column}) "
+            f"SELECT COALESCE({list_table}.warehouse, ''), date({table}.timestamp), count(*) FROM {table} "
+            f"JOIN {list_table} ON {list_table}.id = {table}.list_id WHERE {table}.timestamp IS NOT NULL {condition}"
+            f"GROUP BY COALESCE({list_table}.warehouse, ''), date({table}.timestamp) "
+            f"ON CONFLICT (warehouse, day) DO UPDATE SET {column} = {column} + excluded.{column}"
+        )
+
+    for trigger_sql in TRIGGERS:
+        op.execute(trigger_sql)
+
+
+def downgrade():
+    for trigger_name in reversed(TRIGGER_NAMES):
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger_name}')
+
+    with op.batch_alter_table('warehouse_daily_rollup', schema=None) as batch_op:
+        batch_op.drop_index('ix_warehouse_daily_rollup_day')
+
+    op.drop_table('warehouse_daily_rollup')
@@ -6,6 +6,7 @@ let overlay = document.getElementById('overlay');
 let scannedBatteryIdDiv = document.getElementById('scanned-battery-id');
 let batteryList = document.getElementById('battery-list');
 let totalBatteriesSpan = document.getElementById('total-batteries');
+let queuedBatteriesSpan = document.getElementById('queued-batteries');
 let zoomSlider = document.getElementById('zoom-slider');
 let scanSuccessSound = document.getElementById('scan-success-sound');
 
@@ -69,13 +70,8 @@ function processBatteryData(batteryId) {
     }
     lastScanTime = currentTime;
 
-    // Send battery data to server
-    fetch('/save_battery_scan', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ session_id: sessionId, battery_id: batteryId })
-    })
-    .then(response => response.json())
+    // Send battery data to server (queued while offline)
+    OfflineQueue.send('battery', sessionId, batteryId, '/save_battery_scan')
     .then(data => {
         console.debug("Response from save_battery_scan:", data);
         if (data.status === 'success') {
@@ -102,6 +98,22 @@ function processBatteryData(batteryId) {
             batteryList.insertBefore(listItem, batteryList.firstChild);
             totalBatteriesSpan.textContent = data.total;
             console.debug(`Battery ID ${batteryId} added to list. Total batteries: ${data.total}`);
+        } else if (data.status === 'queued') {
+            playSuccessSound();
+            // Flash orange overlay: saved on this device, not yet confirmed by the server
+            overlay.style.backgroundColor = 'orange';
+            overlay.style.opacity = '0.7';
+            setTimeout(() => {
+                overlay.style.opacity = '0';
+            }, 300);
+            scannedBatteryIdDiv.textContent = `${batteryId} (queued offline)`;
+            scannedBatteryIdDiv.style.display = 'block';
+            setTimeout(() => {
+                scannedBatteryIdDiv.style.display = 'none';
+            }, 5000);
+            addQueuedBatteryItem(batteryId, data.seq);
+            queuedBatteriesSpan.textContent = data.queued;
+            console.debug(`Battery ID ${batteryId} queued offline. Queued batteries: ${data.queued}`);
         } else if (data.status === 'duplicate') {
             console.debug("Duplicate battery ID detected:", batteryId);
             scannedBatteryIdDiv.textContent = "Duplicate ID: " + batteryId;
@@ -118,6 +130,60 @@ function processBatteryData(batteryId) {
     });
 }
 
+// Function to add a battery waiting in the offline queue to the list
+function addQueuedBatteryItem(batteryId, seq) {
+    let listItem = document.createElement('li');
+    listItem.dataset.queueSeq = seq;
+    listItem.textContent = `${batteryId} (queued)`;
+    batteryList.insertBefore(listItem, batteryList.firstChild);
+}
+
+// Function to tell whether a confirmed (not queued) entry for a battery is already shown
+function confirmedBatteryShown(batteryId) {
+    const normalizedId = batteryId.trim().toUpperCase();
+    return Array.from(batteryList.querySelectorAll('li:not([data-queue-seq])'))
+        .some(listItem => listItem.textContent.trim().toUpperCase() === normalizedId);
+}
+
+// Update the list once queued battery scans have been replayed to the server
+OfflineQueue.onReplay(replayed => {
+    if (replayed.kind !== 'battery' || replayed.session_id !== String(sessionId)) {
+        return;
+    }
+    replayed.items.forEach(item => {
+        const listItem = batteryList.querySelector(`li[data-queue-seq='${item.seq}']`);
+        if (!listItem) {
+            return;
+        }
+        if (item.result && item.result.status === 'success') {
+            delete listItem.dataset.queueSeq;
+            listItem.textContent = item.item_id;
+        } else if (item.result && item.result.status === 'duplicate' && !confirmedBatteryShown(item.item_id)) {
+            // The battery is in the list on the server but shown nowhere else on this page
+            // (e.g. saved by an earlier attempt whose response was lost): keep it
+            console.debug(`Queued battery ${item.item_id} already saved, keeping it.`);
+            delete listItem.dataset.queueSeq;
+            listItem.textContent = item.item_id;
+        } else {
+            // Already in the list (or rejected by the server)
+            console.debug(`Queued battery ${item.item_id} not added:`, item.result);
+            listItem.remove();
+        }
+    });
+    if (replayed.response.total !== undefined) {
+        totalBatteriesSpan.textContent = replayed.response.total;
+    }
+    OfflineQueue.pendingCount('battery', sessionId).then(queued => {
+        queuedBatteriesSpan.textContent = queued;
+    });
+});
+
+// Show battery scans still waiting in the offline queue from an earlier visit
+OfflineQueue.pendingItems('battery', sessionId).then(items => {
+    items.forEach(item => addQueuedBatteryItem(item.item_id, item.seq));
+    queuedBatteriesSpan.textContent = items.length;
+});
+
 // Function to play success sound
 function playSuccessSound() {
     // Check if the audio can be played (user interaction might be required)
@@ -0,0 +1,84 @@
+// Background jobs for heavy exports and reports: the job is queued on the server,
+// its progress is polled while it runs and the finished file is downloaded when it is ready.
+// Exports the server can answer cheaply (cached or small) come back as a direct download link.
+
+const JOB_POLL_INTERVAL_MS = 1000;
+
+// Function to run an export job and download its file.
+// button shows the progress while the job runs and is disabled until it ends.
+function runExportJob(kind, params, button) {
+    const label = button.textContent;
+    button.disabled = true;
+
+    function finish(message) {
+        button.disabled = false;
+        button.textContent = label;
+        if (message) {
+            alert(message);
+        }
+    }
+
+    function showProgress(job) {
+        if (job.status === 'queued') {
+            button.textContent = 'Queued...';
+        } else if (job.total) {
+            button.textContent = `Exporting ${Math.min(100, Math.floor(100 * job.progress / job.total))}%`;
+        } else {
+            button.textContent = `Exporting ${job.progress} rows...`;
+        }
+    }
+
+    function poll(statusUrl) {
+        return fetch(statusUrl)
+        .then(response => response.json())
+        .then(data => {
+            if (data.status !== 'success') {
+                finish(data.message || 'Export failed.');
+                return;
+            }
+            const job = data.job;
+            if (job.status === 'finished') {
+                console.debug(`Job ${job.id} finished, downloading ${job.download_url}`);
+                finish();
+                window.location.href = job.download_url;
+            } else if (job.status === 'failed') {
+                console.debug(`Job ${job.id} failed:`, job.error);
+                finish(job.error || 'Export failed.');
+            } else {
+                showProgress(job);
+                setTimeout(() => poll(statusUrl), JOB_POLL_INTERVAL_MS);
+            }
+        })
+        .catch(error => {
+            // Keep polling through short network drops; the job carries on on the server
+            console.debug("Error polling job:", error);
+            setTimeout(() => poll(statusUrl), JOB_POLL_INTERVAL_MS);
+        });
+    }
+
+    button.textContent = 'Queued...';
+    return fetch('/jobs', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(Object.assign({ kind: kind }, params))
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.status !== 'success') {
+            finish(data.message || 'Could not start the export.');
+            return;
+        }
+        if (data.download_url) {
+            console.debug(`Downloading ${kind} directly from ${data.download_url}`);
+            finish();
+            window.location.href = data.download_url;
+            return;
+        }
+        console.debug(`Queued ${kind} job ${data.job.id}.`);
+        return poll(`/jobs/${data.job.id}`);
+    })
+    .catch(error => {
+        console.debug("Error starting job:", error);
+        finish('Could not start the export.');
+    });
+}
@@ -0,0 +1,54 @@
+// Changes feed of a list: keeps a page current by fetching only the scans, validations
+// and deletions recorded since the last refresh, instead of reloading the whole list.
+// Refreshes when the page is shown again, becomes visible or the connection returns.
+
+// Function to follow the changes feed of a list from a sequence number.
+// applyChanges(changes, data) updates the page with one batch of changes, oldest first;
+// data also carries the list's current total_scooters and total_validated.
+function followListChanges(listId, since, applyChanges) {
+    let refreshing = null;
+
+    function fetchChanges() {
+        // Unchanged lists answer with a 304, which the browser serves from its cache
+        return fetch(`/api/lists/${listId}/changes?since=${since}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.status !== 'success') {
+                console.debug("Error loading list changes:", data);
+                return;
+            }
+            if (data.changes.length > 0) {
+                console.debug(`Applying ${data.changes.length} changes of list ${listId} since ${since}.`);
+                applyChanges(data.changes, data);
+            }
+            since = data.since;
+            if (data.has_more) {
+                return fetchChanges();
+            }
+        });
+    }
+
+    // Function to fetch and apply new changes; concurrent calls share the running refresh
+    function refresh() {
+        if (!refreshing) {
+            refreshing = fetchChanges()
+                .catch(error => console.debug("Error refreshing list changes:", error))
+                .finally(() => { refreshing = null; });
+        }
+        return refreshing;
+    }
+
+    window.addEventListener('pageshow', event => {
+        if (event.persisted) {
+            refresh();
+        }
+    });
+    document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'visible') {
+            refresh();
+        }
+    });
+    window.addEventListener('online', refresh);
+
+    return { refresh: refresh };
+}
@@ -5,6 +5,7 @@ let overlay = document.getElementById('overlay');
 let scannedScooterIdDiv = document.getElementById('scanned-scooter-id');
 let scooterList = document.getElementById('scooter-list');
 let totalScootersSpan = document.getElementById('total-scooters');
+let queuedScootersSpan = document.getElementById('queued-scooters');
 let beepSound = document.getElementById('beep-sound');
 let listContainer = document.getElementById('list-container');
 let isListVisible = false;
@@ -102,47 +103,36 @@ function processScannedData(scooterId) {
         }
     });
 
-    // Add to list
-    fetch('/save_scan', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ session_id: sessionId, scooter_id: scooterId })
-    })
-    .then(response => response.json())
+    // Add to list (queued while offline)
+    OfflineQueue.send('scan', sessionId, scooterId, '/save_scan')
     .then(data => {
         console.debug("Response from save_scan:", data);
-        if (data.status === 'success') {
+        if (data.status === 'success' || data.status === 'queued') {
             // Play beep sound
             beepSound.play();
 
-            // Flash green overlay
-            overlay.style.backgroundColor = 'green';
+            // Flash green overlay (orange while the scan waits in the offline queue)
+            overlay.style.backgroundColor = data.status === 'success' ? 'green' : 'orange';
             overlay.style.opacity = '0.7';
             setTimeout(() => {
                 overlay.style.opacity = '0';
             }, 300);
 
             // Display scanned scooter ID
-            scannedScooterIdDiv.textContent = displayId;
+            scannedScooterIdDiv.textContent = data.status === 'success' ? displayId : `${displayId} (queued offline)`;
             scannedScooterIdDiv.style.display = 'block';
             setTimeout(() => {
                 scannedScooterIdDiv.style.display = 'none';
             }, 5000);
 
-            let listItem = document.createElement('li');
-            listItem.dataset.scanId = data.scan_id; // Store the scan ID
-
-            let timestamp = new Date();
-            let formattedTime = timestamp.getHours().toString().padStart(2, '0') + ':' +
-                                timestamp.getMinutes().toString().padStart(2, '0') + ' | ' +
-                                timestamp.getDate().toString().padStart(2, '0') + '.' +
-                                (timestamp.getMonth() + 1).toString().padStart(2, '0') + '.' +
-                                timestamp.getFullYear();
-
-            listItem.innerHTML = `<span class="scooter-id" data-full-id="${scooterId}" data-short-id="${displayId}">${displayId}</span> - ${formattedTime} <button class="delete-scan-btn" data-scan-id="${data.scan_id}">Delete</button>`;
-            scooterList.insertBefore(listItem, scooterList.firstChild);
-            totalScootersSpan.textContent = data.total;
-            console.debug(`Scooter ID ${scooterId} added to list. Total scooters: ${data.total}`);
+            addScanListItem(scooterId, displayId, data);
+            if (data.status === 'success') {
+                totalScootersSpan.textContent = data.total;
+                console.debug(`Scooter ID ${scooterId} added to list. Total scooters: ${data.total}`);
+            } else {
+                queuedScootersSpan.textContent = data.queued;
+                console.debug(`Scooter ID ${scooterId} queued offline. Queued scooters: ${data.queued}`);
+            }
         } else if (data.status === 'duplicate') {
             console.debug("Duplicate scooter ID detected:", scooterId);
             // Do not flash red or play beep
@@ -167,6 +157,96 @@ function processScannedData(scooterId) {
     });
 }
 
+// Function to remove the URL prefix of a scooter ID for display
+function shortScooterId(scooterId) {
+    const validPrefixes = ['https://tier.app/', 'https://qr.tier-services.io/'];
+    const prefix = validPrefixes.find(prefix => scooterId.startsWith(prefix));
+    return prefix ? scooterId.slice(prefix.length) : scooterId;
+}
+
+// Add a scanned scooter to the list; queued scans get their delete button once the server confirms them
+function addScanListItem(scooterId, displayId, data) {
+    let listItem = document.createElement('li');
+
+    let timestamp = new Date();
+    let formattedTime = timestamp.getHours().toString().padStart(2, '0') + ':' +
+                        timestamp.getMinutes().toString().padStart(2, '0') + ' | ' +
+                        timestamp.getDate().toString().padStart(2, '0') + '.' +
+                        (timestamp.getMonth() + 1).toString().padStart(2, '0') + '.' +
+                        timestamp.getFullYear();
+
+    listItem.innerHTML = `<span class="scooter-id" data-full-id="${scooterId}" data-short-id="${displayId}">${displayId}</span> - ${formattedTime} `;
+    if (data.status === 'queued') {
+        listItem.dataset.queueSeq = data.seq;
+        listItem.insertAdjacentHTML('beforeend', '<span class="queued-marker">(queued)</span>');
+    } else {
+        confirmScanListItem(listItem, data.scan_id);
+    }
+    scooterList.insertBefore(listItem, scooterList.firstChild);
+}
+
+function confirmScanListItem(listItem, scanId) {
+    listItem.dataset.scanId = scanId; // Store the scan ID
+    delete listItem.dataset.queueSeq;
+    const marker = listItem.querySelector('.queued-marker');
+    if (marker) {
+        marker.remove();
+    }
+    listItem.insertAdjacentHTML('beforeend', `<button class="delete-scan-btn" data-scan-id="${scanId}">Delete</button>`);
+}
+
+// Function to tell whether a confirmed (not queued) entry for a scooter is already shown
+function confirmedScanShown(scooterId) {
+    const shortId = shortScooterId(scooterId).toUpperCase();
+    return Array.from(scooterList.querySelectorAll('li:not([data-queue-seq]) .scooter-id'))
+        .some(span => span.dataset.shortId.toUpperCase() === shortId);
+}
+
+// Update the list once queued scans have been replayed to the server
+OfflineQueue.onReplay(replayed => {
+    if (replayed.kind !== 'scan' || replayed.session_id !== String(sessionId)) {
+        return;
+    }
+    replayed.items.forEach(item => {
+        const listItem = scooterList.querySelector(`li[data-queue-seq='${item.seq}']`);
+        if (!listItem) {
+            return;
+        }
+        if (item.result && item.result.status === 'success') {
+            confirmScanListItem(listItem, item.result.scan_id);
+        } else if (item.result && item.result.status === 'duplicate' && !confirmedScanShown(item.item_id)) {
+            // The scooter is in the list on the server but shown nowhere else on this page
+            // (e.g. saved by an earlier attempt whose response was lost): keep it, without a delete button
+            console.debug(`Queued scan ${item.item_id} already saved, keeping it.`);
+            delete listItem.dataset.queueSeq;
+            const marker = listItem.querySelector('.queued-marker');
+            if (marker) {
+                marker.remove();
+            }
+        } else {
+            // Already in the list (or rejected by the server)
+            console.debug(`Queued scan ${item.item_id} not added:`, item.result);
+            listItem.remove();
+        }
+    });
+    if (replayed.response.total !== undefined) {
+        totalScootersSpan.textContent = replayed.response.total;
+    }
+    updateQueuedCount();
+});
+
+function updateQueuedCount() {
+    OfflineQueue.pendingCount('scan', sessionId).then(queued => {
+        queuedScootersSpan.textContent = queued;
+    });
+}
+
+// Show scans still waiting in the offline queue from an earlier visit
+OfflineQueue.pendingItems('scan', sessionId).then(items => {
+    items.forEach(item => addScanListItem(item.item_id, shortScooterId(item.item_id), { status: 'queued', seq: item.seq }));
+    queuedScootersSpan.textContent = items.length;
+});
+
 // Toggle list visibility
 document.getElementById('toggle-list-btn').addEventListener('click', () => {
     console.debug("Toggle List button clicked.");
@@ -0,0 +1,271 @@
+// Offline queue for scan, validation and battery POSTs.
+// When the network is down, items are stored in IndexedDB and replayed in order,
+// in compact batches, through the batch endpoints. Every item keeps an idempotency key,
+// so replaying an item that did reach the server returns its original result.
+// Only one context (page or service worker) replays at a time, and results are
+// broadcast to every open page.
+// Loaded by the scanning pages and by the service worker (importScripts).
+
+const OFFLINE_DB_NAME = 'scanner-offline';
+const OFFLINE_STORE = 'queue';
+const REPLAY_BATCH_SIZE = 100;
+const REPLAY_INTERVAL_MS = 15000;
+const REPLAY_SYNC_TAG = 'replay-offline-queue';
+const REPLAY_LOCK_NAME = 'offline-queue-replay';
+const REPLAY_CHANNEL_NAME = 'offline-queue-replay';
+
+// Batch endpoint and ID field for each kind of queued item
+const OFFLINE_ENDPOINTS = {
+    scan: { url: '/save_scan_batch', idsKey: 'scooter_ids', idKey: 'scooter_id' },
+    validation: { url: '/save_validation_batch', idsKey: 'scooter_ids', idKey: 'scooter_id' },
+    battery: { url: '/save_battery_scan_batch', idsKey: 'battery_ids', idKey: 'battery_id' }
+};
+
+const OfflineQueue = (() => {
+    let databasePromise = null;
+    let replaying = null;
+    const replayListeners = [];
+    const replayChannel = typeof BroadcastChannel !== 'undefined' ? new BroadcastChannel(REPLAY_CHANNEL_NAME) : null;
+
+    function openDatabase() {
+        if (!databasePromise) {
+            databasePromise = new Promise((resolve, reject) => {
+                const request = indexedDB.open(OFFLINE_DB_NAME, 1);
+                request.onupgradeneeded = () => {
+                    request.result.createObjectStore(OFFLINE_STORE, { keyPath: 'seq', autoIncrement: true });
+                };
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => reject(request.error);
+            });
+        }
+        return databasePromise;
+    }
+
+    // Function to run one request against the queue store and resolve with its result
+    function withStore(mode, makeRequest) {
+        return openDatabase().then(database => new Promise((resolve, reject) => {
+            const transaction = database.transaction(OFFLINE_STORE, mode);
+            const request = makeRequest(transaction.objectStore(OFFLINE_STORE));
+            transaction.oncomplete = () => resolve(request ? request.result : undefined);
+            transaction.onerror = () => reject(transaction.error);
+        }));
+    }
+
+    // Function to read every queued item, oldest first
+    function allItems() {
+        return withStore('readonly', store => store.getAll());
+    }
+
+    // Function to read the queued items of one session
+    function pendingItems(kind, sessionId) {
+        return allItems().then(items => items.filter(item => item.kind === kind && item.session_id === String(sessionId)));
+    }
+
+    function pendingCount(kind, sessionId) {
+        return pendingItems(kind, sessionId).then(items => items.length);
+    }
+
+    // Function to queue an item; a key already sent with a direct POST is kept for the replay
+    function enqueue(kind, sessionId, itemId, idempotencyKey) {
+        const item = {
+            kind: kind,
+            session_id: String(sessionId),
+            item_id: itemId,
+            idempotency_key: idempotencyKey || newIdempotencyKey(),
+            queued_at: new Date().toISOString()
+        };
+        return withStore('readwrite', store => store.add(item)).then(seq => {
+            console.debug(`Queued ${kind} ${itemId} for session ${sessionId} as #${seq}.`);
+            requestBackgroundSync();
+            return pendingCount(kind, sessionId).then(queued => ({ status: 'queued', seq: seq, queued: queued }));
+        });
+    }
+
+    function removeItems(seqs) {
+        return withStore('readwrite', store => {
+            seqs.forEach(seq => store.delete(seq));
+            return null;
+        });
+    }
+
+    // Function to ask the service worker to replay the queue once the network is back
+    function requestBackgroundSync() {
+        if (typeof navigator !== 'undefined' && navigator.serviceWorker && typeof window !== 'undefined') {
+            navigator.serviceWorker.ready.then(registration => {
+                if (registration.sync) {
+                    return registration.sync.register(REPLAY_SYNC_TAG);
+                }
+            }).catch(error => {
+                console.debug("Background sync registration failed:", error);
+            });
+        }
+    }
+
+    // Function to create a key that lets the server recognise a retried POST
+    function newIdempotencyKey() {
+        if (typeof crypto !== 'undefined' && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    }
+
+    // Function to post one item directly, or queue it when offline or while older items are still queued
+    function send(kind, sessionId, itemId, url) {
+        const endpoint = OFFLINE_ENDPOINTS[kind];
+        return allItems().catch(() => []).then(items => {
+            if (items.length > 0 || !navigator.onLine) {
+                // Keep the original order: new items wait behind the queue
+                return enqueue(kind, sessionId, itemId);
+            }
+            const idempotencyKey = newIdempotencyKey();
+            return postIdempotent(url, { session_id: sessionId, [endpoint.idKey]: itemId }, idempotencyKey)
+            .catch(error => {
+                console.debug(`Posting ${kind} ${itemId} failed, queueing it:`, error);
+                return enqueue(kind, sessionId, itemId, idempotencyKey);
+            });
+        });
+    }
+
+    // Function to POST JSON with an Idempotency-Key and retry it once on a network or server error.
+    // The retry reuses the key, so the server answers it with the original result instead of running it twice
+    function postIdempotent(url, payload, idempotencyKey) {
+        const key = idempotencyKey || newIdempotencyKey();
+        const post = () => fetch(url, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'Idempotency-Key': key },
+            body: JSON.stringify(payload)
+        })
+        .then(response => {
+            // 409: the first attempt is still running on the server
+            if (response.status >= 500 || response.status === 409) {
+                throw new Error(`Server error ${response.status}`);
+            }
+            return response.json();
+        });
+        return post().catch(error => {
+            console.debug(`POST to ${url} failed, retrying once:`, error);
+            return post();
+        });
+    }
+
+    // Function to take the oldest run of items sharing a kind and session, up to one batch
+    function nextBatch(items) {
+        const first = items[0];
+        const batch = [];
+        for (const item of items) {
+            if (item.kind !== first.kind || item.session_id !== first.session_id || batch.length >= REPLAY_BATCH_SIZE) {
+                break;
+            }
+            batch.push(item);
+        }
+        return batch;
+    }
+
+    function notify(replayed) {
+        replayListeners.forEach(listener => listener(replayed));
+    }
+
+    // Function to tell this context and every other open page about a replayed batch
+    function broadcast(replayed) {
+        notify(replayed);
+        if (replayChannel) {
+            replayChannel.postMessage(replayed);
+        }
+    }
+
+    async function replayQueue() {
+        while (true) {
+            const items = await allItems();
+            if (items.length === 0) {
+                return;
+            }
+            const batch = nextBatch(items);
+            const kind = batch[0].kind;
+            const sessionId = batch[0].session_id;
+            const endpoint = OFFLINE_ENDPOINTS[kind];
+            let data;
+            try {
+                const response = await fetch(endpoint.url, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        session_id: sessionId,
+                        [endpoint.idsKey]: batch.map(item => item.item_id),
+                        // Items queued before keys were stored have none
+                        idempotency_keys: batch.map(item => item.idempotency_key || null)
+                    })
+                });
+                if (response.status >= 500) {
+                    console.debug(`Replay of ${kind} batch failed with status ${response.status}, retrying later.`);
+                    return;
+                }
+                data = await response.json();
+            } catch (error) {
+                console.debug("Replay failed, still offline:", error);
+                return;
+            }
+            // Results are in the order of the batch; a missing list drops its items
+            await removeItems(batch.map(item => item.seq));
+            const results = data.results || batch.map(() => ({ status: data.status }));
+            console.debug(`Replayed ${batch.length} queued ${kind} items for session ${sessionId}.`);
+            broadcast({
+                kind: kind,
+                session_id: sessionId,
+                items: batch.map((item, index) => ({ seq: item.seq, item_id: item.item_id, result: results[index] })),
+                response: data
+            });
+        }
+    }
+
+    // Function to replay the queue while holding the cross-context lock; when another
+    // page or the service worker holds it, that context is already replaying
+    function replayWithLock() {
+        if (typeof navigator === 'undefined' || !navigator.locks) {
+            return replayQueue();
+        }
+        return navigator.locks.request(REPLAY_LOCK_NAME, { ifAvailable: true }, lock => {
+            if (!lock) {
+                console.debug("Offline queue is being replayed by another context.");
+                return null;
+            }
+            return replayQueue();
+        });
+    }
+
+    // Function to replay the queue; concurrent calls in this context share the running replay
+    function replay() {
+        if (!replaying) {
+            replaying = replayWithLock()
+                .catch(error => console.debug("Error replaying offline queue:", error))
+                .finally(() => { replaying = null; });
+        }
+        return replaying;
+    }
+
+    function onReplay(listener) {
+        replayListeners.push(listener);
+    }
+
+    // Pages replay on load, when the connection returns and periodically;
+    // the service worker also replays in the background. Replays from other
+    // contexts arrive on the broadcast channel
+    if (typeof window !== 'undefined') {
+        window.addEventListener('online', replay);
+        setInterval(replay, REPLAY_INTERVAL_MS);
+        if (replayChannel) {
+            replayChannel.addEventListener('message', event => notify(event.data));
+        }
+        // After the page scripts have registered their listeners
+        window.addEventListener('load', replay);
+    }
+
+    return {
+        send: send,
+        postIdempotent: postIdempotent,
+        replay: replay,
+        onReplay: onReplay,
+        pendingItems: pendingItems,
+        pendingCount: pendingCount,
+        newIdempotencyKey: newIdempotencyKey
+    };
+})();
@@ -0,0 +1,85 @@
+// Incremental loading of list contents from the keyset-paginated JSON API.
+// Pages are fetched when the "Load more" sentinel scrolls into view (or is clicked),
+// so large lists never have to be rendered in one go.
+
+// Function to format an ISO timestamp as 'HH:MM | DD.MM.YYYY'
+function formatScanTime(isoTimestamp) {
+    if (!isoTimestamp) {
+        return '';
+    }
+    const date = isoTimestamp.slice(0, 10).split('-');
+    return `${isoTimestamp.slice(11, 16)} | ${date[2]}.${date[1]}.${date[0]}`;
+}
+
+// Function to create a paged loader. url() returns the API URL of the current view,
+// renderItems(items) appends one page of items to the page.
+function createPagedLoader(url, renderItems, loadMoreButton) {
+    let nextCursor = 0;
+    let loading = false;
+    let generation = 0;
+
+    function loadNextPage() {
+        if (loading || nextCursor === null) {
+            return;
+        }
+        loading = true;
+        const requestGeneration = generation;
+        let failed = false;
+        const separator = url().includes('?') ? '&' : '?';
+        console.debug(`Loading page after scan ${nextCursor} from ${url()}`);
+        fetch(`${url()}${separator}after=${nextCursor}`)
+        .then(response => response.json())
+        .then(data => {
+            if (requestGeneration !== generation) {
+                // The loader was reset while this page was in flight
+                return;
+            }
+            if (data.status !== 'success') {
+                console.debug("Error loading page:", data);
+                nextCursor = null;
+                return;
+            }
+            renderItems(data.items);
+            nextCursor = data.next_cursor;
+            console.debug(`Loaded ${data.items.length} items. Next cursor: ${nextCursor}`);
+        })
+        .catch(error => {
+            console.debug("Error loading page:", error);
+            failed = true;
+        })
+        .finally(() => {
+            if (requestGeneration === generation) {
+                loading = false;
+                loadMoreButton.style.display = nextCursor === null ? 'none' : '';
+                // Keep filling the screen while the sentinel is still visible
+                if (!failed && nextCursor !== null && loadMoreButton.getBoundingClientRect().top < window.innerHeight) {
+                    loadNextPage();
+                }
+            }
+        });
+    }
+
+    // Function to start again from the first page, e.g. after changing a filter
+    function reset() {
+        generation += 1;
+        nextCursor = 0;
+        loading = false;
+        loadNextPage();
+    }
+
+    loadMoreButton.addEventListener('click', loadNextPage);
+    if ('IntersectionObserver' in window) {
+        new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadNextPage();
+            }
+        }).observe(loadMoreButton);
+    }
+
+    // Function to tell whether every page has been loaded
+    function isComplete() {
+        return nextCursor === null;
+    }
+
+    return { loadNextPage: loadNextPage, reset: reset, isComplete: isComplete };
+}
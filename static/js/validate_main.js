@@ -12,6 +12,7 @@ let isPaused = false;
 let totalValidated = parseInt(scannedCountSpan.textContent);
 let validatedCountSpan = document.getElementById('validated-count');
 let scootersLeftSpan = document.getElementById('scooters-left');
+let queuedValidationsSpan = document.getElementById('queued-validations');
 let showFullURLs = false; // For toggling URLs
 
 console.debug("Variables initialized.");
@@ -73,20 +74,12 @@ function processValidationData(scooterId) {
         }
     });
 
-    // Send validation data to server
-    fetch('/save_validation', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ session_id: sessionId, scooter_id: scooterId })
-    })
-    .then(response => response.json())
+    // Send validation data to server (queued while offline)
+    OfflineQueue.send('validation', sessionId, scooterId, '/save_validation')
     .then(data => {
         console.debug("Response from save_validation:", data);
         if (data.status === 'success') {
-            totalValidated = data.total_validated;
-            scannedCountSpan.textContent = totalValidated;
-            validatedCountSpan.textContent = totalValidated;
-            scootersLeftSpan.textContent = totalScooters - totalValidated;
+            updateTotals(data.total_validated, data.total_scooters);
             // Play beep sound
             beepSound.play();
             // Flash green overlay
@@ -104,6 +97,22 @@ function processValidationData(scooterId) {
             // Update validation status in the table
             updateValidationStatus(displayId);
             console.debug(`Scooter ID ${scooterId} validated. Total validated: ${totalValidated}/${totalScooters}`);
+        } else if (data.status === 'queued') {
+            beepSound.play();
+            // Flash orange overlay: checked in on this device, not yet confirmed by the server
+            overlay.style.backgroundColor = 'orange';
+            overlay.style.opacity = '0.7';
+            setTimeout(() => {
+                overlay.style.opacity = '0';
+            }, 300);
+            scannedScooterIdDiv.textContent = `ID ${displayId} queued offline`;
+            scannedScooterIdDiv.style.display = 'block';
+            setTimeout(() => {
+                scannedScooterIdDiv.style.display = 'none';
+            }, 5000);
+            markQueued(displayId);
+            queuedValidationsSpan.textContent = data.queued;
+            console.debug(`Scooter ID ${scooterId} queued offline. Queued validations: ${data.queued}`);
         } else if (data.status === 'duplicate') {
             console.debug("Scooter ID already validated:", scooterId);
             scannedScooterIdDiv.textContent = `ID ${displayId} already validated`;
@@ -133,6 +142,54 @@ function processValidationData(scooterId) {
     });
 }
 
+// Mark a scooter whose validation waits in the offline queue
+function markQueued(scooterId) {
+    const row = document.querySelector(`tr[data-scooter-id='${scooterId}']`);
+    if (row && row.querySelector('.validation-status').textContent !== 'Validated') {
+        row.querySelector('.validation-status').textContent = 'Queued';
+    }
+}
+
+// Update the table once queued validations have been replayed to the server
+OfflineQueue.onReplay(replayed => {
+    if (replayed.kind !== 'validation' || replayed.session_id !== String(sessionId)) {
+        return;
+    }
+    replayed.items.forEach(item => {
+        const status = item.result ? item.result.status : null;
+        if (status === 'success' || status === 'duplicate') {
+            updateValidationStatus(item.item_id);
+        } else {
+            console.debug(`Queued validation ${item.item_id} not saved:`, item.result);
+            updateUnvalidatedStatus(item.item_id);
+        }
+    });
+    if (replayed.response.total_validated !== undefined) {
+        updateTotals(replayed.response.total_validated, replayed.response.total_scooters);
+    }
+    OfflineQueue.pendingCount('validation', sessionId).then(queued => {
+        queuedValidationsSpan.textContent = queued;
+    });
+});
+
+// Show validations still waiting in the offline queue from an earlier visit
+OfflineQueue.pendingItems('validation', sessionId).then(items => {
+    items.forEach(item => markQueued(item.item_id));
+    queuedValidationsSpan.textContent = items.length;
+});
+
+// Update the validated counters
+function updateTotals(validated, total) {
+    totalValidated = validated;
+    if (total !== undefined) {
+        totalScooters = total;
+        totalCountSpan.textContent = totalScooters;
+    }
+    scannedCountSpan.textContent = totalValidated;
+    validatedCountSpan.textContent = totalValidated;
+    scootersLeftSpan.textContent = totalScooters - totalValidated;
+}
+
 // Update validation status in the table
 function updateValidationStatus(scooterId) {
     const row = document.querySelector(`tr[data-scooter-id='${scooterId}']`);
@@ -149,6 +206,18 @@ function updateValidationStatus(scooterId) {
     }
 }
 
+// Reset validation status in the table
+function updateUnvalidatedStatus(scooterId) {
+    const row = document.querySelector(`tr[data-scooter-id='${scooterId}']`);
+    if (row) {
+        const statusCell = row.querySelector('.validation-status');
+        statusCell.textContent = 'Not Validated';
+        // Remove unvalidate button
+        let actionCell = row.querySelector('td:nth-child(3)');
+        actionCell.innerHTML = '';
+    }
+}
+
 // Unvalidate scooter
 function unvalidateScooter(event) {
     let scooterId = event.target.getAttribute('data-scooter-id');
@@ -164,19 +233,9 @@ function unvalidateScooter(event) {
         .then(data => {
             console.debug("Response from unvalidate_scooter:", data);
             if (data.status === 'success') {
-                totalValidated = data.total_validated;
-                scannedCountSpan.textContent = totalValidated;
-                validatedCountSpan.textContent = totalValidated;
-                scootersLeftSpan.textContent = totalScooters - totalValidated;
+                updateTotals(data.total_validated, data.total_scooters);
                 // Update status in table
-                const row = document.querySelector(`tr[data-scooter-id='${scooterId}']`);
-                if (row) {
-                    const statusCell = row.querySelector('.validation-status');
-                    statusCell.textContent = 'Not Validated';
-                    // Remove unvalidate button
-                    let actionCell = row.querySelector('td:nth-child(3)');
-                    actionCell.innerHTML = '';
-                }
+                updateUnvalidatedStatus(scooterId);
                 console.debug(`Scooter ID ${scooterId} unvalidated. Total validated: ${totalValidated}/${totalScooters}`);
             } else {
                 console.debug("Error: Unable to unvalidate scooter.");
@@ -278,3 +337,58 @@ document.getElementById('toggle-url-btn').addEventListener('click', () => {
     });
     console.debug("Toggled full URLs:", showFullURLs);
 });
+
+// Add a scooter scanned into the list since the page was rendered
+function addScooterRow(scooterId, fullId) {
+    const row = document.createElement('tr');
+    row.setAttribute('data-scooter-id', scooterId);
+    row.setAttribute('data-full-id', fullId);
+    row.innerHTML = `<td class="scooter-id-cell"></td><td class="validation-status">Not Validated</td><td></td>`;
+    row.querySelector('.scooter-id-cell').textContent = showFullURLs ? fullId : scooterId;
+    document.querySelector('#scooter-status-table tbody').appendChild(row);
+}
+
+// Catch up with changes missed while the page was hidden or offline, e.g. on return to the page
+followListChanges(sessionId, changeSeq, (changes, data) => {
+    changes.forEach(change => {
+        const row = document.querySelector(`tr[data-scooter-id='${change.short_id}']`);
+        if (change.type === 'validation') {
+            if (change.op === 'upsert') {
+                updateValidationStatus(change.short_id);
+            } else {
+                updateUnvalidatedStatus(change.short_id);
+            }
+        } else if (change.op === 'delete') {
+            if (row) {
+                row.remove();
+            }
+        } else if (!row) {
+            addScooterRow(change.short_id, change.scooter_id);
+        }
+    });
+    updateTotals(data.total_validated, data.total_scooters);
+});
+
+// Live progress shared by every device validating this list
+if (window.EventSource) {
+    const validationEvents = new EventSource(`/validation_events/${sessionId}`);
+    validationEvents.addEventListener('totals', event => {
+        const data = JSON.parse(event.data);
+        updateTotals(data.total_validated, data.total_scooters);
+    });
+    validationEvents.addEventListener('validated', event => {
+        const data = JSON.parse(event.data);
+        data.scooter_ids.forEach(updateValidationStatus);
+        updateTotals(data.total_validated, data.total_scooters);
+        console.debug("Validation event received:", data);
+    });
+    validationEvents.addEventListener('unvalidated', event => {
+        const data = JSON.parse(event.data);
+        data.scooter_ids.forEach(updateUnvalidatedStatus);
+        updateTotals(data.total_validated, data.total_scooters);
+        console.debug("Unvalidation event received:", data);
+    });
+    validationEvents.onerror = () => {
+        console.debug("Validation event stream interrupted, reconnecting.");
+    };
+}
@@ -1,7 +1,12 @@
-const CACHE_NAME = 'tier-scooter-scanner-v6'; // Updated cache version
+const CACHE_NAME = 'tier-scooter-scanner-v12'; // Updated cache version
 const STATIC_ASSETS = [
     '/static/css/style.css',
     '/static/js/main.js',
+    '/static/js/validate_main.js',
+    '/static/js/battery_main.js',
+    '/static/js/offline_queue.js',
+    '/static/js/list_changes.js',
+    '/static/js/jobs.js',
     '/static/js/qr-scanner.umd.min.js',
     '/static/audio/beep.mp3',
     '/static/manifest.json',
@@ -9,6 +14,9 @@ const STATIC_ASSETS = [
     '/static/icons/logo2_512x512.png'
 ];
 
+// Offline queue shared with the scanning pages
+importScripts('/static/js/offline_queue.js');
+
 // Install event
 self.addEventListener('install', function(event) {
     console.debug('Service Worker installing. Cache version:', CACHE_NAME);
@@ -43,6 +51,16 @@ self.addEventListener('fetch', function(event) {
     const requestUrl = new URL(event.request.url);
     console.debug('Fetch event for:', requestUrl.href);
 
+    // Let live event streams go straight to the network
+    if (requestUrl.pathname.startsWith('/validation_events/')) {
+        return;
+    }
+
+    // POSTs are never cached; the pages queue them themselves when the network fails
+    if (event.request.method !== 'GET') {
+        return;
+    }
+
     // For all requests, use network-first strategy
     event.respondWith(
         fetch(event.request)
@@ -72,3 +90,11 @@ self.addEventListener('fetch', function(event) {
             })
     );
 });
+
+// Background sync: replay queued scans once the network is back, even if the page was closed
+self.addEventListener('sync', function(event) {
+    if (event.tag === REPLAY_SYNC_TAG) {
+        console.debug('Background sync: replaying offline queue.');
+        event.waitUntil(OfflineQueue.replay());
+    }
+});